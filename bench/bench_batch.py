@@ -0,0 +1,58 @@
+"""
+Measure writing and reading many small files with `write_many` and
+`read_many`, against looping over the `write` and `read` commands.
+
+Usage: python bench/bench_batch.py [--files N] [--size BYTES]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from fs import fs
+
+
+def seeded(files, capacity):
+    filesystem = fs.FileSystem(hard_disk_capacity=capacity)
+    filesystem.mkdir(["d"])
+    filesystem.touch([f"d/f{number}" for number in range(files)])
+    return filesystem
+
+
+def report(label, elapsed, files):
+    print(f"{label:<24} {elapsed:8.3f}s {files / elapsed:12,.0f} files/sec")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    parser.add_argument("--size", type=int, default=32)
+    args = parser.parse_args()
+
+    paths = [f"d/f{number}" for number in range(args.files)]
+    contents = "x" * args.size
+    capacity = args.files * (args.size + 64)
+
+    filesystem = seeded(args.files, capacity)
+    start = time.perf_counter()
+    for path in paths:
+        filesystem.exec(f"write {path} {contents}")
+    report("write loop", time.perf_counter() - start, args.files)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            filesystem.exec(f"read {path}")
+    report("read loop", time.perf_counter() - start, args.files)
+
+    filesystem = seeded(args.files, capacity)
+    start = time.perf_counter()
+    filesystem.write_many({path: contents for path in paths})
+    report("write_many", time.perf_counter() - start, args.files)
+    start = time.perf_counter()
+    assert filesystem.read_many(paths) == [contents] * args.files
+    report("read_many", time.perf_counter() - start, args.files)
+
+
+if __name__ == "__main__":
+    main()
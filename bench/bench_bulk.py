@@ -0,0 +1,97 @@
+"""
+Measure bulk import and export of host directory trees and tar archives in
+files/sec and MB/s, against seeding the same tree one command at a time.
+
+Usage: python bench/bench_bulk.py [--files N] [--size BYTES] [--directories N]
+"""
+
+import argparse
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+
+from fs import fs
+
+
+def report(label, elapsed, files, size):
+    print(
+        f"{label:<32} {files / elapsed:12,.0f} files/sec "
+        f"{files * size / elapsed / 1e6:10,.1f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--size", type=int, default=1024)
+    parser.add_argument("--directories", type=int, default=100)
+    args = parser.parse_args()
+
+    workspace = tempfile.mkdtemp()
+    source = os.path.join(workspace, "source")
+    contents = ("x" * args.size).encode()
+    for number in range(args.files):
+        directory = os.path.join(source, f"d{number % args.directories}")
+        os.makedirs(directory, exist_ok=True)
+        with open(os.path.join(directory, f"f{number}"), "wb") as handle:
+            handle.write(contents)
+    archive = os.path.join(workspace, "source.tar")
+    with tarfile.open(archive, "w") as tar:
+        tar.add(source, arcname=".")
+    capacity = args.files * (args.size + 64) * 2
+
+    try:
+        filesystem = fs.FileSystem(hard_disk_capacity=capacity)
+        start = time.perf_counter()
+        filesystem.import_tree([source])
+        report(
+            "import directory",
+            time.perf_counter() - start,
+            args.files,
+            args.size,
+        )
+
+        start = time.perf_counter()
+        fs.FileSystem(hard_disk_capacity=capacity).import_tree([archive])
+        report(
+            "import tar", time.perf_counter() - start, args.files, args.size
+        )
+
+        start = time.perf_counter()
+        filesystem.export_tree(["/", os.path.join(workspace, "exported")])
+        report(
+            "export directory",
+            time.perf_counter() - start,
+            args.files,
+            args.size,
+        )
+
+        start = time.perf_counter()
+        filesystem.export_tree(["/", os.path.join(workspace, "out.tar")])
+        report(
+            "export tar", time.perf_counter() - start, args.files, args.size
+        )
+
+        commands = [f"mkdir d{d}" for d in range(args.directories)]
+        for number in range(args.files):
+            path = f"d{number % args.directories}/f{number}"
+            commands.append(f"touch {path}")
+            commands.append(f"write {path} {contents.decode()}")
+        filesystem = fs.FileSystem(hard_disk_capacity=capacity)
+        start = time.perf_counter()
+        for command in commands:
+            filesystem.exec(command)
+        report(
+            "one command per entry",
+            time.perf_counter() - start,
+            args.files,
+            args.size,
+        )
+    finally:
+        shutil.rmtree(workspace)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+"""
+Measure repeatedly reading a small set of hot files, with and without the
+content cache.
+
+Usage: python bench/bench_cache.py [--files N] [--reads N] [--appends N]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from fs import fs
+
+
+def run(label, content_cache_size, args):
+    filesystem = fs.FileSystem(
+        hard_disk_capacity=args.files * args.appends * 128,
+        content_cache_size=content_cache_size,
+    )
+    paths = [f"config{number}" for number in range(args.files)]
+    filesystem.touch(paths)
+    for number in range(args.appends):
+        for path in paths:
+            filesystem.exec(f"write {path} key{number}=value{number};")
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for number in range(args.reads):
+            filesystem.exec(f"read {paths[number % args.files]}")
+    elapsed = time.perf_counter() - start
+    stats = (
+        filesystem.content_cache.stats() if filesystem.content_cache else {}
+    )
+    print(f"{label:<16} {args.reads / elapsed:12,.0f} reads/sec {stats}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=10)
+    parser.add_argument("--reads", type=int, default=100000)
+    parser.add_argument("--appends", type=int, default=20)
+    args = parser.parse_args()
+
+    run("without cache", 0, args)
+    run("with cache", 1 << 20, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Measure searching a tree of files for a string: reading every file and
+matching in Python, against `search` scanning the data on the virtual hard
+disk, with one worker and with a pool of them.
+
+Usage: python bench/bench_grep.py [--files N] [--size BYTES]
+    [--appends N] [--workers N]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from fs import fs
+
+
+def seeded(files, size, appends):
+    filesystem = fs.FileSystem(hard_disk_capacity=files * size * 2 + 10**6)
+    names = [f"d{number}" for number in range(10)]
+    filesystem.mkdir(names)
+    paths = [f"d{number % 10}/f{number}" for number in range(files)]
+    filesystem.touch(paths)
+    line = "lorem ipsum dolor sit amet consectetur "
+    chunk = (line * (size // len(line) // appends + 1))[: size // appends]
+    for number in range(appends):
+        filesystem.write_many({path: chunk for path in paths})
+    for number in range(0, files, 97):
+        filesystem.write([paths[number], "needle"])
+    return filesystem, paths
+
+
+def read_and_match(filesystem, paths, pattern):
+    matches = []
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        for path in paths:
+            filesystem.exec(f"read {path}")
+            contents = output.getvalue()
+            output.seek(0)
+            output.truncate()
+            position = contents.find(pattern)
+            while position != -1:
+                matches.append((path, position))
+                position = contents.find(pattern, position + len(pattern))
+    return matches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=32768)
+    parser.add_argument("--appends", type=int, default=4)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    filesystem, paths = seeded(args.files, args.size, args.appends)
+    total = args.files * args.size / 1e6
+    runs = [
+        (
+            "read and match",
+            lambda: read_and_match(filesystem, paths, "needle"),
+        ),
+        ("search", lambda: filesystem.search("needle", "/", workers=1)),
+        (
+            f"search, {args.workers} workers",
+            lambda: filesystem.search("needle", "/", workers=args.workers),
+        ),
+        (
+            "search -E",
+            lambda: filesystem.search("ne+dle", "/", True, workers=1),
+        ),
+    ]
+    # Let the pool be used however little data there is.
+    fs.FileSystem.PARALLEL_SEARCH_BYTES = 0
+    for label, run in runs:
+        start = time.perf_counter()
+        matches = run()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<20} {total / elapsed:10,.1f} MB/s "
+            f"{len(matches):>6} matches"
+        )
+
+
+if __name__ == "__main__":
+    main()
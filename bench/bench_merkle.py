@@ -0,0 +1,71 @@
+"""
+Measure syncing a replica with a primary filesystem after a few changes,
+with Merkle digests, against comparing every file of the two trees.
+
+Usage: python bench/bench_merkle.py [--directories N] [--files N]
+"""
+
+import argparse
+import time
+
+from fs import fs
+
+
+def seeded(directories, files):
+    filesystem = fs.FileSystem(hard_disk_capacity=10**9)
+    names = [f"d{number}" for number in range(directories)]
+    filesystem.mkdir(names)
+    for name in names:
+        paths = [f"{name}/f{number}" for number in range(files)]
+        filesystem.touch(paths)
+        filesystem.write_many({path: f"contents of {path}" for path in paths})
+    return filesystem
+
+
+def compare_everything(primary, replica, paths):
+    return [
+        path
+        for path, mine, theirs in zip(
+            paths, primary.read_many(paths), replica.read_many(paths)
+        )
+        if mine != theirs
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directories", type=int, default=100)
+    parser.add_argument("--files", type=int, default=1000)
+    args = parser.parse_args()
+
+    primary = seeded(args.directories, args.files)
+    replica = seeded(args.directories, args.files)
+    paths = [
+        f"d{directory}/f{number}"
+        for directory in range(args.directories)
+        for number in range(args.files)
+    ]
+    start = time.perf_counter()
+    primary.digest("/")
+    replica.digest("/")
+    elapsed = time.perf_counter() - start
+    print(f"first digests of {len(paths):,} files {elapsed * 1000:10.1f} ms")
+
+    for changes in [1, 10, 100, 1000]:
+        for number in range(changes):
+            primary.write([paths[number * 7919 % len(paths)], str(changes)])
+        start = time.perf_counter()
+        expected = compare_everything(primary, replica, paths)
+        naive = time.perf_counter() - start
+        start = time.perf_counter()
+        synced = primary.sync(replica, "/")
+        elapsed = time.perf_counter() - start
+        assert len(synced) == len(expected)
+        print(
+            f"{changes:>5} changes: compare every file {naive * 1000:9.1f} ms"
+            f"   diff and sync {elapsed * 1000:9.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
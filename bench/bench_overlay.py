@@ -0,0 +1,79 @@
+"""
+Measure overlays of a shared base tree: how long creating one takes and how
+much memory each one uses as it makes more changes, against building a full
+private copy of the base for every client.
+
+Usage: python bench/bench_overlay.py [--directories N] [--files N]
+    [--overlays N]
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from fs import fs
+
+
+def seeded(directories, files, lower=None):
+    filesystem = fs.FileSystem(hard_disk_capacity=10**9, lower=lower)
+    names = [f"d{number}" for number in range(directories)]
+    filesystem.mkdir(names)
+    for name in names:
+        paths = [f"{name}/f{number}" for number in range(files)]
+        filesystem.touch(paths)
+        filesystem.write_many({path: path for path in paths})
+    return filesystem
+
+
+def changes(number, count, directories, files):
+    commands = []
+    for item in range(count):
+        directory = f"d{(number + item) % directories}"
+        commands += [
+            f"write {directory}/f{item % files} more",
+            f"touch {directory}/new{number}_{item}",
+        ]
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directories", type=int, default=100)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--overlays", type=int, default=100)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    base = seeded(args.directories, args.files)
+    elapsed = time.perf_counter() - start
+    size = tracemalloc.get_traced_memory()[0] - before
+    print(
+        f"full copy of {args.directories * args.files:,} files "
+        f"{elapsed * 1000:10.3f} ms {size / 1024:12,.0f} KiB"
+    )
+
+    for count in [0, 10, 100]:
+        overlays = []
+        before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        for number in range(args.overlays):
+            overlay = fs.FileSystem(hard_disk_capacity=10**6, lower=base)
+            for command in changes(
+                number, count, args.directories, args.files
+            ):
+                overlay.exec(command)
+            overlays.append(overlay)
+        elapsed = time.perf_counter() - start
+        size = tracemalloc.get_traced_memory()[0] - before
+        print(
+            f"overlay, {count:>4} changes each "
+            f"{elapsed * 1000 / args.overlays:10.3f} ms "
+            f"{size / 1024 / args.overlays:12,.1f} KiB per overlay"
+        )
+        del overlays
+
+
+if __name__ == "__main__":
+    main()
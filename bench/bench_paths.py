@@ -0,0 +1,77 @@
+"""
+Measure the memory taken up by a deep tree, how much of it is the paths of
+its nodes, and how long looking up every file in it takes.
+
+Usage: python bench/bench_paths.py [--nodes N] [--depth N] [--fanout N]
+"""
+
+import argparse
+import sys
+import time
+import tracemalloc
+
+from fs import fs
+
+
+def build(nodes, depth, fanout):
+    # Branches of directories `depth` levels deep, with `fanout` files in the
+    # deepest directory of each, until there are `nodes` nodes.
+    filesystem = fs.FileSystem(hard_disk_capacity=1000)
+    files = []
+    count = 1
+    branch = 0
+    while count < nodes:
+        directories = [f"/b{branch}"]
+        for level in range(1, depth - 1):
+            directories.append(f"{directories[-1]}/d{level}")
+        filesystem.mkdir(directories)
+        count += len(directories)
+        paths = [
+            f"{directories[-1]}/f{number}"
+            for number in range(min(fanout, nodes - count))
+        ]
+        filesystem.touch(paths)
+        files.extend(paths)
+        count += len(paths)
+        branch += 1
+    return filesystem, files
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--nodes", type=int, default=1_000_000)
+    parser.add_argument("--depth", type=int, default=20)
+    parser.add_argument("--fanout", type=int, default=1000)
+    args = parser.parse_args()
+
+    tracemalloc.start()
+    filesystem, files = build(args.nodes, args.depth, args.fanout)
+    # The list of file paths is only kept around for the lookups.
+    used = tracemalloc.get_traced_memory()[0] - sys.getsizeof(files)
+    used -= sum(sys.getsizeof(path) for path in files)
+    tracemalloc.stop()
+    nodes = len(filesystem.inode_index)
+    paths = {
+        id(node.path): sys.getsizeof(node.path)
+        for node in filesystem.inode_index.values()
+    }
+    print(
+        f"{nodes:,} nodes at depth {args.depth}: {used / 1e6:.1f} MB, "
+        f"{used / nodes:.0f} bytes per node"
+    )
+    print(
+        f"{len(paths):,} distinct path strings: "
+        f"{sum(paths.values()) / 1e6:.1f} MB"
+    )
+
+    start = time.perf_counter()
+    filesystem.read_many(files)
+    elapsed = time.perf_counter() - start
+    print(
+        f"looking up {len(files):,} files: "
+        f"{elapsed / len(files) * 1e6:.2f} us per lookup"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measure reading files that were appended to in turns by many writers, with
+and without space reserved for their appends.
+
+Usage: python bench/bench_reservation.py [--files N] [--appends N]
+    [--size BYTES]
+"""
+
+import argparse
+import contextlib
+import io
+import time
+
+from fs import fs
+
+
+class Unreserved(fs.FileSystem):
+    # Reservations no bigger than each append leave every append where the
+    # next free byte happened to be, as if there were no reservations.
+    MIN_RESERVATION = 0
+    MAX_RESERVATION = 0
+
+
+def run(label, filesystem_class, args):
+    capacity = args.files * args.appends * (args.size + 32) * 2
+    filesystem = filesystem_class(hard_disk_capacity=capacity)
+    paths = [f"log{number}" for number in range(args.files)]
+    filesystem.touch(paths)
+    contents = "x" * args.size
+
+    start = time.perf_counter()
+    for _ in range(args.appends):
+        for path in paths:
+            filesystem.exec(f"write {path} {contents}")
+    appended = time.perf_counter() - start
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for path in paths:
+            filesystem.exec(f"read {path}")
+    read = time.perf_counter() - start
+    print(
+        f"{label:<20} append {args.files * args.appends / appended:10,.0f}"
+        f" ops/sec   read {args.files / read:8,.0f} files/sec"
+        f" {args.files * args.appends * args.size / read / 1e6:8,.1f} MB/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--appends", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=64)
+    args = parser.parse_args()
+
+    run("without reservation", Unreserved, args)
+    run("with reservation", fs.FileSystem, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Measure the latency of small commands sent to a filesystem server while
+other clients keep it busy with pipelined big writes and listings of a big
+directory, with commands run in the order a FairScheduler picks against
+first come, first served under a lock.
+
+Usage: python bench/bench_scheduler.py [--clients N] [--heavy N] [--seconds N]
+    [--write BYTES] [--entries N] [--listings N]
+"""
+
+import argparse
+import contextlib
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+import time
+
+from fs import fs, server
+from fs.client import Client
+
+
+class LockedServer(server.UnixFileSystemServer):
+    # Every command waits for a plain lock, as the server used to.
+    def __init__(self, address, filesystem):
+        super().__init__(address, filesystem)
+        self.lock = threading.Lock()
+
+    def execute(self, session, command):
+        output = io.StringIO()
+        with self.lock:
+            self.filesystem.current_location = session.current_location
+            try:
+                with contextlib.redirect_stdout(output):
+                    self.filesystem.exec(command)
+            except Exception as e:
+                return server.encode_response(server.ERROR, str(e))
+            finally:
+                session.current_location = self.filesystem.current_location
+        return server.encode_response(server.OK, output.getvalue())
+
+
+def run_heavy(address, size, listings, seconds, results):
+    # Commands are pipelined, so the server always has more of them queued.
+    commands = [f"write big {'x' * size}", "truncate big 0"]
+    commands += ["ls many"] * listings
+    done = 0
+    with Client(address) as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            client.pipeline(commands)
+            done += 1
+    results.put(("heavy", done / seconds))
+
+
+def run_small(address, number, seconds, results):
+    latencies = []
+    with Client(address) as client:
+        client.execute(f"touch small{number}")
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            sent = time.perf_counter()
+            client.execute(f"read small{number}")
+            latencies.append(time.perf_counter() - sent)
+    results.put(("small", latencies))
+
+
+def run(label, server_class, args):
+    directory = tempfile.mkdtemp()
+    address = os.path.join(directory, "fs.sock")
+    filesystem = fs.FileSystem(hard_disk_capacity=args.write * 16)
+    filesystem.mkdir(["many"])
+    filesystem.touch([f"many/f{number}" for number in range(args.entries)])
+    filesystem.touch(["big"])
+    instance = server_class(address, filesystem)
+    thread = threading.Thread(target=instance.serve_forever, daemon=True)
+    thread.start()
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=run_heavy,
+            args=(address, args.write, args.listings, args.seconds, results),
+        )
+        for _ in range(args.heavy)
+    ] + [
+        multiprocessing.Process(
+            target=run_small, args=(address, number, args.seconds, results)
+        )
+        for number in range(args.clients)
+    ]
+    for process in processes:
+        process.start()
+    latencies, throughput = [], 0
+    for _ in processes:
+        kind, result = results.get()
+        if kind == "heavy":
+            throughput += result
+        else:
+            latencies.extend(result)
+    for process in processes:
+        process.join()
+    instance.shutdown()
+    instance.server_close()
+    os.unlink(address)
+    latencies.sort()
+    percentiles = "".join(
+        f" p{percentile:g} "
+        f"{latencies[int(len(latencies) * percentile / 100)] * 1000:7.2f} ms"
+        for percentile in [50, 99, 99.9]
+    )
+    print(
+        f"{label:<5} {len(latencies):>7,} small commands:{percentiles} "
+        f"max {latencies[-1] * 1000:7.1f} ms   "
+        f"{throughput:5.2f} heavy batches/s"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--heavy", type=int, default=3)
+    parser.add_argument("--seconds", type=float, default=5)
+    parser.add_argument("--write", type=int, default=4 << 20)
+    parser.add_argument("--entries", type=int, default=20000)
+    parser.add_argument("--listings", type=int, default=10)
+    args = parser.parse_args()
+
+    run("lock", LockedServer, args)
+    run("fair", server.UnixFileSystemServer, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Measure the throughput and peak memory of running a long script through
+`fs --script`. The script creates and removes files in a loop so that the
+filesystem itself stays small, leaving memory use down to how commands are
+read.
+
+Usage: python bench/bench_script.py [--lines N]
+"""
+
+import argparse
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def write_script(path, lines):
+    with open(path, "w") as script:
+        for number in range(0, lines, 4):
+            script.write(
+                f"touch f{number}\nls f{number}\nrm f{number}\npwd\n"
+            )
+
+
+def run(arguments, stdin=None):
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, "-m", "fs", *arguments],
+        stdin=stdin,
+        stdout=subprocess.DEVNULL,
+        check=True,
+    )
+    elapsed = time.perf_counter() - start
+    # ru_maxrss only ever grows, so run each measurement in a fresh child.
+    return elapsed, resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--lines", type=int, default=10_000_000)
+    parser.add_argument("--mode", choices=["script", "stdin"])
+    args = parser.parse_args()
+
+    if args.mode is None:
+        # Measure each mode in its own process, so their peak RSS values
+        # don't mix.
+        for mode in ["script", "stdin"]:
+            subprocess.run(
+                [sys.executable, __file__, "--lines", str(args.lines)]
+                + ["--mode", mode],
+                check=True,
+            )
+        return
+
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, "script.txt")
+    write_script(path, args.lines)
+    try:
+        if args.mode == "script":
+            elapsed, rss = run(["--script", path])
+        else:
+            with open(path) as script:
+                elapsed, rss = run([], stdin=script)
+    finally:
+        os.remove(path)
+        os.rmdir(directory)
+    print(
+        f"{args.mode:<7} {args.lines:>12,} lines "
+        f"{args.lines / elapsed:12,.0f} lines/sec  peak RSS {rss / 1024:,.1f} MB"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Measure requests/sec and round trip latency of the filesystem server with many
+concurrent local clients, and compare it with starting a fresh `fs` process
+per command.
+
+Usage: python bench/bench_server.py [--clients N] [--requests N] [--batch N]
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from fs.client import Client
+
+
+def run_client(address, client_id, requests, batch, results):
+    latencies = []
+    with Client(address) as client:
+        client.execute(f"mkdir client{client_id}")
+        commands = [
+            f"touch client{client_id}/file{number}" if number % 2 else "pwd"
+            for number in range(requests)
+        ]
+        start = time.perf_counter()
+        for offset in range(0, requests, batch):
+            sent = time.perf_counter()
+            client.pipeline(commands[offset : offset + batch])
+            latencies.append(time.perf_counter() - sent)
+        elapsed = time.perf_counter() - start
+    results.put((elapsed, latencies))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    address = os.path.join(directory, "fs.sock")
+    server = subprocess.Popen(
+        [sys.executable, "-m", "fs", "--serve", address],
+        stdout=subprocess.DEVNULL,
+    )
+    try:
+        while not os.path.exists(address):
+            time.sleep(0.01)
+
+        results = multiprocessing.Queue()
+        clients = [
+            multiprocessing.Process(
+                target=run_client,
+                args=(address, number, args.requests, args.batch, results),
+            )
+            for number in range(args.clients)
+        ]
+        start = time.perf_counter()
+        for client in clients:
+            client.start()
+        collected = [results.get() for _ in clients]
+        wall = time.perf_counter() - start
+        for client in clients:
+            client.join()
+    finally:
+        server.terminate()
+        server.wait()
+
+    latencies = sorted(
+        latency
+        for _, batch_latencies in collected
+        for latency in batch_latencies
+    )
+    total = args.clients * args.requests
+    print(
+        f"clients={args.clients} requests/client={args.requests} batch={args.batch}"
+    )
+    print(f"throughput: {total / wall:,.0f} requests/sec")
+    print(
+        f"round trip latency per batch: "
+        f"p50={statistics.median(latencies) * 1e6:,.0f}us "
+        f"p99={latencies[int(len(latencies) * 0.99)] * 1e6:,.0f}us"
+    )
+
+    start = time.perf_counter()
+    for _ in range(5):
+        subprocess.run(
+            [sys.executable, "-m", "fs", "--commands", "pwd"],
+            stdout=subprocess.DEVNULL,
+        )
+    print(
+        f"one process per command: "
+        f"{(time.perf_counter() - start) / 5 * 1e3:,.1f}ms per command"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+"""
+Measure how aggregate throughput scales with the number of shards for a
+workload that partitions cleanly: every top-level directory receives its own
+stream of file creations and writes.
+
+Usage: python bench/bench_shard.py [--directories N] [--files N] [--shards N ...]
+"""
+
+import argparse
+import contextlib
+import io
+import os
+import time
+
+from fs import fs
+from fs.shard import ShardedFileSystem
+
+
+def workload(directories, files):
+    commands = [f"mkdir {' '.join(f'd{d}' for d in range(directories))}"]
+    for number in range(files):
+        for directory in range(directories):
+            commands.append(f"touch d{directory}/f{number}")
+            commands.append(f"write d{directory}/f{number} x")
+            commands.append(f"ls d{directory}/f{number}")
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directories", type=int, default=64)
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--batch", type=int, default=20000)
+    parser.add_argument(
+        "--shards",
+        type=int,
+        nargs="+",
+        default=sorted({1, 2, 4, os.cpu_count() or 1}),
+    )
+    args = parser.parse_args()
+    commands = workload(args.directories, args.files)
+    capacity = 10**8
+    print(f"{len(commands):,} commands, {os.cpu_count()} CPUs")
+
+    filesystem = fs.FileSystem(hard_disk_capacity=capacity)
+    start = time.perf_counter()
+    baseline_cpu = time.process_time()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for command in commands:
+            filesystem.exec(command)
+    baseline_cpu = time.process_time() - baseline_cpu
+    baseline = time.perf_counter() - start
+    print(
+        f"{'single FileSystem':<22} {len(commands) / baseline:12,.0f} "
+        f"commands/sec, {baseline_cpu / len(commands) * 1e6:.2f} us/command"
+    )
+
+    for shards in args.shards:
+        with ShardedFileSystem(
+            shards=shards, hard_disk_capacity=capacity
+        ) as sharded:
+            start = time.perf_counter()
+            router = time.process_time()
+            for offset in range(0, len(commands), args.batch):
+                sharded.exec_many(commands[offset : offset + args.batch])
+            router = time.process_time() - router
+            elapsed = time.perf_counter() - start
+        # The router's own CPU time, not counting the workers', bounds what
+        # any number of cores can get out of the shards.
+        print(
+            f"{f'{shards} shard(s)':<22} {len(commands) / elapsed:12,.0f} "
+            f"commands/sec ({baseline / elapsed:.2f}x), router "
+            f"{router / len(commands) * 1e6:.2f} us/command, at most "
+            f"{baseline_cpu / router:.1f}x with enough cores"
+        )
+
+
+if __name__ == "__main__":
+    main()
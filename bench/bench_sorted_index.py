@@ -0,0 +1,70 @@
+"""
+Compare the cost of building and querying a directory's children with the
+SortedIndex against the plain dict it replaced.
+
+Usage: python bench/bench_sorted_index.py [--entries N]
+"""
+
+import argparse
+import random
+import time
+
+from fs import fs
+from fs.index import SortedIndex
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<40} {elapsed * 1000:10.2f} ms")
+    return result
+
+
+def fill(container, keys):
+    for key in keys:
+        container[key] = None
+    return container
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--entries", type=int, default=300000)
+    args = parser.parse_args()
+
+    ordered = [f"/dir/file{number:08}" for number in range(args.entries)]
+    shuffled = list(ordered)
+    random.Random(0).shuffle(shuffled)
+
+    for label, keys in (("sequential", ordered), ("random", shuffled)):
+        plain = timed(f"dict insert ({label})", lambda: fill(dict(), keys))
+        index = timed(
+            f"SortedIndex insert ({label})", lambda: fill(SortedIndex(), keys)
+        )
+
+    # The index is only one part of creating a file: show the whole command
+    # path too, so the per-insert overhead can be read in context.
+    filesystem = fs.FileSystem()
+    names = [key.split("/")[-1] for key in shuffled[: args.entries // 10]]
+    timed(
+        f"FileSystem touch x{len(names)} (random)",
+        lambda: [filesystem.exec(f"touch {name}") for name in names],
+    )
+
+    timed("dict sorted listing", lambda: sorted(plain))
+    timed("SortedIndex sorted listing", lambda: list(index))
+    prefix = "/dir/file0000012"
+    timed(
+        "dict prefix scan",
+        lambda: [key for key in plain if key.startswith(prefix)],
+    )
+    timed("SortedIndex prefix scan", lambda: list(index.prefix(prefix)))
+    timed("dict delete all", lambda: [plain.pop(key) for key in shuffled])
+    timed(
+        "SortedIndex delete all",
+        lambda: [index.__delitem__(key) for key in shuffled],
+    )
+
+
+if __name__ == "__main__":
+    main()
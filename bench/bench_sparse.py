@@ -0,0 +1,78 @@
+"""
+Measure writing and reading files with a small header and trailer far apart,
+stored sparsely with a hole between them against written out with zeros.
+
+Usage: python bench/bench_sparse.py [--files N] [--gap BYTES]
+"""
+
+import argparse
+import time
+
+from fs import fs
+from fs.handle import SEEK_DATA
+
+
+def write_sparse(filesystem, paths, gap):
+    for path in paths:
+        with filesystem.open(path, "wb") as handle:
+            handle.write(b"header")
+            handle.seek(gap)
+            handle.write(b"trailer")
+
+
+def write_dense(filesystem, paths, gap):
+    zeros = bytes(gap - len(b"header"))
+    for path in paths:
+        with filesystem.open(path, "wb") as handle:
+            handle.write(b"header")
+            handle.write(zeros)
+            handle.write(b"trailer")
+
+
+def seek_trailers(filesystem, paths):
+    for path in paths:
+        with filesystem.open(path, "rb") as handle:
+            handle.seek(6, SEEK_DATA)
+            assert handle.read() == b"trailer"
+
+
+def read_all(filesystem, paths):
+    for path in paths:
+        with filesystem.open(path, "rb") as handle:
+            handle.read()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=50)
+    parser.add_argument("--gap", type=int, default=1 << 20)
+    args = parser.parse_args()
+
+    paths = [f"f{number}" for number in range(args.files)]
+    for label, write in [("sparse", write_sparse), ("dense", write_dense)]:
+        filesystem = fs.FileSystem(
+            hard_disk_capacity=args.files * (args.gap + 4096) * 2
+        )
+        start = time.perf_counter()
+        write(filesystem, paths, args.gap)
+        written = time.perf_counter() - start
+        start = time.perf_counter()
+        read_all(filesystem, paths)
+        read = time.perf_counter() - start
+        size, allocated = filesystem.disk_usage("/")
+        line = (
+            f"{label:<7} write {written * 1000:8.1f} ms   "
+            f"read {read * 1000:8.1f} ms   "
+            f"{size / 1e6:8.1f} MB in {allocated / 1e6:8.3f} MB allocated"
+        )
+        if label == "sparse":
+            start = time.perf_counter()
+            seek_trailers(filesystem, paths)
+            line += (
+                f"   SEEK_DATA {(time.perf_counter() - start) * 1000:.2f} ms"
+            )
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
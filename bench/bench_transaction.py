@@ -0,0 +1,98 @@
+"""
+Measure transactions: how many commit per second depending on their size,
+how long aborting one takes as the filesystem around it grows, and what one
+adding a file to a huge directory costs.
+
+Usage: python bench/bench_transaction.py [--directories N] [--files N]
+    [--transactions N] [--entries N]
+"""
+
+import argparse
+import time
+
+from fs import fs
+
+
+def seeded(directories, files):
+    filesystem = fs.FileSystem(hard_disk_capacity=10**9)
+    names = [f"d{number}" for number in range(directories)]
+    filesystem.mkdir(names)
+    for name in names:
+        filesystem.touch([f"{name}/f{number}" for number in range(files)])
+    return filesystem
+
+
+def transaction(number, size, directories):
+    directory = f"d{number % directories}"
+    commands = ["begin"]
+    for item in range(size):
+        path = f"{directory}/t{number}_{item}"
+        commands += [f"touch {path}", f"write {path} data"]
+    return commands
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--directories", type=int, default=100)
+    parser.add_argument("--files", type=int, default=100)
+    parser.add_argument("--transactions", type=int, default=2000)
+    parser.add_argument("--entries", type=int, default=200000)
+    args = parser.parse_args()
+
+    for size in [1, 10, 100]:
+        filesystem = seeded(args.directories, args.files)
+        count = max(1, args.transactions // size)
+        transactions = [
+            transaction(number, size, args.directories) + ["commit"]
+            for number in range(count)
+        ]
+        start = time.perf_counter()
+        for commands in transactions:
+            for command in commands:
+                filesystem.exec(command)
+        elapsed = time.perf_counter() - start
+        print(
+            f"commit {size:>4} files/transaction "
+            f"{count / elapsed:10,.0f} transactions/sec "
+            f"{count * size / elapsed:10,.0f} files/sec"
+        )
+
+    for files in [args.files, args.files * 10]:
+        filesystem = seeded(args.directories, files)
+        for command in transaction(0, 100, args.directories):
+            filesystem.exec(command)
+        start = time.perf_counter()
+        filesystem.exec("abort")
+        elapsed = time.perf_counter() - start
+        print(
+            f"abort  100 files/transaction with "
+            f"{args.directories * files:>9,} files around it "
+            f"{elapsed * 1000:8.3f} ms"
+        )
+
+    # A transaction adding one file to a huge directory should cost about as
+    # much as adding it outside of one, not grow with the directory.
+    filesystem = fs.FileSystem(hard_disk_capacity=1000)
+    filesystem.mkdir(["big"])
+    filesystem.touch([f"big/f{number}" for number in range(args.entries)])
+    count = 200
+    for label, commands in (
+        ("touch", lambda number: [f"touch big/t{number}"]),
+        (
+            "begin; touch; commit",
+            lambda number: ["begin", f"touch big/c{number}", "commit"],
+        ),
+    ):
+        start = time.perf_counter()
+        for number in range(count):
+            for command in commands(number):
+                filesystem.exec(command)
+        elapsed = time.perf_counter() - start
+        print(
+            f"{label:<20} in a directory of {args.entries:,} "
+            f"{elapsed * 1000 / count:8.3f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""
+Measure what change notifications cost: the same workload of creating,
+writing and removing files run with nothing watched, with a watch on an
+unrelated directory, and with a recursive watch on the root whose events are
+read in batches.
+
+Usage: python bench/bench_watch.py [--files N]
+"""
+
+import argparse
+import time
+
+from fs import fs
+
+
+def run(label, args, watch_path=None, recursive=False):
+    filesystem = fs.FileSystem(hard_disk_capacity=args.files * 256)
+    filesystem.mkdir(["busy", "quiet"])
+    watch = (
+        filesystem.watch(watch_path, recursive=recursive)
+        if watch_path
+        else None
+    )
+    commands = []
+    for number in range(args.files):
+        path = f"busy/d{number % 10}/f{number}"
+        if number < 10:
+            commands.append(f"mkdir busy/d{number}")
+        commands += [f"touch {path}", f"write {path} data", f"rm {path}"]
+
+    events = 0
+    start = time.perf_counter()
+    for position, command in enumerate(commands):
+        filesystem.exec(command)
+        if watch and position % 100 == 0:
+            events += len(watch.read())
+    elapsed = time.perf_counter() - start
+    if watch:
+        events += len(watch.read())
+    print(
+        f"{label:<24} {len(commands) / elapsed:12,.0f} commands/sec"
+        f" {events:10,} events"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=100000)
+    args = parser.parse_args()
+
+    run("nothing watched", args)
+    run("unrelated watch", args, "quiet")
+    run("recursive root watch", args, "/", recursive=True)
+
+
+if __name__ == "__main__":
+    main()
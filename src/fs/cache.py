@@ -0,0 +1,89 @@
+from collections import OrderedDict
+from typing import Dict, Hashable, Optional, Tuple
+
+
+class ContentCache:
+    """
+    A cache of the decoded contents of files, bounded by the total number of
+    bytes of data they take up on the virtual hard disk. Entries are keyed by
+    inode, so every hardlink and symlink that resolves to the same file
+    shares one entry, and the least recently used entries are evicted first
+    once the budget is exceeded.
+
+    The filesystem invalidates the entry of a file whenever its data changes,
+    so a cached entry is always exactly what reading the file would return.
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Create an empty cache.
+        :param capacity: The most bytes of file data to keep cached.
+        """
+        self.capacity = capacity
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.__entries: "OrderedDict[Hashable, Tuple[str, int]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def get(self, key: Hashable) -> Optional[str]:
+        """
+        Look up the contents of a file, marking them as recently used.
+        :param key: The file inode.
+        :return: The cached contents, or None if they aren't cached.
+        """
+        entry = self.__entries.get(key, None)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.__entries.move_to_end(key)
+        return entry[0]
+
+    def put(self, key: Hashable, contents: str, size: int) -> None:
+        """
+        Cache the contents of a file, evicting the least recently used
+        entries to make room. Files bigger than the whole cache aren't cached.
+        :param key: The file inode.
+        :param contents: The decoded contents of the file.
+        :param size: How many bytes the file's data takes up.
+        :return: None
+        """
+        self.invalidate(key)
+        if size > self.capacity:
+            return
+        while self.size + size > self.capacity:
+            _, (_, evicted_size) = self.__entries.popitem(last=False)
+            self.size -= evicted_size
+            self.evictions += 1
+        self.__entries[key] = (contents, size)
+        self.size += size
+
+    def invalidate(self, key: Hashable) -> None:
+        """
+        Forget the contents of a file, because its data changed.
+        :param key: The file inode.
+        :return: None
+        """
+        entry = self.__entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Report how well the cache is doing.
+        :return: A dictionary of the hits, misses and evictions so far, and
+            the number of entries and bytes currently cached.
+        """
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "entries": len(self.__entries),
+            "bytes": self.size,
+        }
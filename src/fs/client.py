@@ -0,0 +1,133 @@
+import argparse
+import socket
+import sys
+from typing import Iterable, List, Tuple
+
+from .server import HEADER, OK, parse_address
+
+
+class Client:
+    """
+    A thin client for a filesystem server. Commands can be sent one at a time
+    with `execute`, or many at once with `pipeline`, which writes every
+    request before reading any response.
+    """
+
+    def __init__(self, address: str):
+        family, parsed = parse_address(address)
+        self.socket = socket.socket(family, socket.SOCK_STREAM)
+        self.socket.connect(parsed)
+        self.buffer = b""
+
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.socket.close()
+
+    def __receive(self, size: int) -> bytes:
+        """
+        Read exactly `size` bytes from the server.
+        :param size: The number of bytes to read.
+        :return: The bytes read.
+        """
+        while len(self.buffer) < size:
+            chunk = self.socket.recv(65536)
+            if not chunk:
+                raise ConnectionError("Server closed the connection.")
+            self.buffer += chunk
+        data, self.buffer = self.buffer[:size], self.buffer[size:]
+        return data
+
+    def pipeline(self, commands: Iterable[str]) -> List[Tuple[bool, str]]:
+        """
+        Send a batch of commands in one write, then collect their responses.
+        :param commands: The command lines to execute, in order.
+        :return: A list of (succeeded, output) tuples, one per command.
+        """
+        commands = [command for command in commands if command.strip()]
+        self.socket.sendall(
+            "".join(command + "\n" for command in commands).encode()
+        )
+        responses = []
+        for _ in commands:
+            status, length = HEADER.unpack(self.__receive(HEADER.size))
+            payload = self.__receive(length)
+            # Bytes that aren't valid UTF-8 come back as surrogate escapes.
+            responses.append(
+                (status == OK, payload.decode("utf-8", "surrogateescape"))
+            )
+        return responses
+
+    def execute(self, command: str) -> str:
+        """
+        Execute a single command on the server.
+        :param command: The command line to execute.
+        :return: The output of the command.
+        """
+        succeeded, output = self.pipeline([command])[0]
+        if not succeeded:
+            raise RuntimeError(output)
+        return output
+
+
+def _batches(lines: Iterable[str], size: int) -> Iterable[List[str]]:
+    """
+    Group lines into lists of at most `size` commands.
+    :param lines: The lines to group, with or without trailing newlines.
+    :param size: The maximum number of commands in a batch.
+    :return: An iterator over the batches.
+    """
+    batch = []
+    for line in lines:
+        batch.append(line.rstrip("\n"))
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Send commands to a running in-memory filesystem server.",
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument(
+        "address",
+        help="The Unix socket path or host:port the server is listening on.",
+    )
+    parser.add_argument(
+        "--commands",
+        nargs="+",
+        help="Commands to execute. If omitted, commands are read from stdin, one per line.",
+    )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=128,
+        help="How many commands read from stdin to pipeline at once. Default is 128.",
+    )
+    args = parser.parse_args(args)
+
+    status = 0
+    with Client(args.address) as client:
+        if args.commands:
+            batches = [args.commands]
+        else:
+            batches = _batches(sys.stdin, args.batch_size)
+        for batch in batches:
+            for succeeded, output in client.pipeline(batch):
+                if succeeded:
+                    sys.stdout.write(output)
+                else:
+                    print(output)
+                    status = 1
+    return status
+
+
+if __name__ == "__main__":
+    exit(main())
@@ -0,0 +1,175 @@
+from typing import Dict, Iterator, Optional, Tuple, Union
+
+
+class VirtualDisk:
+    """
+    A thin-provisioned virtual hard disk. Its capacity is only a logical
+    limit: the disk is split into chunks of CHUNK_SIZE bytes, and a chunk
+    takes up memory only once something is written to it, so creating a disk
+    costs the same no matter how big it is. Bytes that were never written
+    read as zero.
+
+    Like the list of bytes it replaces, the disk is indexed and sliced with
+    offsets, and slices are clamped to its capacity. Slices read as `bytes`.
+
+    A disk can be layered on top of the first bytes of another one, which it
+    then reads through to without copying them and never writes to.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(
+        self,
+        capacity: int,
+        lower: Optional["VirtualDisk"] = None,
+        lower_size: int = 0,
+    ):
+        """
+        Create an empty disk.
+        :param capacity: The size of the disk, in bytes.
+        :param lower: The disk to layer this one on top of, if any.
+        :param lower_size: How many bytes at the start of the disk are read
+            from `lower`. They are read-only.
+        """
+        self.capacity = capacity
+        self.chunks: Dict[int, bytearray] = dict()
+        self.lower = lower
+        self.lower_size = lower_size if lower is not None else 0
+
+    def __len__(self) -> int:
+        return self.capacity
+
+    @property
+    def materialized(self) -> int:
+        """
+        :return: How many bytes of memory the chunks written so far take up.
+        """
+        return len(self.chunks) * self.CHUNK_SIZE
+
+    def __span(self, key: slice) -> Tuple[int, int]:
+        """
+        Translate a slice into start and stop offsets on the disk.
+        :param key: The slice.
+        :return: The clamped start and stop offsets.
+        """
+        start, stop = key.start, key.stop
+        if (
+            key.step is None
+            and start is not None
+            and stop is not None
+            and 0 <= start <= stop <= self.capacity
+        ):
+            # Offsets already on the disk, which is how the filesystem always
+            # slices it.
+            return start, stop
+        start, stop, step = key.indices(self.capacity)
+        if step != 1:
+            raise ValueError("Slices of a virtual disk can't have a step.")
+        return start, max(start, stop)
+
+    def __pieces(
+        self, start: int, stop: int
+    ) -> Iterator[Tuple[int, int, int, int]]:
+        """
+        Split a span of the disk up by the chunks it covers.
+        :param start: The start offset of the span.
+        :param stop: The stop offset of the span.
+        :return: An iterator of (chunk number, start offset in the chunk,
+            stop offset in the chunk, offset in the span) tuples.
+        """
+        position = start
+        while position < stop:
+            number, offset = divmod(position, self.CHUNK_SIZE)
+            end = min(self.CHUNK_SIZE, offset + stop - position)
+            yield number, offset, end, position - start
+            position += end - offset
+
+    def __getitem__(self, key: Union[int, slice]) -> Union[int, bytes]:
+        if isinstance(key, slice):
+            start, stop = self.__span(key)
+            if start < self.lower_size:
+                middle = min(stop, self.lower_size)
+                if middle == stop:
+                    return self.lower[start:stop]
+                return self.lower[start:middle] + self[middle:stop]
+            number, offset = divmod(start, self.CHUNK_SIZE)
+            if offset + stop - start <= self.CHUNK_SIZE:
+                # The common case of a span within a single chunk.
+                chunk = self.chunks.get(number, None)
+                if chunk is None:
+                    return bytes(stop - start)
+                return bytes(chunk[offset : offset + stop - start])
+            result = bytearray(stop - start)
+            for number, offset, end, position in self.__pieces(start, stop):
+                chunk = self.chunks.get(number, None)
+                if chunk is not None:
+                    result[position : position + end - offset] = chunk[
+                        offset:end
+                    ]
+            return bytes(result)
+        if not -self.capacity <= key < self.capacity:
+            raise IndexError("Virtual disk index out of range.")
+        key %= self.capacity
+        if key < self.lower_size:
+            return self.lower[key]
+        number, offset = divmod(key, self.CHUNK_SIZE)
+        chunk = self.chunks.get(number, None)
+        return chunk[offset] if chunk is not None else 0
+
+    def __setitem__(self, key: Union[int, slice], value) -> None:
+        if not isinstance(key, slice):
+            if not -self.capacity <= key < self.capacity:
+                raise IndexError("Virtual disk index out of range.")
+            key %= self.capacity
+            key, value = slice(key, key + 1), bytes([value])
+        start, stop = self.__span(key)
+        value = memoryview(value).cast("B")
+        if len(value) != stop - start:
+            raise ValueError("A virtual disk can't change size.")
+        if start < self.lower_size and start < stop:
+            raise ValueError("The lower layer of a virtual disk is read-only.")
+        for number, offset, end, position in self.__pieces(start, stop):
+            chunk = self.chunks.get(number, None)
+            if chunk is None:
+                chunk = self.chunks[number] = bytearray(self.CHUNK_SIZE)
+            chunk[offset:end] = value[position : position + end - offset]
+
+    def view(
+        self, start: int, stop: int
+    ) -> Tuple[Union[bytes, bytearray], int]:
+        """
+        Get at a span of the disk without copying it, when it lies within a
+        single chunk. Spans over more than one chunk are copied.
+        :param start: The start offset of the span.
+        :param stop: The stop offset of the span.
+        :return: A buffer holding the span, and where in the buffer it
+            starts. The buffer mustn't be changed.
+        """
+        if start < self.lower_size:
+            if stop <= self.lower_size:
+                return self.lower.view(start, stop)
+            return self[start:stop], 0
+        number, offset = divmod(start, self.CHUNK_SIZE)
+        if offset + stop - start > self.CHUNK_SIZE:
+            return self[start:stop], 0
+        chunk = self.chunks.get(number, None)
+        if chunk is None:
+            return bytes(stop - start), 0
+        return chunk, offset
+
+    def discard(self, start: int, stop: int) -> None:
+        """
+        Throw away the contents of a span of the disk. Chunks the span covers
+        completely are given back, and it reads as zero afterwards. Any part
+        of the span in the lower layer is left alone.
+        :param start: The start offset of the span.
+        :param stop: The stop offset of the span.
+        :return: None
+        """
+        start, stop = self.__span(slice(start, stop))
+        start = min(max(start, self.lower_size), stop)
+        for number, offset, end, _ in self.__pieces(start, stop):
+            if offset == 0 and end == self.CHUNK_SIZE:
+                self.chunks.pop(number, None)
+            elif number in self.chunks:
+                self.chunks[number][offset:end] = bytes(end - offset)
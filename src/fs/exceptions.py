@@ -28,3 +28,18 @@ class OutOfDisk(Exception):
     Exception thrown when trying to write to a file but the virtual disk is
     full.
     """
+
+
+class SymlinkLoop(Exception):
+    """
+    Exception thrown when resolving a path follows too many symbolic links,
+    usually because the links form a loop.
+    """
+
+
+class TransactionAborted(Exception):
+    """
+    Exception thrown when a transaction can't be committed, either because
+    one of its commands failed or because something it read was changed by
+    someone else in the meantime.
+    """
@@ -1,8 +1,33 @@
+import io
+import os
 import pickle
-from sys import getsizeof
-from typing import Dict, List
+import re
+import sys
+import tarfile
+from types import MappingProxyType
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
-from . import exceptions
+from . import exceptions, merkle, search
+from .cache import ContentCache
+from .disk import VirtualDisk
+from .handle import PAYLOAD_HEADER_SIZE, FileHandle, payload_span
+from .index import SortedIndex
+from .overlay import OverlayIndex
+from .transaction import DELETED, Transaction, TransactionIndex
+from .watch import CREATE, DELETE, MODIFY, MOVE, Event, Watch
+
+# The children of every file: nothing, shared rather than an empty dict each.
+NO_CHILDREN = MappingProxyType(dict())
 
 
 class INode:
@@ -12,6 +37,23 @@ class INode:
     both the same underlying object, an inode.
     """
 
+    # Slots rather than a per-instance dict keep trees of millions of inodes
+    # small.
+    __slots__ = (
+        "is_directory",
+        "children",
+        "parent",
+        "path",
+        "link",
+        "hardlinks",
+        "reference_count",
+        "data",
+        "escaped",
+        "reserved",
+        "reservation_size",
+        "digest",
+    )
+
     def __init__(
         self,
         path: str = "",
@@ -20,7 +62,13 @@ class INode:
         link: str = "",
     ):
         self.is_directory = is_directory
-        self.children = {".": path, "..": parent} if is_directory else dict()
+        # Directories keep their children in a SortedIndex so that listings
+        # come out in order and prefix lookups are range scans.
+        self.children = (
+            SortedIndex({".": path, "..": parent})
+            if is_directory
+            else NO_CHILDREN
+        )
         self.parent = parent
         self.path = path
         self.link = link
@@ -28,37 +76,157 @@ class INode:
         self.reference_count = 1
         # Data here is represented as a list of two element tuples, where each
         # element represents a start & stop index of a particular block of
-        # data in the allocated hard disk block.
+        # data in the allocated hard disk block. Holes, runs of zero bytes
+        # that aren't stored anywhere, are (None, length) tuples instead.
         self.data: List[tuple] = []
+        # Bytes that aren't valid UTF-8 are stored as surrogate escapes. Once
+        # a file holds any, its bytes no longer match what is on the hard disk
+        # and its data must be decoded to be read.
+        self.escaped = False
+        # The [start, stop) span of the hard disk set aside for the next
+        # appends to the file, if any, and how big the last reservation was.
+        self.reserved: Optional[List[int]] = None
+        self.reservation_size = 0
+        # The Merkle digest of the inode, or None until it's needed again
+        # after something below it changed.
+        self.digest: Optional[bytes] = None
+
+    def copy(self) -> "INode":
+        """
+        Make a copy of the inode that can be changed without changing this
+        one. The copy doesn't share this inode's reservation.
+        :return: The copy.
+        """
+        node = INode.__new__(INode)
+        node.update(self)
+        if self.is_directory:
+            node.children = self.children.copy()
+        node.hardlinks = dict(self.hardlinks)
+        node.data = list(self.data)
+        node.reserved = None
+        return node
+
+    def update(self, other: "INode") -> None:
+        """
+        Set every attribute of the inode to that of another one.
+        :param other: The inode to take the attributes of.
+        :return: None
+        """
+        for name in INode.__slots__:
+            setattr(self, name, getattr(other, name))
+
+
+class SymLink:
+    """
+    A symbolic link. Unlike hardlinks, which are full inodes, a symlink is
+    only a reference to the path of its source at the time it was created, so
+    it only keeps the few attributes needed to find it and follow it.
+    """
+
+    __slots__ = ("path", "parent", "link", "digest")
+    is_directory = False
+
+    def __init__(self, path: str, parent: str, link: str):
+        self.path = path
+        self.parent = parent
+        self.link = link
+        self.digest: Optional[bytes] = None
+
+    def copy(self) -> "SymLink":
+        return SymLink(self.path, self.parent, self.link)
 
 
 class FileSystem:
+    # The most symlinks a single path lookup may follow before giving up, the
+    # same limit Linux uses.
+    MAX_SYMLINK_DEPTH = 40
+    # Bulk imports store file contents in runs of at most this many files or
+    # bytes, whichever comes first.
+    IMPORT_BATCH_FILES = 4096
+    IMPORT_BATCH_BYTES = 1 << 22
+    TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+    # Files appended to more than once reserve space for their next appends,
+    # starting at this many bytes and doubling up to the maximum.
+    MIN_RESERVATION = 1 << 10
+    MAX_RESERVATION = 1 << 20
+    # Searches through at least this many bytes of data are split across
+    # worker processes.
+    PARALLEL_SEARCH_BYTES = 1 << 24
+
     def __init__(
         self,
         interactive: bool = False,
-        commands: List[str] = None,
+        commands: Iterable[str] = None,
         hard_disk_capacity: int = 1000,
+        content_cache_size: int = 0,
+        lower: Optional["FileSystem"] = None,
     ):
         """
         Initialize an empty filesystem.
         :param interactive: If True, consume commands from user input instead.
         :param commands: If passed, rely on a list of strings of commands
-            instead.
+            instead. Any iterable works, including generators and open files,
+            and commands are consumed one at a time as they are executed.
         :param hard_disk_capacity: An integer denoting the capacity of the
         virtual hard disk, in bytes.
+        :param content_cache_size: If non-zero, cache the contents of files
+            that are read, keeping up to this many bytes of their data.
+        :param lower: If passed, make this filesystem an overlay of `lower`
+            instead: it starts out with everything in `lower`, but only
+            stores what it changes itself, and `hard_disk_capacity` is how
+            many bytes of new data it can hold. `lower` is shared, and
+            mustn't be changed for as long as any overlay of it is in use.
         """
         self.interactive = interactive
         self.current_location = ""
         self.commands = commands
-        # TODO: Allow files and directories to share names
-        # We could make the index a tuple of both the path and the type of
-        # the node such that file and directories can share a namespace.
-        root_inode = INode(
-            path="", is_directory=True, parent=self.current_location
+        self.lower = lower
+        # The hard disk is thin-provisioned: it only takes up memory where it
+        # has been written to, however big its capacity.
+        if lower is None:
+            # TODO: Allow files and directories to share names
+            # We could make the index a tuple of both the path and the type
+            # of the node such that file and directories can share a
+            # namespace.
+            root_inode = INode(
+                path="", is_directory=True, parent=self.current_location
+            )
+            self.inode_index = {self.current_location: root_inode}
+            self.hard_disk = VirtualDisk(int(hard_disk_capacity))
+            self.hard_disk_index = 0
+        else:
+            # The hard disk of an overlay reads the data of the lower
+            # filesystem through from its disk, and stores new data after it.
+            self.inode_index = OverlayIndex(lower.inode_index)
+            self.hard_disk = VirtualDisk(
+                lower.hard_disk_index + int(hard_disk_capacity),
+                lower=lower.hard_disk,
+                lower_size=lower.hard_disk_index,
+            )
+            self.hard_disk_index = lower.hard_disk_index
+        # Files holding a reservation, and spans of the hard disk given back
+        # by reservations that couldn't be returned to the end of the disk.
+        self.reserved_inodes: Set[INode] = set()
+        self.free_space: List[Tuple[int, int]] = []
+        self.content_cache = (
+            ContentCache(content_cache_size) if content_cache_size else None
         )
-        self.inode_index = {self.current_location: root_inode}
-        self.hard_disk = [None] * int(hard_disk_capacity)
-        self.hard_disk_index = 0
+        # Watches by the absolute path they watch, and how many of them are
+        # recursive.
+        self.watches: Dict[str, List[Watch]] = dict()
+        self.recursive_watches = 0
+        # The open transaction of the current session, if any. While any
+        # transaction is open, every change bumps the version of the paths
+        # it touches, so that commits can detect conflicts.
+        self.transaction: Optional[Transaction] = None
+        self.open_transactions = 0
+        self.versions: Optional[Dict[str, int]] = None
+        # Symlink resolution cache: the path of a symlink maps to the path it
+        # resolved to, along with every path that resolution depended on.
+        # `symlink_dependents` is the reverse mapping used to invalidate
+        # entries when one of those paths is moved or removed.
+        self.symlink_cache: Dict[str, Tuple[str, List[str]]] = dict()
+        self.symlink_dependents: Dict[str, Set[str]] = dict()
 
     def __create_new_inode(
         self, name: str, parent: str, is_directory: bool
@@ -74,16 +242,18 @@ class FileSystem:
         :return: None
         """
         parent_node = self.inode_index[parent]
+        if not parent_node.is_directory:
+            raise exceptions.ImproperArguments(f"{parent} is not a directory.")
         new_node_path = parent + "/" + name
         if new_node_path not in parent_node.children.keys():
+            parent_node = self.__writable(parent_node)
             new_node = INode(
                 path=new_node_path, is_directory=is_directory, parent=parent
             )
-            if is_directory:
-                new_node.children = {".": new_node_path, "..": parent}
             self.inode_index[new_node_path] = new_node
             parent_node.children[new_node_path] = new_node
             self.inode_index[parent] = parent_node
+            self.__notify(CREATE, new_node_path)
         else:
             raise exceptions.NodeAlreadyExists(
                 f"Filesystem item with name {new_node_path} already exists."
@@ -110,14 +280,24 @@ class FileSystem:
                 item.split("/")[-1], parent_node.path, directories
             )
 
-    def __find_node(self, path: str, parent: bool = False) -> INode:
+    def __find_node(
+        self,
+        path: str,
+        parent: bool = False,
+        follow: bool = True,
+        chain: List[str] = None,
+    ) -> Union[INode, SymLink]:
         """
         Find a node in the filesystem. Essentially a translator of a path that
         may include special characters (./..) into the node of the absolute
-        path.
+        path. Symlinks met along the way are followed.
         :param path: A /-delimited path that must be traversed.
         :param parent: If True, return the parent of the passed absolute path
             instead.
+        :param follow: If False and the path names a symlink, return the
+            symlink itself rather than the node it points to.
+        :param chain: The symlinks already followed to get here, when this
+            lookup is resolving a symlink.
         :return: The inode for a given path.
         """
         split_path = path.split("/")
@@ -128,13 +308,30 @@ class FileSystem:
             # leading '/', indicating we start at the root instead.
             current_path = ""
             split_path.pop(0)
+        items = split_path[: -1 if parent else len(split_path)]
+        if ".." not in items:
+            # Keys of the index are the real paths of nodes, so if the whole
+            # path is one, no directory above it can be a symlink and the
+            # node is found without building the path of each of them.
+            names = [item for item in items if item not in [".", ""]]
+            node = self.inode_index.get("/".join([current_path, *names]))
+            if node is not None:
+                if isinstance(node, SymLink) and (
+                    follow or items[-1] in [".", ""]
+                ):
+                    node = self.__resolve_symlink(
+                        node, chain if chain is not None else []
+                    )
+                return node
         node = self.inode_index[current_path]
-        for item in split_path[: -1 if parent else len(split_path)]:
-            if item == ".":
+        for position, item in enumerate(items):
+            if item in [".", ""]:
+                # Empty items come from the root itself ("/") or from
+                # repeated slashes, and are skipped just like ".".
                 continue
             elif item == "..":
                 node = self.inode_index[node.parent]
-                current_path = node.parent
+                current_path = node.path
             else:
                 current_path = current_path + "/" + item
                 node = self.inode_index.get(current_path, None)
@@ -142,31 +339,127 @@ class FileSystem:
                     raise exceptions.PathException(
                         f"Path {path} does not exist."
                     )
+                if isinstance(node, SymLink) and (
+                    follow or position < len(items) - 1
+                ):
+                    node = self.__resolve_symlink(
+                        node, chain if chain is not None else []
+                    )
+                    current_path = node.path
+        return node
+
+    def __resolve_symlink(self, link: SymLink, chain: List[str]) -> INode:
+        """
+        Find the node a symlink points to, following any further symlinks.
+        Resolutions are cached until one of the paths they went through is
+        moved or removed.
+        :param link: The symlink to resolve.
+        :param chain: The symlinks already followed by the current lookup.
+        :return: The node the symlink resolves to.
+        """
+        chain.append(link.path)
+        if len(chain) > self.MAX_SYMLINK_DEPTH:
+            raise exceptions.SymlinkLoop(
+                f"Too many levels of symbolic links in {chain[0]}."
+            )
+        cached = self.symlink_cache.get(link.path, None)
+        if cached:
+            chain.extend(cached[1])
+            return self.inode_index[cached[0]]
+        start = len(chain)
+        node = self.__find_node(link.link, chain=chain)
+        dependencies = chain[start:] + [node.path]
+        self.symlink_cache[link.path] = (node.path, dependencies)
+        for dependency in dependencies + [link.path]:
+            self.symlink_dependents.setdefault(dependency, set()).add(
+                link.path
+            )
         return node
 
-    def ls(self, paths: List[str], match: str = "") -> None:
+    def __invalidate_symlinks(self, path: str) -> None:
+        """
+        Forget every cached symlink resolution that went through `path`,
+        because the node there is being moved or removed.
+        :param path: The absolute path of the node.
+        :return: None
+        """
+        for link_path in self.symlink_dependents.pop(path, ()):
+            self.symlink_cache.pop(link_path, None)
+
+    def ls(
+        self,
+        paths: List[str],
+        match: str = "",
+        start: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> Optional[str]:
         """
         List the contents of given directories indicated by `paths`. Also allow
         supplying a match, which can be used to restrict the output to specific
-        patterns.
+        patterns. A match ending in `*` selects every item starting with the
+        rest of the match. A big directory can be listed a part at a time by
+        passing the key returned by each call as the `start` of the next.
         :param paths: A list of paths to list against.
         :param match: A string that needs to be matched in order to count for
             output.
-        :return: None
+        :param start: The key of the first child to list, if not the first.
+        :param limit: The most children to list of each directory.
+        :return: The key of the first child that wasn't listed because of
+            `limit`, or None if every child was.
         """
         if not paths:
             # Default argument for ls is the current working directory.
             paths = ["."]
         for path in paths:
             node = self.__find_node(path)
-            for item in node.children.keys():
+            if start is not None and node.is_directory:
+                items = node.children.irange(start=start)
+            elif not match:
+                items = iter(node.children)
+            elif match.endswith("*"):
+                items = node.children.prefix(f"{node.path}/{match[:-1]}")
+            elif f"{node.path}/{match}" in node.children:
+                items = iter([f"{node.path}/{match}"])
+            else:
+                continue
+            listed = 0
+            for item in items:
                 item_node = self.inode_index.get(item, None)
-                cwd_scoped_item = item.split("/")[-1]
-                if (match and cwd_scoped_item == match) or not match:
-                    if item_node:
-                        print(
-                            f"{'/' if item_node.is_directory else ''}{cwd_scoped_item}"
-                        )
+                if item_node:
+                    if listed == limit:
+                        return item
+                    print(
+                        f"{'/' if item_node.is_directory else ''}{item.split('/')[-1]}"
+                    )
+                    listed += 1
+        return None
+
+    def count_entries(self, path: str, location: str) -> int:
+        """
+        Count the children of a directory without changing anything, not
+        even the working directory, so it's safe while another command runs.
+        What's counted is what has been committed, even while the command
+        running is in a transaction. Only paths naming a directory directly
+        are counted, so a path through a symlink or `..` counts as empty.
+        :param path: The path of the directory.
+        :param location: The working directory `path` is relative to.
+        :return: The number of children, or 0 if there's no such directory.
+        """
+        if not path.startswith("/"):
+            path = f"{location}/{path}"
+        names = [name for name in path.split("/") if name not in [".", ""]]
+        if ".." in names:
+            return 0
+        index = self.inode_index
+        if isinstance(index, TransactionIndex):
+            # Looking a path up in a transaction's view copies the node into
+            # it and adds the path to what the transaction has read.
+            index = index.base
+        node = index.get("".join(f"/{name}" for name in names))
+        if not isinstance(node, INode) or not node.is_directory:
+            return 0
+        # Every directory has "." and ".." among its children too.
+        return len(node.children) - 2
 
     def touch(self, inputs: List[str]) -> None:
         """
@@ -212,25 +505,41 @@ class FileSystem:
                     node_path = parent_node.parent
                 else:
                     node_path = parent_node.path + "/" + last_item
-                node = self.inode_index[node_path]
-                if (
+                node = self.inode_index.get(node_path, None)
+                if not node:
+                    raise exceptions.PathException(
+                        f"Path {path} does not exist."
+                    )
+                self.__invalidate_symlinks(node_path)
+                if isinstance(node, SymLink):
+                    parent_node = self.__writable(parent_node)
+                    del parent_node.children[node_path]
+                    del self.inode_index[node_path]
+                    self.__notify(DELETE, node_path)
+                elif (
                     node.is_directory and len(node.children) == 2
                 ) or not node.is_directory:
+                    parent_node = self.__writable(parent_node)
+                    node = self.__writable(node)
                     del parent_node.children[node_path]
                     self.inode_index[parent_node.path] = parent_node
+                    if node.link:
+                        # Removing a hardlink drops its reference to the
+                        # source.
+                        source_node = self.inode_index.get(node.link, None)
+                        if source_node:
+                            source_node = self.__writable(source_node)
+                            source_node.reference_count -= 1
+                            source_node.hardlinks.pop(node_path, None)
+                            self.__changed(source_node.path)
                     node.reference_count -= 1
                     if node.reference_count <= 0:
                         # Clean up any data that the file created
-                        if node.data:
-                            for data_tuple in node.data:
-                                for index in range(
-                                    data_tuple[0], data_tuple[1]
-                                ):
-                                    self.hard_disk[index] = None
-                        # TODO: Reclaim vacant space in hard disk
+                        self.__free_data(node)
                         del self.inode_index[node_path]
                     else:
                         self.inode_index[node_path] = node
+                    self.__notify(DELETE, node_path)
                 else:
                     raise exceptions.DirectoryNonEmpty(
                         f"Directory {node_path} isn't empty."
@@ -263,35 +572,68 @@ class FileSystem:
             target = inputs[-1]
             target_node = self.__find_node(target)
             if target_node.is_directory:
+                target_node = self.__writable(target_node)
                 for source in sources:
                     try:
-                        source_node = self.__find_node(source)
+                        # Moving a symlink moves the link itself, while
+                        # copying one copies the file it points to.
+                        source_node = self.__find_node(source, follow=not move)
                         new_path = f"{target_node.path}/{source.split('/')[-1]}"
                         # TODO: Implement directory copy
-                        if not source_node.is_directory:
+                        if isinstance(source_node, SymLink):
+                            copied_node = SymLink(
+                                path=new_path,
+                                parent=target_node.path,
+                                link=source_node.link,
+                            )
+                        elif not source_node.is_directory:
                             copied_node = INode(
                                 path=new_path, parent=target_node.path
                             )
-                            target_node.children[new_path] = copied_node
-                            self.inode_index[new_path] = copied_node
-
-                            # Propagate this change to all hardlinks
-                            for link_path in source_node.hardlinks:
-                                link_node = self.inode_index[link_path]
-                                link_node.link = new_path
-                                self.inode_index[link_path] = link_node
                             if move:
-                                parent_node_of_source = self.inode_index[
-                                    source_node.parent
-                                ]
-                                del parent_node_of_source.children[
-                                    source_node.path
-                                ]
-                                del self.inode_index[source_node.path]
+                                # A moved file keeps its data and links.
+                                source_node = self.__writable(source_node)
+                                copied_node.data = source_node.data
+                                copied_node.escaped = source_node.escaped
+                                copied_node.hardlinks = source_node.hardlinks
+                                copied_node.reference_count = (
+                                    source_node.reference_count
+                                )
+                                self.__move_reservation(
+                                    source_node, copied_node
+                                )
+                            elif source_node.data:
+                                self.__append_data(
+                                    copied_node, self.__read_data(source_node)
+                                )
+                            if move:
+                                # Propagate this change to all hardlinks
+                                for link_path in source_node.hardlinks:
+                                    link_node = self.__writable(
+                                        self.inode_index[link_path]
+                                    )
+                                    link_node.link = new_path
+                                    self.inode_index[link_path] = link_node
+                                    self.__changed(link_path)
                         else:
                             raise exceptions.ImproperArguments(
                                 "Operation unsupported on directories."
                             )
+                        self.__invalidate_symlinks(new_path)
+                        target_node.children[new_path] = copied_node
+                        self.inode_index[new_path] = copied_node
+                        if move:
+                            self.__invalidate_symlinks(source_node.path)
+                            parent_node_of_source = self.__writable(
+                                self.inode_index[source_node.parent]
+                            )
+                            del parent_node_of_source.children[
+                                source_node.path
+                            ]
+                            del self.inode_index[source_node.path]
+                            self.__notify(MOVE, source_node.path, new_path)
+                        else:
+                            self.__notify(CREATE, new_path)
 
                     except exceptions.PathException as e:
                         print(e)
@@ -310,7 +652,8 @@ class FileSystem:
         """
         Find some items in the current directory. We use the `ls` method here
         because we can specify to `ls` that we only want to return items
-        that match the item names.
+        that match the item names. A name ending in `*` finds every item
+        starting with the rest of the name.
         :param names: List of names we want to find in the current working
             directory.
         :return: None
@@ -345,6 +688,662 @@ class FileSystem:
             raise exceptions.ImproperArguments("pwd: too many arguments")
         print(self.current_location + "/")
 
+    @staticmethod
+    def __is_escaped(contents: str) -> bool:
+        """
+        Check whether a string holds surrogate escapes of bytes that weren't
+        valid UTF-8.
+        :param contents: The string to check.
+        :return: True if the string can't be encoded as plain UTF-8.
+        """
+        try:
+            contents.encode()
+        except UnicodeEncodeError:
+            return True
+        return False
+
+    def __writable(self, node: Union[INode, SymLink]) -> Union[INode, SymLink]:
+        """
+        Get the version of a node that can be changed. In an overlay, nodes
+        that are still only in the lower filesystem are copied up into this
+        one first; everywhere else the node itself is returned.
+        :param node: A node in the inode index.
+        :return: The node to change.
+        """
+        if isinstance(self.inode_index, OverlayIndex):
+            return self.inode_index.copy_up(node.path)
+        return node
+
+    def __free_data(self, node: INode) -> None:
+        """
+        Throw away all of the data of a file.
+        :param node: The file inode.
+        :return: None
+        """
+        transaction = self.transaction
+        if transaction is not None and transaction.active:
+            # The data may still be committed data, so it can only be thrown
+            # away once the transaction commits.
+            transaction.freed.extend(
+                extent for extent in node.data if extent[0] is not None
+            )
+        else:
+            for data_tuple in node.data:
+                if data_tuple[0] is not None:
+                    self.hard_disk.discard(data_tuple[0], data_tuple[1])
+        # TODO: Reclaim vacant space in hard disk
+        node.data = []
+        node.escaped = False
+        self.__release(node)
+        if self.content_cache is not None:
+            self.content_cache.invalidate(node)
+
+    def __load_extent(
+        self, extent: tuple, decode: bool
+    ) -> Tuple[Optional[int], int, Optional[bytes]]:
+        """
+        Find the contents of a block of data as bytes. Unless the block must
+        be decoded, this only parses the header of the pickled string, and
+        the contents are then wherever its payload is on the hard disk.
+        :param extent: The (start, stop) tuple of the block.
+        :param decode: If True, unpickle the block instead.
+        :return: A tuple of where the contents start on the hard disk, their
+            length, and the decoded contents if they had to be decoded. Holes
+            start nowhere and have no contents.
+        """
+        start, stop = extent
+        if start is None:
+            return None, stop, None
+        if not decode:
+            span = payload_span(
+                bytes(
+                    self.hard_disk[
+                        start : min(stop, start + PAYLOAD_HEADER_SIZE)
+                    ]
+                )
+            )
+            if span and start + span[1] <= stop:
+                return start + span[0], span[1] - span[0], None
+        contents = pickle.loads(bytes(self.hard_disk[start:stop])).encode(
+            "utf-8", "surrogateescape"
+        )
+        return 0, len(contents), contents
+
+    def __release(self, node: INode) -> None:
+        """
+        Give the unused part of a file's reservation back. Space at the end of
+        the hard disk is handed back to it directly, anything else goes on
+        the free space list.
+        :param node: The file inode.
+        :return: None
+        """
+        if not node.reserved:
+            return
+        start, stop = node.reserved
+        node.reserved = None
+        self.reserved_inodes.discard(node)
+        self.__give_back(start, stop)
+
+    def __give_back(self, start: int, stop: int) -> None:
+        """
+        Return a span of the hard disk that holds nothing to be allocated
+        again.
+        :param start: The start of the span.
+        :param stop: The stop of the span.
+        :return: None
+        """
+        if start == stop:
+            return
+        if stop != self.hard_disk_index:
+            self.free_space.append((start, stop))
+            return
+        self.hard_disk_index = start
+        # Spans given back earlier may now be at the end of the disk too.
+        while True:
+            for position, (free_start, free_stop) in enumerate(
+                self.free_space
+            ):
+                if free_stop == self.hard_disk_index:
+                    del self.free_space[position]
+                    self.hard_disk_index = free_start
+                    break
+            else:
+                return
+
+    def __move_reservation(self, source: INode, destination: INode) -> None:
+        """
+        Hand the reservation of a file over to the inode replacing it when
+        it's moved.
+        :param source: The inode of the file before the move.
+        :param destination: The inode of the file after the move.
+        :return: None
+        """
+        if source.reserved:
+            destination.reserved = source.reserved
+            source.reserved = None
+            self.reserved_inodes.discard(source)
+            self.reserved_inodes.add(destination)
+        destination.reservation_size = source.reservation_size
+        if self.content_cache is not None:
+            self.content_cache.invalidate(source)
+
+    def __allocate(self, size: int, node: INode = None) -> int:
+        """
+        Find `size` free bytes on the virtual hard disk, keeping track of
+        them if a transaction is running.
+        :param size: The number of bytes needed.
+        :param node: The file the bytes are for, if any.
+        :return: The start of the allocated bytes.
+        """
+        start = self.__take(size, node)
+        transaction = self.transaction
+        if transaction is not None and transaction.active:
+            transaction.allocated.append((start, start + size))
+        return start
+
+    def __take(self, size: int, node: INode = None) -> int:
+        """
+        Take `size` free bytes from the reservation of `node` when it has
+        room, otherwise from the end of the hard disk, and failing that from
+        the free space list. When the disk is full, every reservation is
+        released before giving up.
+        :param size: The number of bytes needed.
+        :param node: The file the bytes are for, if any.
+        :return: The start of the bytes.
+        """
+        if node and node.reserved:
+            start, stop = node.reserved
+            if stop - start >= size:
+                node.reserved[0] += size
+                return start
+        for reclaim in [False, True]:
+            if reclaim:
+                for reserved_node in list(self.reserved_inodes):
+                    self.__release(reserved_node)
+            if self.hard_disk_index + size <= len(self.hard_disk):
+                start = self.hard_disk_index
+                self.hard_disk_index += size
+                return start
+            for position, (start, stop) in enumerate(self.free_space):
+                if stop - start >= size:
+                    if stop - start == size:
+                        del self.free_space[position]
+                    else:
+                        self.free_space[position] = (start + size, stop)
+                    return start
+            if not self.reserved_inodes:
+                break
+        raise exceptions.OutOfDisk("Out of virtual disk space.")
+
+    def __reserve(self, node: INode, size: int) -> bool:
+        """
+        Set aside at least `size` bytes at the end of the hard disk for the
+        next appends to a file. A reservation already at the end of the disk
+        is grown in place, so appends keep landing right after each other.
+        :param node: The file inode.
+        :param size: The number of bytes to reserve.
+        :return: True if the space was reserved, False if the disk is too
+            full to do so.
+        """
+        if node.reserved and node.reserved[1] == self.hard_disk_index:
+            available = node.reserved[1] - node.reserved[0]
+            if self.hard_disk_index + size - available > len(self.hard_disk):
+                return False
+            self.hard_disk_index += size - available
+            node.reserved[1] = self.hard_disk_index
+        else:
+            if self.hard_disk_index + size > len(self.hard_disk):
+                return False
+            self.__release(node)
+            node.reserved = [self.hard_disk_index, self.hard_disk_index + size]
+            self.hard_disk_index += size
+        self.reserved_inodes.add(node)
+        return True
+
+    def __append_data(self, node: INode, contents: str) -> None:
+        """
+        Serialize a string and append it to the data of a file. Once a file
+        is appended to a second time, space is reserved for its next appends
+        in doubling chunks so that they are stored contiguously.
+        :param node: The file inode the data belongs to.
+        :param contents: The string to store.
+        :return: None
+        """
+        data = pickle.dumps(contents)
+        available = node.reserved[1] - node.reserved[0] if node.reserved else 0
+        if node.data and available < len(data):
+            node.reservation_size = min(
+                max(node.reservation_size * 2, self.MIN_RESERVATION),
+                self.MAX_RESERVATION,
+            )
+            self.__reserve(node, max(node.reservation_size, len(data)))
+        start = self.__allocate(len(data), node)
+        self.hard_disk[start : start + len(data)] = data
+        node.data.append((start, start + len(data)))
+        node.escaped = node.escaped or self.__is_escaped(contents)
+        if self.content_cache is not None:
+            self.content_cache.invalidate(node)
+        self.__notify_modified(node)
+
+    def __read_data(self, node: INode) -> str:
+        """
+        Deserialize every block of data belonging to a file. Blocks stored
+        back to back, like the appends landing in a reservation, are copied
+        off the hard disk together. Contents are served from the content
+        cache instead when it has them.
+        :param node: The file inode to read.
+        :return: The contents of the file.
+        """
+        if self.content_cache is not None:
+            cached = self.content_cache.get(node)
+            if cached is not None:
+                return cached
+        blocks = []
+        position = 0
+        while position < len(node.data):
+            if node.data[position][0] is None:
+                blocks.append("\0" * node.data[position][1])
+                position += 1
+                continue
+            end = position + 1
+            while end < len(node.data) and (
+                node.data[end][0] == node.data[end - 1][1]
+            ):
+                end += 1
+            run_start, run_stop = node.data[position][0], node.data[end - 1][1]
+            run = memoryview(bytes(self.hard_disk[run_start:run_stop]))
+            for start, stop in node.data[position:end]:
+                blocks.append(
+                    pickle.loads(run[start - run_start : stop - run_start])
+                )
+            position = end
+        contents = "".join(blocks)
+        if self.content_cache is not None:
+            self.content_cache.put(node, contents, self.__data_size(node))
+        return contents
+
+    @staticmethod
+    def __data_size(node: INode) -> int:
+        """
+        :param node: A file inode.
+        :return: How many bytes the blocks of data of the file take up,
+            counting holes as the zero bytes they read as.
+        """
+        return sum(
+            stop if start is None else stop - start
+            for start, stop in node.data
+        )
+
+    def __append_hole(self, node: INode, length: int) -> None:
+        """
+        Append a hole to the data of a file: a run of zero bytes that takes
+        up no space on the hard disk. It's merged into the last block of data
+        of the file if that's a hole too.
+        :param node: The file inode.
+        :param length: How many zero bytes the hole reads as.
+        :return: None
+        """
+        if node.data and node.data[-1][0] is None:
+            node.data[-1] = (None, node.data[-1][1] + length)
+        else:
+            node.data.append((None, length))
+        if self.content_cache is not None:
+            self.content_cache.invalidate(node)
+        self.__notify_modified(node)
+
+    def __append_data_many(self, pending: List[Tuple[INode, str]]) -> None:
+        """
+        Serialize the data of many files and store all of it in a single
+        contiguous run of the virtual hard disk, checking the capacity once
+        and copying everything in with one slice assignment.
+        :param pending: A list of (file inode, string to append) tuples.
+        :return: None
+        """
+        payloads = [pickle.dumps(contents) for _, contents in pending]
+        run = b"".join(payloads)
+        start = self.__allocate(len(run))
+        self.hard_disk[start : start + len(run)] = run
+        for (node, contents), payload in zip(pending, payloads):
+            node.data.append((start, start + len(payload)))
+            node.escaped = node.escaped or self.__is_escaped(contents)
+            if self.content_cache is not None:
+                self.content_cache.invalidate(node)
+            self.__notify_modified(node)
+            start += len(payload)
+
+    def __make_directories(self, path: str) -> INode:
+        """
+        Find a directory by its absolute path, creating it and any missing
+        parents along the way.
+        :param path: The absolute path of the directory.
+        :return: The directory's inode.
+        """
+        node = self.inode_index[""]
+        for item in path.split("/")[1:]:
+            child = self.inode_index.get(f"{node.path}/{item}", None)
+            if not child:
+                self.__create_new_inode(item, node.path, True)
+                child = self.inode_index[f"{node.path}/{item}"]
+            elif not child.is_directory:
+                raise exceptions.ImproperArguments(
+                    f"{child.path} is not a directory."
+                )
+            node = child
+        return node
+
+    @staticmethod
+    def __host_entries(
+        source: str,
+    ) -> Iterator[Tuple[str, bool, Callable[[], bytes]]]:
+        """
+        Stream the entries of a host directory or tar archive, parents before
+        their children. Only directories and regular files are included.
+        :param source: The path of the directory or archive on the host.
+        :return: An iterator of (relative path, is directory, function
+            returning the file's contents) tuples.
+        """
+        if os.path.isdir(source):
+            for root, directories, files in os.walk(source):
+                directories.sort()
+                relative_root = os.path.relpath(root, source)
+                relative_root = "" if relative_root == "." else relative_root
+                if relative_root:
+                    yield relative_root, True, bytes
+                for name in sorted(files):
+                    host_path = os.path.join(root, name)
+                    if os.path.isfile(host_path):
+
+                        def read(host_path=host_path):
+                            with open(host_path, "rb") as handle:
+                                return handle.read()
+
+                        yield os.path.join(relative_root, name), False, read
+        elif os.path.isfile(source) and tarfile.is_tarfile(source):
+            # Stream mode reads the archive front to back exactly once.
+            with tarfile.open(source, "r|*") as archive:
+                for member in archive:
+                    parts = [
+                        part
+                        for part in member.name.split("/")
+                        if part not in ["", "."]
+                    ]
+                    if not parts or ".." in parts:
+                        continue
+                    if member.isdir():
+                        yield "/".join(parts), True, bytes
+                    elif member.isfile():
+                        handle = archive.extractfile(member)
+                        yield "/".join(parts), False, handle.read
+        else:
+            raise exceptions.PathException(
+                f"Host path {source} is not a directory or tar archive."
+            )
+
+    @staticmethod
+    def __host_error(
+        action: str, path: str, error: Exception
+    ) -> exceptions.PathException:
+        """
+        Turn an error reading from or writing to the host into one that is
+        reported like any other bad path.
+        :param action: What was being done, like "import" or "export to".
+        :param path: The host path.
+        :param error: The OSError or tarfile error that was raised.
+        :return: The exception to raise instead.
+        """
+        reason = getattr(error, "strerror", None) or str(error)
+        return exceptions.PathException(
+            f"Could not {action} {path}: {reason.rstrip('.')}."
+        )
+
+    def import_tree(self, inputs: List[str]) -> None:
+        """
+        Import a directory tree or a tar archive from the host. Rather than
+        going through a `mkdir`, `touch` and `write` command per entry, inodes
+        are created directly and file contents are stored in large contiguous
+        runs on the virtual hard disk. Existing directories are merged into.
+        :param inputs: A host directory or tar archive, optionally followed by
+            the directory to import it into. Defaults to the current working
+            directory.
+        :return: None
+        """
+        if len(inputs) in [1, 2]:
+            target_node = self.__find_node(inputs[1] if inputs[1:] else ".")
+            if not target_node.is_directory:
+                raise exceptions.ImproperArguments(
+                    "Cannot import into a file."
+                )
+            pending: List[Tuple[INode, str]] = []
+            pending_bytes = 0
+            # Files created since contents were last stored, which are
+            # removed again if the import fails before theirs are.
+            created: List[str] = []
+            try:
+                for relative, is_directory, read in self.__host_entries(
+                    inputs[0]
+                ):
+                    path = f"{target_node.path}/{relative}"
+                    if is_directory:
+                        self.__make_directories(path)
+                        continue
+                    parent_path, name = path.rsplit("/", 1)
+                    parent_node = self.__make_directories(parent_path)
+                    self.__create_new_inode(name, parent_node.path, False)
+                    created.append(path)
+                    contents = read()
+                    if contents:
+                        pending.append(
+                            (
+                                self.inode_index[path],
+                                contents.decode("utf-8", "surrogateescape"),
+                            )
+                        )
+                        pending_bytes += len(contents)
+                    if (
+                        len(pending) >= self.IMPORT_BATCH_FILES
+                        or pending_bytes >= self.IMPORT_BATCH_BYTES
+                    ):
+                        self.__append_data_many(pending)
+                        pending, pending_bytes, created = [], 0, []
+                if pending:
+                    self.__append_data_many(pending)
+            except Exception as e:
+                for path in reversed(created):
+                    self.rm([path])
+                if isinstance(e, (OSError, tarfile.TarError)):
+                    raise self.__host_error("import", inputs[0], e) from e
+                raise
+        else:
+            raise exceptions.ImproperArguments(
+                "Usage: import <host_directory_or_tar> [directory]"
+            )
+
+    def __walk(self, node: INode) -> Iterator[Tuple[str, INode]]:
+        """
+        Walk the subtree below a directory, parents before their children.
+        Symlinks are skipped, and hardlinks are replaced by their source.
+        :param node: The directory to walk.
+        :return: An iterator of (path relative to `node`, inode) tuples.
+        """
+        stack = [node]
+        while stack:
+            directory = stack.pop()
+            children = [
+                self.inode_index.get(item, None)
+                for item in directory.children.keys()
+                if item not in [".", ".."]
+            ]
+            for child in reversed(children):
+                if not child or isinstance(child, SymLink):
+                    continue
+                if child.link:
+                    source_node = self.inode_index.get(child.link, None)
+                    if not source_node:
+                        continue
+                    child = INode(path=child.path, parent=child.parent)
+                    child.data = source_node.data
+                    child.escaped = source_node.escaped
+                yield child.path[len(node.path) + 1 :], child
+                if child.is_directory:
+                    stack.append(child)
+
+    def export_tree(self, inputs: List[str]) -> None:
+        """
+        Export a directory to the host, either as a directory tree or, when
+        the destination ends in a tar suffix like .tar or .tar.gz, as a tar
+        archive. Entries are written out one at a time as they are walked.
+        Symlinks are not exported.
+        :param inputs: A two element list of the directory to export and the
+            destination on the host.
+        :return: None
+        """
+        if len(inputs) == 2:
+            node = self.__find_node(inputs[0])
+            if not node.is_directory:
+                raise exceptions.ImproperArguments(
+                    "Only directories can be exported."
+                )
+            destination = inputs[1]
+            try:
+                if destination.endswith(self.TAR_SUFFIXES):
+                    compression = destination.rsplit(".", 1)[-1]
+                    compression = {"tgz": "gz", "tar": ""}.get(
+                        compression, compression
+                    )
+                    mode = f"w|{compression}"
+                    with tarfile.open(destination, mode) as archive:
+                        for relative, child in self.__walk(node):
+                            info = tarfile.TarInfo(relative)
+                            if child.is_directory:
+                                info.type = tarfile.DIRTYPE
+                                info.mode = 0o755
+                                archive.addfile(info)
+                            else:
+                                contents = self.__file_bytes(child)
+                                info.size = len(contents)
+                                info.mode = 0o644
+                                archive.addfile(info, io.BytesIO(contents))
+                else:
+                    os.makedirs(destination, exist_ok=True)
+                    for relative, child in self.__walk(node):
+                        host_path = os.path.join(destination, relative)
+                        if child.is_directory:
+                            os.makedirs(host_path, exist_ok=True)
+                        else:
+                            with open(host_path, "wb") as handle:
+                                handle.write(self.__file_bytes(child))
+            except (OSError, tarfile.TarError) as e:
+                raise self.__host_error("export to", destination, e) from e
+        else:
+            raise exceptions.ImproperArguments(
+                "Usage: export <directory> <host_directory_or_tar>"
+            )
+
+    def __file_bytes(self, node: INode) -> bytes:
+        """
+        Get the contents of a file as the bytes they were imported from.
+        :param node: The file inode.
+        :return: The file's contents encoded back into bytes.
+        """
+        return self.__read_data(node).encode("utf-8", "surrogateescape")
+
+    def fallocate(self, inputs: List[str]) -> None:
+        """
+        Reserve space on the virtual hard disk for the next appends to a
+        file, so that they are stored one after the other instead of being
+        interleaved with the data of other files. Reserved space that hasn't
+        been used yet is given back if the hard disk fills up.
+        :param inputs: A two element list of the path to a file and the
+            number of bytes to reserve.
+        :return: None
+        """
+        if len(inputs) == 2 and inputs[1].isdigit():
+            node = self.__find_node(inputs[0])
+            if node.link:
+                node = self.__find_node(node.link)
+            if node.is_directory:
+                raise exceptions.ImproperArguments(
+                    "Cannot allocate space for a directory."
+                )
+            node = self.__writable(node)
+            size = int(inputs[1])
+            available = (
+                node.reserved[1] - node.reserved[0] if node.reserved else 0
+            )
+            if available < size and not self.__reserve(node, size):
+                raise exceptions.OutOfDisk("Out of virtual disk space.")
+            node.reservation_size = max(node.reservation_size, size)
+        else:
+            raise exceptions.ImproperArguments(
+                "Usage: fallocate <file> <bytes>"
+            )
+
+    def truncate(self, inputs: List[str]) -> None:
+        """
+        Empty a file, or extend it to a size with a hole, which reads as zero
+        bytes but takes up no space on the virtual hard disk.
+        :param inputs: A two element list of the path to a file and its new
+            size in bytes.
+        :return: None
+        """
+        if len(inputs) == 2 and inputs[1].isdigit():
+            try:
+                with self.open(inputs[0], "a") as handle:
+                    handle.truncate(int(inputs[1]))
+            except io.UnsupportedOperation as e:
+                raise exceptions.ImproperArguments(str(e))
+        else:
+            raise exceptions.ImproperArguments(
+                "Usage: truncate <file> <bytes>"
+            )
+
+    def disk_usage(self, path: Optional[str] = None) -> Tuple[int, int]:
+        """
+        Work out how big a file, or every file below a directory, is and how
+        much of the virtual hard disk it takes up. Holes count towards the
+        size but take up nothing, while space reserved by `fallocate` takes
+        up room without counting towards the size. Files with many hardlinks
+        are only counted once.
+        :param path: The file or directory, by default the current working
+            directory.
+        :return: A tuple of the size in bytes and the bytes of the hard disk
+            allocated to it.
+        """
+        node = self.__find_node(
+            self.current_location if path is None else path
+        )
+        if node.link:
+            node = self.__find_node(node.link)
+        size = allocated = 0
+        counted: Set[str] = set()
+        for item in self.__subtree(node.path):
+            if isinstance(item, SymLink) or item.is_directory:
+                continue
+            if item.link:
+                item = self.inode_index[item.link]
+            if item.path in counted:
+                continue
+            counted.add(item.path)
+            for extent in item.data:
+                size += self.__load_extent(extent, item.escaped)[1]
+                if extent[0] is not None:
+                    allocated += extent[1] - extent[0]
+            if item.reserved:
+                allocated += item.reserved[1] - item.reserved[0]
+        return size, allocated
+
+    def du(self, inputs: List[str]) -> None:
+        """
+        Print the size of a file, or of the files below a directory, and how
+        much of the virtual hard disk they take up.
+        :param inputs: The paths to files or directories, by default the
+            current working directory.
+        :return: None
+        """
+        for path in inputs or [self.current_location + "/"]:
+            size, allocated = self.disk_usage(path)
+            print(f"{path}: {size} bytes, {allocated} allocated")
+
     def write(self, inputs: List[str]) -> None:
         """
         Write some data to a file.
@@ -358,17 +1357,8 @@ class FileSystem:
                 # When writing to a link, write to the source instead.
                 node = self.__find_node(node.link)
             if not node.is_directory:
-                data = pickle.dumps(inputs[1])
-                data_size = getsizeof(data)
-                start = self.hard_disk_index
-                byte_array = list(data)
-                if self.hard_disk_index + data_size < len(self.hard_disk):
-                    for count, value in enumerate(byte_array):
-                        self.hard_disk[self.hard_disk_index + count] = value
-                    self.hard_disk_index += len(byte_array)
-                else:
-                    raise exceptions.OutOfDisk("Out of virtual disk space.")
-                node.data.append((start, len(byte_array) + start))
+                node = self.__writable(node)
+                self.__append_data(node, inputs[1])
                 self.inode_index[node.path] = node
             else:
                 raise exceptions.ImproperArguments(
@@ -392,16 +1382,432 @@ class FileSystem:
             if node.link:
                 # When reading a link, read the source instead.
                 node = self.__find_node(node.link)
-            deserialized_data = ""
-            if node.data:
-                for data_tuple in node.data:
-                    deserialized_data += pickle.loads(
-                        bytes(self.hard_disk[data_tuple[0] : data_tuple[1]])
-                    )
-            print(deserialized_data)
+            contents = self.__read_data(node)
+            buffer = getattr(sys.stdout, "buffer", None)
+            if node.escaped and buffer is not None:
+                # Bytes that aren't valid UTF-8 can't be printed as text, so
+                # the bytes the file was written with are output instead.
+                sys.stdout.flush()
+                buffer.write(contents.encode("utf-8", "surrogateescape"))
+                buffer.write(b"\n")
+                buffer.flush()
+            else:
+                print(contents)
         else:
             raise exceptions.ImproperArguments("Usage: read <file>")
 
+    def __find_files(self, paths: Iterable[str], verb: str) -> List[INode]:
+        """
+        Find the inodes of many files at once. Each distinct directory named
+        by the paths is only traversed once, and links are replaced by their
+        source just like `write` and `read` do.
+        :param paths: The paths of the files.
+        :param verb: What is being done to the files, for error messages.
+        :return: The file inodes, in the same order as `paths`.
+        """
+        directories: Dict[str, INode] = dict()
+        nodes = []
+        for path in paths:
+            directory, separator, name = path.rpartition("/")
+            parent_node = directories.get(directory + separator, None)
+            if not parent_node:
+                parent_node = self.__find_node(path, parent=True)
+                directories[directory + separator] = parent_node
+            node = self.inode_index.get(f"{parent_node.path}/{name}", None)
+            if (
+                not node
+                or name in [".", "..", ""]
+                or isinstance(node, SymLink)
+            ):
+                node = self.__find_node(path)
+            if node.link:
+                node = self.__find_node(node.link)
+            if node.is_directory:
+                raise exceptions.ImproperArguments(
+                    f"{verb} not supported on directories"
+                )
+            nodes.append(node)
+        return nodes
+
+    def write_many(self, files: Dict[str, str]) -> None:
+        """
+        Append data to many files at once. Every path is looked up before
+        anything is written, and all of the data is stored in a single
+        contiguous run of the virtual hard disk, so either every file is
+        written or, if a path is invalid or the disk is full, none are.
+        :param files: A dictionary mapping paths of existing files to the
+            string to append to each.
+        :return: None
+        """
+        nodes = [
+            self.__writable(node)
+            for node in self.__find_files(files, "Writing")
+        ]
+        self.__append_data_many(list(zip(nodes, files.values())))
+
+    def read_many(self, paths: Iterable[str]) -> List[str]:
+        """
+        Read many files at once. When their data is packed closely together
+        on the virtual hard disk, like data stored by `write_many` is, it is
+        all copied off the hard disk in one go rather than a block at a time.
+        :param paths: The paths of the files to read.
+        :return: The contents of each file, in the same order as `paths`.
+        """
+        nodes = self.__find_files(paths, "Reading")
+        extents = [
+            extent
+            for node in nodes
+            for extent in node.data
+            if extent[0] is not None
+        ]
+        if not extents:
+            return [self.__read_data(node) for node in nodes]
+        low = min(start for start, _ in extents)
+        high = max(stop for _, stop in extents)
+        if high - low > 2 * sum(stop - start for start, stop in extents):
+            # The files are scattered across the hard disk, and copying off
+            # everything between them would cost more than it saves.
+            return [self.__read_data(node) for node in nodes]
+        run = memoryview(bytes(self.hard_disk[low:high]))
+        return [
+            "".join(
+                (
+                    "\0" * stop
+                    if start is None
+                    else pickle.loads(run[start - low : stop - low])
+                )
+                for start, stop in node.data
+            )
+            for node in nodes
+        ]
+
+    def search(
+        self,
+        pattern: str,
+        path: Optional[str] = None,
+        regex: bool = False,
+        workers: Optional[int] = None,
+    ) -> List[Tuple[str, int]]:
+        """
+        Find every occurrence of a string in a file, or in every file below a
+        directory. The data of the files is searched where it lies on the
+        virtual hard disk, without unpickling it. Searches through at least
+        PARALLEL_SEARCH_BYTES of data are split across worker processes.
+        :param pattern: The string to find, or a regular expression.
+        :param path: The file or directory to search, by default the current
+            working directory.
+        :param regex: If True, `pattern` is a regular expression.
+        :param workers: The most processes to search with, by default one
+            for each CPU.
+        :return: A list of (path, offset) tuples for every match, where the
+            offset is where the match starts in the bytes of the file, sorted
+            by path and then by offset.
+        """
+        node = self.__find_node(
+            self.current_location if path is None else path
+        )
+        if node.is_directory:
+            files = sorted(
+                (child.path, child.data, child.escaped)
+                for _, child in self.__walk(node)
+                if not child.is_directory
+            )
+        else:
+            source_node = self.__find_node(node.link) if node.link else node
+            files = [(node.path, source_node.data, source_node.escaped)]
+        encoded = pattern.encode("utf-8", "surrogateescape")
+        if regex:
+            try:
+                re.compile(encoded)
+            except re.error as e:
+                raise exceptions.ImproperArguments(f"Invalid pattern: {e}")
+        if workers is None:
+            workers = os.cpu_count() or 1
+        size = sum(
+            stop - start
+            for _, data, _ in files
+            for start, stop in data
+            if start is not None
+        )
+        if (
+            workers > 1
+            and size >= self.PARALLEL_SEARCH_BYTES
+            and search.can_search_in_pool()
+        ):
+            return search.search_in_pool(
+                self.hard_disk, files, encoded, regex, workers
+            )
+        return search.search_files(self.hard_disk, files, encoded, regex)
+
+    def grep(self, inputs: List[str]) -> None:
+        """
+        Print where a string occurs in a file, or in the files below a
+        directory, as the path of each file and the offset of each match in
+        it. With -E, the string is a regular expression.
+        :param inputs: The optional -E flag, the string to find and
+            optionally the file or directory to search.
+        :return: None
+        """
+        regex = bool(inputs) and inputs[0] == "-E"
+        if regex:
+            inputs = inputs[1:]
+        if len(inputs) in [1, 2]:
+            path = inputs[1] if len(inputs) == 2 else None
+            for match_path, offset in self.search(inputs[0], path, regex):
+                print(f"{match_path}:{offset}")
+        else:
+            raise exceptions.ImproperArguments(
+                "Usage: grep [-E] <pattern> [path]"
+            )
+
+    def __digest(self, node: Union[INode, SymLink]) -> bytes:
+        """
+        Get the Merkle digest of a node, working out the digests that were
+        forgotten since they were last needed, and only those.
+        :param node: The node.
+        :return: Its digest.
+        """
+        stack = [node]
+        while stack:
+            current = stack[-1]
+            if current.digest is not None:
+                stack.pop()
+                continue
+            if self.lower is not None and not self.inode_index.is_upper(
+                current.path
+            ):
+                # Nothing below a node that is still only in the lower
+                # filesystem was changed here, so its digest is the lower
+                # filesystem's, which is kept there.
+                self.lower.__digest(current)
+                stack.pop()
+                continue
+            if isinstance(current, SymLink):
+                digest = merkle.link_digest(b"s", current.link.encode())
+            elif current.link:
+                source_node = self.inode_index.get(current.link, None)
+                if source_node is not None and source_node.digest is None:
+                    stack.append(source_node)
+                    continue
+                digest = merkle.link_digest(
+                    b"h", source_node.digest if source_node else b""
+                )
+            elif current.is_directory:
+                children = [
+                    self.inode_index[key]
+                    for key in current.children
+                    if key not in [".", ".."]
+                ]
+                pending = [child for child in children if child.digest is None]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                digest = merkle.directory_digest(
+                    (child.path[len(current.path) + 1 :], child.digest)
+                    for child in children
+                )
+            else:
+                digest = merkle.file_digest(
+                    self.hard_disk, current.data, current.escaped
+                )
+            current.digest = digest
+            stack.pop()
+        return node.digest
+
+    @staticmethod
+    def __kind(node: Union[INode, SymLink]) -> str:
+        """
+        :param node: A node.
+        :return: What kind of item the node is.
+        """
+        if isinstance(node, SymLink):
+            return "symlink"
+        if node.is_directory:
+            return "directory"
+        return "hardlink" if node.link else "file"
+
+    def digest(self, path: Optional[str] = None) -> str:
+        """
+        Get the Merkle digest of an item, which hashes everything below it:
+        the contents of a file, or the names and digests of the children of
+        a directory. Digests are kept until something below them changes,
+        so working one out again only costs as much as what changed.
+        :param path: The item, by default the current working directory.
+        :return: The digest, in hexadecimal.
+        """
+        node = self.__find_node(
+            self.current_location if path is None else path, follow=False
+        )
+        return self.__digest(node).hex()
+
+    def diff(
+        self, other: "FileSystem", path: Optional[str] = None
+    ) -> List[str]:
+        """
+        Find the items that differ between this filesystem and another one,
+        comparing digests and only descending into directories whose digests
+        differ, so that the cost is proportional to the differences.
+        :param other: The other filesystem.
+        :param path: The directory to compare, by default the current working
+            directory.
+        :return: The sorted absolute paths of the items that exist in only
+            one of the filesystems, are of different kinds, or are files and
+            links with different contents. Differences inside an item that
+            is missing or of a different kind aren't listed.
+        """
+        start = self.__find_node(
+            self.current_location if path is None else path, follow=False
+        ).path
+        differences = []
+        stack = [start]
+        while stack:
+            item = stack.pop()
+            mine = self.inode_index.get(item, None)
+            theirs = other.inode_index.get(item, None)
+            if (
+                mine is None
+                or theirs is None
+                or self.__kind(mine) != self.__kind(theirs)
+            ):
+                differences.append(item)
+            elif self.__digest(mine) == other.__digest(theirs):
+                continue
+            elif mine.is_directory:
+                children = set(mine.children)
+                children.update(theirs.children)
+                children.difference_update([".", ".."])
+                for child in children:
+                    # Both directories' digests were just worked out, so
+                    # are those of their children, and equal digests mean
+                    # equal items of the same kind.
+                    mine = self.inode_index.get(child, None)
+                    theirs = other.inode_index.get(child, None)
+                    if (
+                        mine is None
+                        or theirs is None
+                        or mine.digest != theirs.digest
+                    ):
+                        stack.append(child)
+            else:
+                differences.append(item)
+        return sorted(differences)
+
+    def __subtree(self, path: str) -> List[Union[INode, SymLink]]:
+        """
+        Collect every node below a path, including the node itself, parents
+        before their children. Unlike `__walk`, links are left as they are.
+        :param path: The absolute path.
+        :return: The nodes.
+        """
+        nodes = []
+        stack = [self.inode_index[path]]
+        while stack:
+            node = stack.pop()
+            nodes.append(node)
+            if node.is_directory:
+                stack.extend(
+                    self.inode_index[key]
+                    for key in node.children
+                    if key not in [".", ".."]
+                )
+        return nodes
+
+    def sync(
+        self, replica: "FileSystem", path: Optional[str] = None
+    ) -> List[str]:
+        """
+        Make a directory of another filesystem the same as it is in this one.
+        Only the items `diff` finds are changed: files whose contents differ
+        are rewritten, and anything else is removed from the replica and
+        copied over again. New file contents are stored with `write_many`.
+        :param replica: The filesystem to change.
+        :param path: The directory to sync, by default the current working
+            directory.
+        :return: What `diff` found.
+        """
+        differences = self.diff(replica, path)
+        contents: Dict[str, str] = dict()
+        links: List[Union[INode, SymLink]] = []
+        for item in differences:
+            mine = self.inode_index.get(item, None)
+            theirs = replica.inode_index.get(item, None)
+            if (
+                mine is not None
+                and theirs is not None
+                and self.__kind(mine) == self.__kind(theirs) == "file"
+            ):
+                replica.open(item, "w").close()
+                contents[item] = self.__read_data(mine)
+                continue
+            if theirs is not None:
+                # Children are removed before their parents, and hardlinks
+                # before anything else, since removing a file that still has
+                # any only drops a reference to it.
+                nodes = replica.__subtree(item)[::-1]
+                nodes.sort(key=lambda node: replica.__kind(node) != "hardlink")
+                for node in nodes:
+                    replica.rm([node.path])
+            if mine is None:
+                continue
+            for node in self.__subtree(item):
+                kind = self.__kind(node)
+                if kind == "directory":
+                    replica.mkdir([node.path])
+                elif kind == "file":
+                    replica.touch([node.path])
+                    if node.data:
+                        contents[node.path] = self.__read_data(node)
+                else:
+                    links.append(node)
+        if contents:
+            replica.write_many(contents)
+        # Links are made last, once whatever they point to is there.
+        for node in links:
+            try:
+                replica.link(
+                    [node.link, node.path],
+                    hard=self.__kind(node) == "hardlink",
+                )
+            except exceptions.PathException:
+                # A symlink whose source is gone can't be made again.
+                continue
+        return differences
+
+    def open(self, path: str, mode: str = "r") -> FileHandle:
+        """
+        Open a file, returning a raw file-like handle on it which supports
+        `read`, `readinto`, `write`, `seek` and `tell`. Like the builtin
+        `open`, the w and a modes create the file if it doesn't exist and w
+        empties it first.
+        :param path: The path to the file.
+        :param mode: One of r, w, a, r+, w+ or a+, optionally with a b.
+        :return: The handle.
+        """
+        if mode.replace("b", "") not in ["r", "w", "a", "r+", "w+", "a+"]:
+            raise exceptions.ImproperArguments(f"Invalid mode: {mode}")
+        try:
+            node = self.__find_node(path)
+        except exceptions.PathException:
+            if mode.startswith("r"):
+                raise
+            self.__create_new_inodes([path])
+            node = self.__find_node(path)
+        if node.link:
+            node = self.__find_node(node.link)
+        if node.is_directory:
+            raise exceptions.ImproperArguments("Cannot open a directory.")
+        if mode.replace("b", "") != "r":
+            node = self.__writable(node)
+        return FileHandle(
+            node,
+            mode,
+            self.hard_disk,
+            self.__load_extent,
+            self.__append_data,
+            self.__truncate,
+            self.__append_hole,
+        )
+
     def link(self, inputs, hard=False) -> None:
         """
         Create a pointer to a file/directory via a link. A default call to this
@@ -414,24 +1820,346 @@ class FileSystem:
         :return: None
         """
         if inputs and len(inputs) == 2:
-            source_node = self.__find_node(inputs[0])
+            # A symlink to a symlink points at the link itself, while a
+            # hardlink always references the file at the end of the chain.
+            source_node = self.__find_node(inputs[0], follow=hard)
             link_parent = self.__find_node(inputs[1], parent=True)
+            if not link_parent.is_directory:
+                raise exceptions.ImproperArguments(
+                    f"{link_parent.path} is not a directory."
+                )
             link_path = link_parent.path + "/" + inputs[1].split("/")[-1]
-            # TODO: Implement symlink with a smaller memory footprint, since
-            # they are only a reference to the source node's path on creation.
-            link = INode(
-                path=link_path, parent=link_parent.path, link=source_node.path
-            )
+            if link_path in link_parent.children:
+                raise exceptions.NodeAlreadyExists(
+                    f"Filesystem item with name {link_path} already exists."
+                )
+            link_parent = self.__writable(link_parent)
             if hard:
+                link = INode(
+                    path=link_path,
+                    parent=link_parent.path,
+                    link=source_node.path,
+                )
+                source_node = self.__writable(source_node)
                 source_node.reference_count += 1
                 source_node.hardlinks[link_path] = link
                 self.inode_index[source_node.path] = source_node
+                self.__changed(source_node.path)
+            else:
+                link = SymLink(
+                    path=link_path,
+                    parent=link_parent.path,
+                    link=source_node.path,
+                )
+            link_parent.children[link_path] = link
             self.inode_index[link.path] = link
+            self.__notify(CREATE, link.path)
         else:
             raise exceptions.ImproperArguments(
                 f"Usage: {'hard' if hard else 'sym'}link [source_item] [link_name]"
             )
 
+    def watch(
+        self, path: str, recursive: bool = False, max_events: int = 1024
+    ) -> Watch:
+        """
+        Subscribe to the changes made to a file or directory: items being
+        created, modified, deleted or moved. Read the events from the
+        returned watch in batches with `Watch.read`.
+        :param path: The path to watch, which must exist.
+        :param recursive: If True, watch everything below a directory rather
+            than only its children.
+        :param max_events: The most events to queue before overflowing.
+        :return: The watch.
+        """
+        node = self.__find_node(path)
+        watch = Watch(node.path, recursive, max_events)
+        self.watches.setdefault(node.path, []).append(watch)
+        self.recursive_watches += recursive
+        return watch
+
+    def unwatch(self, watch: Watch) -> None:
+        """
+        Stop a watch from receiving any more events.
+        :param watch: The watch returned by `watch`.
+        :return: None
+        """
+        watches = self.watches.get(watch.path, [])
+        if watch in watches:
+            watches.remove(watch)
+            self.recursive_watches -= watch.recursive
+        if not watches:
+            self.watches.pop(watch.path, None)
+
+    def __notify(self, kind: str, path: str, destination: str = "") -> None:
+        """
+        Queue an event on every watch of the paths it names, of their parent
+        directories and, for recursive watches, of any of their ancestors.
+        Events from inside a transaction are held back until it commits.
+        This is a single check when nothing is being watched and no
+        transaction is open.
+        :param kind: The kind of event.
+        :param path: The absolute path of the item that changed.
+        :param destination: Where the item went, for moves.
+        :return: None
+        """
+        if destination:
+            self.__stale(path, destination)
+        else:
+            self.__stale(path)
+        transaction = self.transaction
+        if self.versions is not None:
+            changed = [path, destination] if destination else [path]
+            if kind != MODIFY:
+                # Creating, deleting or moving an item changes its parent.
+                changed += [item[: item.rfind("/")] for item in changed]
+            self.__changed(*changed)
+            if transaction is not None and transaction.active:
+                transaction.events.append((kind, path, destination))
+                return
+        if not self.watches:
+            return
+        event = None
+        notified: List[Watch] = []
+        for changed in [path, destination] if destination else [path]:
+            depth = 0
+            while True:
+                for watch in self.watches.get(changed, ()):
+                    if (depth <= 1 or watch.recursive) and (
+                        watch not in notified
+                    ):
+                        event = event or Event(kind, path, destination)
+                        notified.append(watch)
+                        watch.push(event)
+                if not changed or (depth and not self.recursive_watches):
+                    # Only recursive watches look further up than the
+                    # parent directory.
+                    break
+                changed = changed[: changed.rfind("/")]
+                depth += 1
+
+    def __notify_modified(self, node: INode) -> None:
+        """
+        Queue a modify event for a file and every hardlink to it. Nothing is
+        queued for files that are still being created.
+        :param node: The file inode.
+        :return: None
+        """
+        if self.inode_index.get(node.path) is not node:
+            return
+        if not self.watches and self.versions is None:
+            # Only the digests need to know.
+            self.__stale(node.path, *node.hardlinks)
+            return
+        for path in [node.path, *node.hardlinks]:
+            self.__notify(MODIFY, path)
+
+    def __stale(self, *paths: str) -> None:
+        """
+        Forget the digests of the items at some paths and of the directories
+        above them, which are then worked out again the next time they are
+        needed. A directory without a digest has none of its ancestors'
+        either, so this stops at the first one. In an overlay, everything
+        still only in the lower filesystem is copied up on the way, since
+        the digests of such nodes are the lower filesystem's.
+        :param paths: The absolute paths.
+        :return: None
+        """
+        transaction = self.transaction
+        if transaction is not None and transaction.active:
+            # The events of a transaction are delivered again once it
+            # commits, which is when its changes are made.
+            return
+        overlay = isinstance(self.inode_index, OverlayIndex)
+        for path in paths:
+            node = self.inode_index.get(path, None)
+            lower_only = overlay and not self.inode_index.is_upper(path)
+            if node is not None and (node.digest is not None or lower_only):
+                self.__writable(node).digest = None
+            while path:
+                path = path[: path.rfind("/")]
+                node = self.inode_index.get(path, None)
+                lower_only = overlay and not self.inode_index.is_upper(path)
+                if node is None or (node.digest is None and not lower_only):
+                    break
+                self.__writable(node).digest = None
+
+    def __changed(self, *paths: str) -> None:
+        """
+        Record that the nodes at some paths changed, by bumping their
+        versions or, inside a transaction, by adding them to the paths it
+        changes. Nothing is recorded while no transaction is open.
+        :param paths: The absolute paths.
+        :return: None
+        """
+        if self.versions is None:
+            return
+        transaction = self.transaction
+        if transaction is not None and transaction.active:
+            transaction.changed.update(paths)
+            return
+        for path in paths:
+            self.versions[path] = self.versions.get(path, 0) + 1
+
+    def begin(self, inputs: List[str]) -> None:
+        """
+        Begin a transaction. Until it's committed or aborted, the commands
+        run by this session only change a private view of the filesystem,
+        which nobody else sees.
+        :param inputs: An empty list.
+        :return: None
+        """
+        if inputs:
+            raise exceptions.ImproperArguments("Usage: begin")
+        if self.transaction is not None:
+            raise exceptions.ImproperArguments("Already in a transaction.")
+        if self.versions is None:
+            self.versions = dict()
+        self.open_transactions += 1
+        self.transaction = Transaction(self.inode_index, self.versions)
+        self.transaction.location = self.current_location
+
+    def commit(self, inputs: List[str]) -> None:
+        """
+        Commit the open transaction, applying all of its changes at once. It
+        is aborted instead if one of its commands failed, or if any path it
+        looked at was changed by someone else since it did.
+        :param inputs: An empty list.
+        :return: None
+        """
+        if inputs:
+            raise exceptions.ImproperArguments("Usage: commit")
+        transaction = self.transaction
+        if transaction is None:
+            raise exceptions.ImproperArguments("Not in a transaction.")
+        if transaction.failed:
+            self.abort([])
+            raise exceptions.TransactionAborted(
+                "Transaction aborted: one of its commands failed."
+            )
+        conflicts = transaction.index.conflicts()
+        if conflicts:
+            self.abort([])
+            raise exceptions.TransactionAborted(
+                f"Transaction aborted: {conflicts[0] or '/'} was changed."
+            )
+        view = transaction.index
+        for path in transaction.changed:
+            node = view.local.get(path, None)
+            original = self.inode_index.get(path, None)
+            if node is None:
+                continue
+            if isinstance(
+                self.inode_index, OverlayIndex
+            ) and not self.inode_index.is_upper(path):
+                # Nodes of the lower filesystem are replaced, never changed.
+                original = None
+            if isinstance(original, INode):
+                if self.content_cache is not None:
+                    self.content_cache.invalidate(original)
+                if node is DELETED or not view.is_copy(path, node, original):
+                    self.__release(original)
+                elif node.reserved:
+                    self.__release(original)
+                    self.reserved_inodes.discard(node)
+                    self.reserved_inodes.add(original)
+                else:
+                    node.reserved = original.reserved
+            if node is DELETED:
+                self.inode_index.pop(path, None)
+            elif isinstance(original, INode) and view.is_copy(
+                path, node, original
+            ):
+                # Change the committed inode rather than replacing it, so
+                # that anything holding on to it sees the changes.
+                original.update(node)
+            else:
+                self.inode_index[path] = node
+        for start, stop in transaction.freed:
+            self.hard_disk.discard(start, stop)
+        self.__close_transaction()
+        for path in transaction.changed:
+            self.__changed(path)
+            self.__invalidate_symlinks(path)
+        for kind, path, destination in transaction.events:
+            self.__notify(kind, path, destination)
+
+    def abort(self, inputs: List[str]) -> None:
+        """
+        Abort the open transaction, throwing away its changes, and go back
+        to the working directory it began in, which may have been one of
+        them. This only costs as much as the transaction did.
+        :param inputs: An empty list.
+        :return: None
+        """
+        if inputs:
+            raise exceptions.ImproperArguments("Usage: abort")
+        transaction = self.transaction
+        if transaction is None:
+            raise exceptions.ImproperArguments("Not in a transaction.")
+        for node in transaction.index.local.values():
+            if isinstance(node, INode):
+                self.__release(node)
+        for start, stop in transaction.allocated:
+            self.hard_disk.discard(start, stop)
+            self.__give_back(start, stop)
+        self.current_location = transaction.location
+        self.__close_transaction()
+
+    def __close_transaction(self) -> None:
+        """
+        Forget the open transaction, and stop keeping track of versions once
+        no transaction is open any more.
+        :return: None
+        """
+        self.transaction = None
+        self.open_transactions -= 1
+        if not self.open_transactions:
+            self.versions = None
+
+    def __exec_in_transaction(self, command: str) -> int:
+        """
+        Execute a command inside the open transaction, against its private
+        view of the filesystem. If the command fails, the transaction can no
+        longer be committed.
+        :param command: The command to execute.
+        :return: What `exec` returns for the command.
+        """
+        transaction = self.transaction
+        saved = (
+            self.inode_index,
+            self.symlink_cache,
+            self.symlink_dependents,
+            self.content_cache,
+        )
+        self.inode_index = transaction.index
+        self.symlink_cache = transaction.symlink_cache
+        self.symlink_dependents = transaction.symlink_dependents
+        self.content_cache = None
+        transaction.active = True
+        try:
+            return self.exec(command)
+        except Exception:
+            transaction.failed = True
+            raise
+        finally:
+            transaction.active = False
+            (
+                self.inode_index,
+                self.symlink_cache,
+                self.symlink_dependents,
+                self.content_cache,
+            ) = saved
+
+    def __truncate(self, node: INode) -> None:
+        """
+        Throw away all of the data of a file, as opening it for writing does.
+        :param node: The file inode.
+        :return: None
+        """
+        self.__free_data(node)
+        self.__notify_modified(node)
+
     def exec(self, command: str) -> int:
         """
         Given a string of a command, execute the command. `command` will be of
@@ -440,7 +2168,21 @@ class FileSystem:
         :return: 1 when the `exit` command is issued.
         """
         split_input = command.split()
-        if split_input[0] == "ls":
+        if not split_input:
+            return 0
+        elif (
+            self.transaction is not None
+            and not self.transaction.active
+            and split_input[0] not in ["begin", "commit", "abort", "exit"]
+        ):
+            return self.__exec_in_transaction(command)
+        elif split_input[0] == "begin":
+            self.begin(split_input[1:])
+        elif split_input[0] == "commit":
+            self.commit(split_input[1:])
+        elif split_input[0] == "abort":
+            self.abort(split_input[1:])
+        elif split_input[0] == "ls":
             self.ls(split_input[1:])
         elif split_input[0] == "find":
             self.find(split_input[1:])
@@ -464,9 +2206,23 @@ class FileSystem:
             self.write(split_input[1:])
         elif split_input[0] == "read":
             self.read(split_input[1:])
+        elif split_input[0] == "fallocate":
+            self.fallocate(split_input[1:])
+        elif split_input[0] == "grep":
+            self.grep(split_input[1:])
+        elif split_input[0] == "truncate":
+            self.truncate(split_input[1:])
+        elif split_input[0] == "du":
+            self.du(split_input[1:])
         elif split_input[0] == "hardlink":
             self.link(split_input[1:], hard=True)
+        elif split_input[0] == "import":
+            self.import_tree(split_input[1:])
+        elif split_input[0] == "export":
+            self.export_tree(split_input[1:])
         elif split_input[0] == "exit":
+            if self.transaction is not None:
+                self.abort([])
             return 1
         else:
             print(f"Unrecognized command: {split_input[0]}")
@@ -491,6 +2247,8 @@ class FileSystem:
                     exceptions.NodeAlreadyExists,
                     exceptions.DirectoryNonEmpty,
                     exceptions.OutOfDisk,
+                    exceptions.SymlinkLoop,
+                    exceptions.TransactionAborted,
                 ) as e:
                     print(e)
         elif self.interactive:
@@ -506,6 +2264,8 @@ class FileSystem:
                     exceptions.NodeAlreadyExists,
                     exceptions.DirectoryNonEmpty,
                     exceptions.OutOfDisk,
+                    exceptions.SymlinkLoop,
+                    exceptions.TransactionAborted,
                 ) as e:
                     print(e)
         else:
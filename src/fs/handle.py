@@ -0,0 +1,262 @@
+import errno
+import io
+import os
+from bisect import bisect_right
+from typing import Callable, List, Optional, Tuple
+
+# The most bytes a pickled string can start with before its UTF-8 payload:
+# the protocol marker, a frame header, and the opcode followed by the length.
+PAYLOAD_HEADER_SIZE = 20
+# Seek to the next data or the next hole of a file, where the platform has
+# them, using the values Linux uses otherwise.
+SEEK_DATA = getattr(os, "SEEK_DATA", 3)
+SEEK_HOLE = getattr(os, "SEEK_HOLE", 4)
+
+
+def payload_span(header: bytes) -> Optional[Tuple[int, int]]:
+    """
+    Locate the UTF-8 payload inside a pickled string. Pickle stores strings
+    as their encoded bytes after a short header, so once the header is parsed
+    the contents of a file can be copied straight off the virtual hard disk
+    without unpickling anything.
+    :param header: The first PAYLOAD_HEADER_SIZE bytes of a pickled string.
+    :return: The start and stop offsets of the payload in the pickle, or None
+        if the header isn't one that is understood.
+    """
+    if len(header) < 2 or header[0] != 0x80:
+        return None
+    position = 2
+    if header[position : position + 1] == b"\x95":
+        # Protocol 4 and up wrap the pickle in a frame.
+        position += 9
+    opcode = header[position : position + 1]
+    if opcode == b"\x8c":
+        length_size = 1
+    elif opcode == b"X":
+        length_size = 4
+    elif opcode == b"\x8d":
+        length_size = 8
+    else:
+        return None
+    start = position + 1 + length_size
+    if len(header) < start:
+        return None
+    length = int.from_bytes(header[position + 1 : start], "little")
+    return start, start + length
+
+
+class FileHandle(io.RawIOBase):
+    """
+    A raw, file-like handle on a file in the filesystem, returned by
+    `FileSystem.open`. The contents of a file are presented as the bytes the
+    strings written to it encode to, and can be read with `readinto` straight
+    from the virtual hard disk into a caller's buffer. Wrap a handle in
+    `io.BufferedReader` or `io.TextIOWrapper` to hand it to code expecting a
+    regular file object.
+
+    Data can only be written at or past the end of a file. Writing past it,
+    or extending the file with `truncate`, leaves a hole: a run of zero bytes
+    that takes up no space on the hard disk. Holes can be found with the
+    SEEK_DATA and SEEK_HOLE values of `whence`.
+    """
+
+    def __init__(
+        self,
+        node,
+        mode: str,
+        hard_disk,
+        load_extent: Callable[[tuple, bool], Tuple[int, int, Optional[bytes]]],
+        append_data: Callable[[object, str], None],
+        truncate: Callable[[object], None],
+        append_hole: Callable[[object, int], None],
+    ):
+        """
+        Open a handle on a file. This is meant to be called by
+        `FileSystem.open` only.
+        :param node: The inode of the file.
+        :param mode: One of r, w, a, r+, w+ or a+, optionally with a b.
+        :param hard_disk: The virtual hard disk of the filesystem.
+        :param load_extent: Locates the contents of a block of data on the
+            hard disk, or decodes them if they can't be copied verbatim.
+        :param append_data: Appends a string to the data of a file.
+        :param truncate: Throws away all of the data of a file.
+        :param append_hole: Appends a hole of some length to a file.
+        """
+        super().__init__()
+        self.node = node
+        self.mode = mode
+        self.__hard_disk = hard_disk
+        self.__load_extent = load_extent
+        self.__append_data = append_data
+        self.__truncate = truncate
+        self.__append_hole = append_hole
+        self.__readable = "r" in mode or "+" in mode
+        self.__writable = "r" not in mode or "+" in mode
+        self.__appending = "a" in mode
+        # The end offset of every block of data in the file, and where its
+        # contents can be found: either their start on the hard disk, or the
+        # decoded bytes themselves, or neither for holes.
+        self.__ends: List[int] = []
+        self.__sources: List[Tuple[int, Optional[bytes]]] = []
+        # The list of blocks the above were taken from. Emptying a file gives
+        # it a new list, so once it's replaced they're all out of date.
+        self.__data: Optional[list] = None
+        self.__last: Optional[tuple] = None
+        self.position = 0
+        if "w" in mode:
+            truncate(node)
+
+    def __sync(self) -> None:
+        """
+        Account for blocks of data appended to the file since the last call,
+        which may have been written through other handles. If the file was
+        emptied in the meantime, every block is accounted for again.
+        :return: None
+        """
+        data = self.node.data
+        if data is not self.__data or len(self.__ends) > len(data):
+            self.__ends, self.__sources = [], []
+            self.__data = data
+        elif self.__ends and data[len(self.__ends) - 1] != self.__last:
+            # Holes appended right after a hole are merged into it, so the
+            # last block may have grown since.
+            self.__ends.pop()
+            self.__sources.pop()
+        for extent in data[len(self.__ends) :]:
+            start, length, decoded = self.__load_extent(
+                extent, self.node.escaped
+            )
+            self.__ends.append(
+                (self.__ends[-1] if self.__ends else 0) + length
+            )
+            self.__sources.append((start, decoded))
+        if data:
+            self.__last = data[-1]
+
+    @property
+    def size(self) -> int:
+        self.__sync()
+        return self.__ends[-1] if self.__ends else 0
+
+    def readable(self) -> bool:
+        return self.__readable
+
+    def writable(self) -> bool:
+        return self.__writable
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self.position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = self.size + offset
+        elif whence in [SEEK_DATA, SEEK_HOLE]:
+            position = self.__find(offset, hole=whence == SEEK_HOLE)
+        else:
+            raise ValueError(f"Invalid whence ({whence}).")
+        if position < 0:
+            raise ValueError(f"Negative seek position {position}.")
+        self.position = position
+        return position
+
+    def __find(self, offset: int, hole: bool) -> int:
+        """
+        Find the next offset of the file that is in a hole, or that isn't.
+        The end of the file counts as a hole.
+        :param offset: Where to start looking.
+        :param hole: True to find a hole, False to find data.
+        :return: The offset.
+        """
+        size = self.size
+        if not 0 <= offset < size:
+            raise OSError(errno.ENXIO, "No such device or address")
+        for index in range(
+            bisect_right(self.__ends, offset), len(self.__ends)
+        ):
+            start = self.__ends[index - 1] if index else 0
+            if start != self.__ends[index] and hole == (
+                self.__sources[index] == (None, None)
+            ):
+                return max(offset, start)
+        if hole:
+            return size
+        raise OSError(errno.ENXIO, "No such device or address")
+
+    def readinto(self, buffer) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if not self.__readable:
+            raise io.UnsupportedOperation("File not open for reading.")
+        self.__sync()
+        view = memoryview(buffer).cast("B")
+        copied = 0
+        index = bisect_right(self.__ends, self.position)
+        while copied < len(view) and index < len(self.__ends):
+            offset = self.position - (self.__ends[index - 1] if index else 0)
+            count = min(len(view) - copied, self.__ends[index] - self.position)
+            start, decoded = self.__sources[index]
+            if start is None:
+                view[copied : copied + count] = bytes(count)
+            elif decoded is None:
+                # Straight from the disk's own buffer, so the bytes are only
+                # copied once, into the caller's.
+                chunk, position = self.__hard_disk.view(
+                    start + offset, start + offset + count
+                )
+                view[copied : copied + count] = memoryview(chunk)[
+                    position : position + count
+                ]
+            else:
+                view[copied : copied + count] = decoded[
+                    offset : offset + count
+                ]
+            copied += count
+            self.position += count
+            index += 1
+        return copied
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if not self.__writable:
+            raise io.UnsupportedOperation("File not open for writing.")
+        if self.__appending:
+            self.position = self.size
+        elif self.position < self.size:
+            raise io.UnsupportedOperation(
+                "Writes are only supported at or past the end of the file."
+            )
+        data = bytes(data)
+        if data:
+            if self.position > self.size:
+                self.__append_hole(self.node, self.position - self.size)
+            self.__append_data(
+                self.node, data.decode("utf-8", "surrogateescape")
+            )
+            self.position += len(data)
+        return len(data)
+
+    def truncate(self, size: Optional[int] = None) -> int:
+        if self.closed:
+            raise ValueError("I/O operation on closed file.")
+        if not self.__writable:
+            raise io.UnsupportedOperation("File not open for writing.")
+        size = self.position if size is None else size
+        if size == 0:
+            self.__truncate(self.node)
+        elif size > self.size:
+            self.__append_hole(self.node, size - self.size)
+        elif size < self.size:
+            raise io.UnsupportedOperation(
+                "Files can only be emptied or extended."
+            )
+        return size
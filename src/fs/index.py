@@ -0,0 +1,206 @@
+from bisect import bisect_left, insort
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class SortedIndex(MutableMapping):
+    """
+    A dictionary that keeps its keys in sorted order. Directory inodes use
+    this for their `children` so that listing a directory is an ordered walk
+    and finding every entry that starts with some prefix is a range scan
+    rather than a scan of the whole directory.
+
+    Keys are kept in a list of sorted sublists, each of which holds at most
+    twice `LOAD` keys, and the values of each sublist's keys in a dict of its
+    own. A lookup bisects the maximum key of every sublist and then looks in
+    that sublist's dict, so inserts and deletes only shift a bounded number
+    of elements no matter how large the directory grows.
+
+    Copies share their sublists with the index they were made from. Changing
+    a key only copies the sublist holding it, so a copy of a huge directory
+    with a few changes takes up little more than the sublists they touched.
+    """
+
+    # Anything from 64 to 2048 performs about the same, see the README.
+    LOAD = 512
+
+    def __init__(self, items: Optional[Dict[str, Any]] = None):
+        self._lists: List[List[str]] = []
+        self._maps: List[Dict[str, Any]] = []
+        self._maxes: List[str] = []
+        # Whether each sublist and its dict belong to this index alone, and
+        # so can be changed in place.
+        self._owned: List[bool] = []
+        self._length = 0
+        # Copies share the lists above with the index they were made from
+        # until either of them is changed.
+        self._shared = False
+        if items:
+            for key, value in items.items():
+                self[key] = value
+
+    def __getitem__(self, key: str) -> Any:
+        position = bisect_left(self._maxes, key)
+        if position == len(self._maxes):
+            raise KeyError(key)
+        return self._maps[position][key]
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        if self._shared:
+            self.__unshare()
+        position = bisect_left(self._maxes, key)
+        if position < len(self._maxes) and key in self._maps[position]:
+            self.__own(position)[1][key] = value
+        else:
+            self.__insert(key, value, position)
+
+    def __delitem__(self, key: str) -> None:
+        if self._shared:
+            self.__unshare()
+        maxes = self._maxes
+        position = bisect_left(maxes, key)
+        if position == len(maxes) or key not in self._maps[position]:
+            raise KeyError(key)
+        sublist, values = self.__own(position)
+        del values[key]
+        del sublist[bisect_left(sublist, key)]
+        self._length -= 1
+        if not sublist:
+            del self._lists[position]
+            del self._maps[position]
+            del self._owned[position]
+            del maxes[position]
+        else:
+            maxes[position] = sublist[-1]
+
+    def __contains__(self, key: object) -> bool:
+        position = bisect_left(self._maxes, key)
+        return position < len(self._maxes) and key in self._maps[position]
+
+    def __iter__(self) -> Iterator[str]:
+        for sublist in self._lists:
+            yield from sublist
+
+    def __len__(self) -> int:
+        return self._length
+
+    def copy(self) -> "SortedIndex":
+        """
+        Make a shallow copy of the index. Copying takes constant time: the
+        copy and the original share every sublist until one of them changes
+        it, which then makes its own copy of that sublist first.
+        :return: The copy.
+        """
+        index = SortedIndex()
+        index._lists, index._maps, index._maxes = (
+            self._lists,
+            self._maps,
+            self._maxes,
+        )
+        index._length = self._length
+        index._shared = self._shared = True
+        return index
+
+    def __unshare(self) -> None:
+        """
+        Stop sharing the lists of sublists with other copies of the index.
+        The sublists themselves are still shared until they're changed.
+        :return: None
+        """
+        self._lists = list(self._lists)
+        self._maps = list(self._maps)
+        self._maxes = list(self._maxes)
+        self._owned = [False] * len(self._lists)
+        self._shared = False
+
+    def __own(self, position: int) -> Tuple[List[str], Dict[str, Any]]:
+        """
+        Get a sublist and its dict to change, copying them first if they're
+        shared with other copies of the index.
+        :param position: The position of the sublist.
+        :return: The sublist and its dict.
+        """
+        if not self._owned[position]:
+            self._lists[position] = list(self._lists[position])
+            self._maps[position] = dict(self._maps[position])
+            self._owned[position] = True
+        return self._lists[position], self._maps[position]
+
+    def __repr__(self) -> str:
+        return f"SortedIndex({dict(self.items())!r})"
+
+    def __insert(self, key: str, value: Any, position: int) -> None:
+        """
+        Place a new key into the sublist that should hold it, splitting that
+        sublist in half once it grows past twice the load factor.
+        :param key: A key that isn't in the index yet.
+        :param value: Its value.
+        :param position: Where the key bisects into the maximum keys.
+        :return: None
+        """
+        lists, maxes = self._lists, self._maxes
+        self._length += 1
+        if not maxes:
+            lists.append([key])
+            self._maps.append({key: value})
+            self._owned.append(True)
+            maxes.append(key)
+            return
+        if position == len(maxes):
+            # Appending past the current maximum is the common case for
+            # names created in order, so avoid the inner bisect entirely.
+            position -= 1
+            sublist, values = self.__own(position)
+            sublist.append(key)
+            maxes[position] = key
+        else:
+            sublist, values = self.__own(position)
+            insort(sublist, key)
+        values[key] = value
+        if len(sublist) > 2 * self.LOAD:
+            upper_half = sublist[self.LOAD :]
+            del sublist[self.LOAD :]
+            maxes[position] = sublist[-1]
+            lists.insert(position + 1, upper_half)
+            self._maps.insert(
+                position + 1, {key: values.pop(key) for key in upper_half}
+            )
+            self._owned.insert(position + 1, True)
+            maxes.insert(position + 1, upper_half[-1])
+
+    def irange(
+        self, start: Optional[str] = None, stop: Optional[str] = None
+    ) -> Iterator[str]:
+        """
+        Iterate over the keys in the half open range [start, stop) in sorted
+        order. Either bound may be None to leave that side of the range open.
+        :param start: The smallest key to yield.
+        :param stop: The first key past the end of the range.
+        :return: An iterator over the matching keys.
+        """
+        if start is None:
+            position, offset = 0, 0
+        else:
+            position = bisect_left(self._maxes, start)
+            if position == len(self._maxes):
+                return
+            offset = bisect_left(self._lists[position], start)
+        for sublist in self._lists[position:]:
+            end = len(sublist)
+            if stop is not None and sublist[-1] >= stop:
+                end = bisect_left(sublist, stop)
+            yield from sublist[offset:end]
+            if end < len(sublist):
+                return
+            offset = 0
+
+    def prefix(self, prefix: str) -> Iterator[str]:
+        """
+        Iterate over every key that starts with `prefix`, in sorted order.
+        :param prefix: The string each yielded key must start with.
+        :return: An iterator over the matching keys.
+        """
+        for key in self.irange(start=prefix):
+            if not key.startswith(prefix):
+                return
+            yield key
@@ -0,0 +1,57 @@
+import hashlib
+from typing import Iterable, List, Tuple
+
+from .disk import VirtualDisk
+from .search import payloads
+
+DIGEST_SIZE = 16
+ZEROS = memoryview(bytes(1 << 16))
+
+
+def file_digest(
+    hard_disk: VirtualDisk, data: List[tuple], escaped: bool
+) -> bytes:
+    """
+    Hash the contents of a file, straight off the hard disk.
+    :param hard_disk: The virtual hard disk.
+    :param data: The (start, stop) tuples of the blocks of the file.
+    :param escaped: True if the bytes of the file don't match its data.
+    :return: The digest of the file.
+    """
+    digest = hashlib.blake2b(b"f", digest_size=DIGEST_SIZE)
+    for buffer, start, stop in payloads(hard_disk, data, escaped):
+        if buffer is not None:
+            digest.update(memoryview(buffer)[start:stop])
+            continue
+        # Holes hash as the zero bytes they read as, so a file hashes the
+        # same however sparse it is.
+        length = stop - start
+        while length:
+            digest.update(ZEROS[: min(length, len(ZEROS))])
+            length -= min(length, len(ZEROS))
+    return digest.digest()
+
+
+def directory_digest(children: Iterable[Tuple[str, bytes]]) -> bytes:
+    """
+    Hash a directory from the names and digests of its children, so that
+    two directories hash the same exactly when everything below them does.
+    :param children: The (name, digest) tuples of the children, in order.
+    :return: The digest of the directory.
+    """
+    entries = b"".join(
+        name.encode("utf-8", "surrogateescape") + b"\0" + child_digest
+        for name, child_digest in children
+    )
+    return hashlib.blake2b(b"d" + entries, digest_size=DIGEST_SIZE).digest()
+
+
+def link_digest(kind: bytes, target: bytes) -> bytes:
+    """
+    Hash a link. Symlinks hash the path they point to, and hardlinks the
+    digest of their source, so they don't change when the source moves.
+    :param kind: b"s" for a symlink, b"h" for a hardlink.
+    :param target: What the link hashes.
+    :return: The digest of the link.
+    """
+    return hashlib.blake2b(kind + target, digest_size=DIGEST_SIZE).digest()
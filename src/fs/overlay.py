@@ -0,0 +1,78 @@
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, Set
+
+
+class OverlayIndex(MutableMapping):
+    """
+    The inode index of an overlay: a private upper layer of nodes on top of
+    the index of a shared, read-only lower filesystem. Lookups fall through
+    to the lower layer for every path the upper layer doesn't have, so an
+    overlay only stores what it changed, however big the lower layer is.
+
+    Nodes of the lower layer are never changed. Before one is, it is copied
+    up into the upper layer with `copy_up`, and removing a path the lower
+    layer has leaves a whiteout that hides it from then on.
+    """
+
+    def __init__(self, lower: Dict[str, Any]):
+        """
+        Create an empty overlay.
+        :param lower: The inode index of the lower filesystem.
+        """
+        self.lower = lower
+        self.upper: Dict[str, Any] = dict()
+        self.whiteouts: Set[str] = set()
+
+    def __getitem__(self, key: str) -> Any:
+        node = self.upper.get(key, None)
+        if node is not None:
+            return node
+        if key in self.whiteouts:
+            raise KeyError(key)
+        return self.lower[key]
+
+    def __contains__(self, key: object) -> bool:
+        return key in self.upper or (
+            key not in self.whiteouts and key in self.lower
+        )
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.upper[key] = value
+        self.whiteouts.discard(key)
+
+    def __delitem__(self, key: str) -> None:
+        if key not in self:
+            raise KeyError(key)
+        self.upper.pop(key, None)
+        if key in self.lower:
+            self.whiteouts.add(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.lower:
+            if key not in self.upper and key not in self.whiteouts:
+                yield key
+        yield from self.upper
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def is_upper(self, key: str) -> bool:
+        """
+        Check whether the node at a path belongs to the upper layer, and so
+        can be changed.
+        :param key: The path.
+        :return: True if the upper layer has a node at the path.
+        """
+        return key in self.upper
+
+    def copy_up(self, key: str) -> Any:
+        """
+        Get the node at a path from the upper layer, copying it up from the
+        lower layer first if it's only there.
+        :param key: The path.
+        :return: The node in the upper layer.
+        """
+        node = self.upper.get(key, None)
+        if node is None:
+            node = self.upper[key] = self[key].copy()
+        return node
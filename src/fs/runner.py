@@ -1,6 +1,65 @@
 import argparse
+import io
+import sys
+from typing import Iterable, Iterator
 
-from . import fs
+from . import fs, server, shard
+
+# Output buffer size used when running scripts, so that millions of commands
+# don't turn into millions of small writes.
+SCRIPT_OUTPUT_BUFFER = 1 << 16
+
+
+def read_script(lines: Iterable[str]) -> Iterator[str]:
+    """
+    Lazily turn the lines of a script into commands, skipping blank lines and
+    comments starting with #.
+    :param lines: The lines of the script, such as an open file.
+    :return: An iterator over the commands.
+    """
+    for line in lines:
+        line = line.strip()
+        if line and not line.startswith("#"):
+            yield line
+
+
+def run_script(
+    path: str, hard_disk_capacity: int = None, content_cache_size: int = 0
+) -> int:
+    """
+    Execute a script, streaming its commands from the file (or stdin for -)
+    one at a time so that memory use doesn't depend on the script's length.
+    Output is written through a large buffer.
+    :param path: The path of the script, or - for stdin.
+    :param hard_disk_capacity: The capacity of the virtual hard disk.
+    :param content_cache_size: The byte budget of the content cache.
+    :return: The exit code.
+    """
+    script = sys.stdin if path == "-" else open(path)
+    stdout = sys.stdout
+    try:
+        sys.stdout = io.TextIOWrapper(
+            io.BufferedWriter(
+                io.FileIO(stdout.fileno(), "w", closefd=False),
+                SCRIPT_OUTPUT_BUFFER,
+            ),
+            encoding=stdout.encoding,
+        )
+    except (AttributeError, io.UnsupportedOperation):
+        # Output isn't going to a real file, so leave it alone.
+        pass
+    try:
+        fs.FileSystem(
+            commands=read_script(script),
+            hard_disk_capacity=hard_disk_capacity or 1000,
+            content_cache_size=content_cache_size,
+        ).initialize()
+    finally:
+        sys.stdout.flush()
+        sys.stdout = stdout
+        if script is not sys.stdin:
+            script.close()
+    return 0
 
 
 def main(args=None):
@@ -18,18 +77,67 @@ def main(args=None):
         nargs="+",
         help="If specified, execute a series of predetermined commands instead. Format as follows: --commands 'command 1' 'command 2'",
     )
+    parser.add_argument(
+        "--script",
+        metavar="PATH",
+        help="If specified, execute the commands in a script file, one per line, instead. Use - to read the script from stdin. Commands piped into stdin are run the same way when no other mode is given.",
+    )
     parser.add_argument(
         "--hard-disk-capacity",
         type=int,
         help="The capacity of the virtual hard disk, in bytes. Default is 1000.",
     )
+    parser.add_argument(
+        "--content-cache-size",
+        type=int,
+        default=0,
+        help="Cache the contents of files that are read, keeping up to this many bytes of their data. Default is 0, which disables the cache.",
+    )
+    parser.add_argument(
+        "--serve",
+        metavar="ADDRESS",
+        help="Serve a single shared filesystem on a Unix socket path or a host:port address instead. Connect with `fs-client ADDRESS`.",
+    )
+    parser.add_argument(
+        "--shards",
+        type=int,
+        help="Partition the filesystem across this many worker processes when running --commands. Each shard gets its own virtual hard disk.",
+    )
     args = parser.parse_args(args)
 
     try:
+        if args.serve:
+            server.serve(
+                args.serve,
+                fs.FileSystem(
+                    hard_disk_capacity=args.hard_disk_capacity or 1000,
+                    content_cache_size=args.content_cache_size,
+                ),
+            )
+            return 0
+        if args.shards and args.commands:
+            with shard.ShardedFileSystem(
+                shards=args.shards,
+                hard_disk_capacity=args.hard_disk_capacity or 1000,
+            ) as sharded:
+                for output, error in sharded.exec_many(args.commands):
+                    print(output, end="")
+                    if error:
+                        print(error)
+            return 0
+        if args.script or not (
+            args.commands or args.interactive or sys.stdin.isatty()
+        ):
+            return run_script(
+                args.script or "-",
+                args.hard_disk_capacity,
+                args.content_cache_size,
+            )
         fs.FileSystem(
             interactive=getattr(args, "interactive", None),
             commands=getattr(args, "commands", None),
-            hard_disk_capacity=getattr(args, "hard_disk_capacity", 1000),
+            hard_disk_capacity=args.hard_disk_capacity or 1000,
+            content_cache_size=args.content_cache_size,
         ).initialize()
         return 0
     except Exception as e:
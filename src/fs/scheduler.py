@@ -0,0 +1,152 @@
+import heapq
+import itertools
+import threading
+from typing import Dict, Hashable, List, Tuple
+
+# What every command costs on top of the bytes of its command line and its
+# output, so that many tiny commands still add up.
+COMMAND_COST = 256
+# Writes of more data than this are split into slices of at most this much,
+# which are scheduled one at a time.
+SLICE_SIZE = 1 << 16
+# Listings of directories with more children than this are split into slices
+# of at most this many, which are scheduled one at a time.
+LIST_SLICE = 1024
+# What listing each child of a directory is expected to cost.
+LIST_ENTRY_COST = 64
+
+
+def estimate_cost(command: str, entries: int = 0) -> int:
+    """
+    Estimate what a command costs before running it, from its command line,
+    so a write costs the bytes it writes. A listing costs the entries it's
+    expected to list too. What any other command turns out to cost once it
+    has run, like the bytes a `read` printed, is charged afterwards.
+    :param command: The command line.
+    :param entries: How many directory entries the command will list.
+    :return: The estimated cost.
+    """
+    return COMMAND_COST + len(command) + entries * LIST_ENTRY_COST
+
+
+def slices(command: str) -> List[str]:
+    """
+    Split a command into smaller commands which, run one after the other, do
+    the same thing. Only writes of more than SLICE_SIZE bytes are split up,
+    into writes of consecutive parts of their data.
+    :param command: The command line.
+    :return: The command lines of the slices, or just `command` if it isn't
+        split up.
+    """
+    if len(command) <= SLICE_SIZE or not command.startswith("write"):
+        return [command]
+    split_input = command.split()
+    if (
+        len(split_input) != 3
+        or split_input[0] != "write"
+        or len(split_input[2]) <= SLICE_SIZE
+    ):
+        return [command]
+    _, path, data = split_input
+    return [
+        f"write {path} {data[start : start + SLICE_SIZE]}"
+        for start in range(0, len(data), SLICE_SIZE)
+    ]
+
+
+class FairScheduler:
+    """
+    Decide whose command runs next when many clients share one filesystem,
+    one command at a time. This is self-clocked weighted fair queuing: each
+    command is tagged with the virtual time at which it would finish if every
+    client got a share of the filesystem in proportion to its weight, and the
+    command with the smallest tag runs next. A client's tags follow on from
+    each other, so its commands run in the order it issued them, and a client
+    that has just run something expensive waits behind the cheap commands of
+    everyone else.
+
+    Clients are anything hashable. Each one should only wait for a single
+    turn at a time, so that its commands are queued up in its own thread.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.busy = False
+        # The tag of the command that is running, which new clients start
+        # from so they can't claim more than their share of the past.
+        self.virtual_time = 0.0
+        self.finish_tags: Dict[Hashable, float] = dict()
+        self.weights: Dict[Hashable, float] = dict()
+        self.waiting: List[Tuple[float, int, threading.Event]] = []
+        self.sequence = itertools.count()
+
+    def set_weight(self, client: Hashable, weight: float) -> None:
+        """
+        Give a client a bigger or smaller share of the filesystem. A client
+        with twice the weight of another gets twice as much done while both
+        are busy. Clients have a weight of 1 until it's set.
+        :param client: The client.
+        :param weight: Its weight, which must be positive.
+        :return: None
+        """
+        if not weight > 0:
+            raise ValueError("Weights must be positive numbers.")
+        with self.lock:
+            self.weights[client] = weight
+
+    def acquire(self, client: Hashable, cost: float) -> None:
+        """
+        Wait for a client's turn to run a command.
+        :param client: The client.
+        :param cost: What the command is expected to cost.
+        :return: None
+        """
+        with self.lock:
+            start = max(self.virtual_time, self.finish_tags.get(client, 0.0))
+            tag = start + cost / self.weights.get(client, 1.0)
+            self.finish_tags[client] = tag
+            if not self.busy:
+                self.busy = True
+                self.virtual_time = tag
+                return
+            turn = threading.Event()
+            heapq.heappush(self.waiting, (tag, next(self.sequence), turn))
+        turn.wait()
+
+    def release(self) -> None:
+        """
+        End the turn of the command that is running, handing it straight to
+        the waiting command with the smallest tag.
+        :return: None
+        """
+        with self.lock:
+            if not self.waiting:
+                self.busy = False
+                return
+            tag, _, turn = heapq.heappop(self.waiting)
+            self.virtual_time = tag
+        turn.set()
+
+    def charge(self, client: Hashable, cost: float) -> None:
+        """
+        Charge a client for more than its last command was expected to cost,
+        which pushes its next commands back.
+        :param client: The client.
+        :param cost: The extra cost.
+        :return: None
+        """
+        with self.lock:
+            if client in self.finish_tags:
+                self.finish_tags[client] += cost / self.weights.get(
+                    client, 1.0
+                )
+
+    def forget(self, client: Hashable) -> None:
+        """
+        Drop everything kept about a client that has gone away.
+        :param client: The client.
+        :return: None
+        """
+        with self.lock:
+            self.finish_tags.pop(client, None)
+            self.weights.pop(client, None)
@@ -0,0 +1,206 @@
+import multiprocessing
+import pickle
+import re
+import threading
+from typing import List, Optional, Tuple, Union
+
+from .disk import VirtualDisk
+from .handle import PAYLOAD_HEADER_SIZE, payload_span
+
+# A file to search: its path, its blocks of data, and whether they must be
+# decoded to get at its bytes.
+SearchedFile = Tuple[str, List[tuple], bool]
+# Where a pattern was found: the path of the file and the offset of the
+# match in its bytes.
+Match = Tuple[str, int]
+
+
+def payloads(
+    hard_disk: VirtualDisk, data: List[tuple], escaped: bool
+) -> List[Tuple[Optional[Union[bytes, bytearray]], int, int]]:
+    """
+    Locate the bytes of every block of data of a file on the hard disk.
+    Blocks are only unpickled when they must be decoded; otherwise their
+    payload is found by parsing the header of the pickled string, and is
+    left where it is on the hard disk.
+    :param hard_disk: The virtual hard disk.
+    :param data: The (start, stop) tuples of the blocks of the file.
+    :param escaped: True if the bytes of the file don't match its data.
+    :return: A list of (buffer, start, stop) tuples, one for each block,
+        where buffer[start:stop] are the bytes of the block. Holes have no
+        buffer, and stop - start zero bytes.
+    """
+    pieces = []
+    for start, stop in data:
+        if start is None:
+            pieces.append((None, 0, stop))
+            continue
+        if not escaped:
+            buffer, offset = hard_disk.view(start, stop)
+            header_size = min(stop - start, PAYLOAD_HEADER_SIZE)
+            span = payload_span(bytes(buffer[offset : offset + header_size]))
+            if span and span[1] <= stop - start:
+                pieces.append((buffer, offset + span[0], offset + span[1]))
+                continue
+        contents = pickle.loads(hard_disk[start:stop]).encode(
+            "utf-8", "surrogateescape"
+        )
+        pieces.append((contents, 0, len(contents)))
+    return pieces
+
+
+def segments(
+    pieces: List[Tuple[Optional[Union[bytes, bytearray]], int, int]],
+    skip_holes: bool,
+) -> List[Tuple[int, Union[bytes, bytearray], int, int]]:
+    """
+    Put the blocks of a file together into runs that can be searched in one
+    go. A run of a single block is left where it is.
+    :param pieces: The blocks of the file, as returned by `payloads`.
+    :param skip_holes: If True, split the file up at its holes instead of
+        filling them in with zero bytes.
+    :return: A list of (offset of the run in the file, buffer, start, stop)
+        tuples, where buffer[start:stop] are the bytes of the run.
+    """
+    runs = []
+    run: list = []
+    offset = run_offset = 0
+    for piece in pieces:
+        length = piece[2] - piece[1]
+        if piece[0] is None and skip_holes:
+            if run:
+                runs.append((run_offset, run))
+            run, run_offset = [], offset + length
+        else:
+            run.append(piece)
+        offset += length
+    if run or not runs:
+        runs.append((run_offset, run))
+    result = []
+    for run_offset, run in runs:
+        if len(run) == 1 and run[0][0] is not None:
+            result.append((run_offset, *run[0]))
+            continue
+        buffer = b"".join(
+            bytes(stop) if piece is None else memoryview(piece)[start:stop]
+            for piece, start, stop in run
+        )
+        result.append((run_offset, buffer, 0, len(buffer)))
+    return result
+
+
+def search_files(
+    hard_disk: VirtualDisk,
+    files: List[SearchedFile],
+    pattern: bytes,
+    regex: bool,
+) -> List[Match]:
+    """
+    Find every match of a pattern in some files. The contents of a file
+    stored in one block are searched in place on the hard disk; those of a
+    file stored in several are joined together first, so that matches
+    spanning blocks are found.
+    :param hard_disk: The virtual hard disk.
+    :param files: The files to search.
+    :param pattern: The bytes to find, or a regular expression.
+    :param regex: True if `pattern` is a regular expression.
+    :return: The matches, in the order of `files` and then of offsets.
+        Matches don't overlap.
+
+    Holes are only filled in with zero bytes when the pattern could match
+    them; otherwise the runs of data between them are searched separately.
+    """
+    matcher = re.compile(pattern) if regex else None
+    step = max(len(pattern), 1)
+    matches = []
+    skip_holes = matcher is None and b"\0" not in pattern
+    for path, data, escaped in files:
+        pieces = payloads(hard_disk, data, escaped)
+        for offset, buffer, start, stop in segments(pieces, skip_holes):
+            if matcher is not None:
+                # Searching a view of just the contents keeps anchors and
+                # lookbehinds from seeing the bytes around them.
+                for match in matcher.finditer(memoryview(buffer)[start:stop]):
+                    matches.append((path, offset + match.start()))
+                continue
+            position = buffer.find(pattern, start, stop)
+            while position != -1:
+                matches.append((path, offset + position - start))
+                position = buffer.find(pattern, position + step, stop)
+    return matches
+
+
+# The state of a worker process of `search_in_pool`, inherited from the
+# process that forked it.
+_worker_state: Optional[Tuple[VirtualDisk, bytes, bool]] = None
+
+
+def _start_worker(hard_disk: VirtualDisk, pattern: bytes, regex: bool):
+    global _worker_state
+    _worker_state = (hard_disk, pattern, regex)
+
+
+def _search_group(files: List[SearchedFile]) -> List[Match]:
+    hard_disk, pattern, regex = _worker_state
+    return search_files(hard_disk, files, pattern, regex)
+
+
+def can_search_in_pool() -> bool:
+    """
+    Check whether `search_in_pool` can be used. Worker processes are forked,
+    which isn't possible everywhere, and isn't safe once the process has
+    started other threads, like a server does.
+    :return: True if searches can be split across processes.
+    """
+    return (
+        threading.active_count() == 1
+        and "fork" in multiprocessing.get_all_start_methods()
+    )
+
+
+def search_in_pool(
+    hard_disk: VirtualDisk,
+    files: List[SearchedFile],
+    pattern: bytes,
+    regex: bool,
+    workers: int,
+) -> List[Match]:
+    """
+    Find every match of a pattern in some files, like `search_files`, but
+    split across a pool of worker processes. The workers are forked, so they
+    share the hard disk with this process instead of being sent a copy of
+    it, and each is only sent the extents of the files it searches.
+    :param hard_disk: The virtual hard disk.
+    :param files: The files to search.
+    :param pattern: The bytes to find, or a regular expression.
+    :param regex: True if `pattern` is a regular expression.
+    :param workers: How many processes to search with.
+    :return: The matches, in the same order as `search_files` returns them.
+    """
+    sizes = [
+        sum(stop - start for start, stop in data if start is not None)
+        for _, data, _ in files
+    ]
+    # A few groups per worker keeps them all busy when some files are much
+    # bigger than others.
+    target = sum(sizes) / (workers * 4)
+    groups, group, size = [], [], 0
+    for file, file_size in zip(files, sizes):
+        group.append(file)
+        size += file_size
+        if size >= target:
+            groups.append(group)
+            group, size = [], 0
+    if group:
+        groups.append(group)
+    context = multiprocessing.get_context("fork")
+    with context.Pool(
+        workers,
+        initializer=_start_worker,
+        initargs=(hard_disk, pattern, regex),
+    ) as pool:
+        return [
+            match
+            for matches in pool.map(_search_group, groups, chunksize=1)
+            for match in matches
+        ]
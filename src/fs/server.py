@@ -0,0 +1,295 @@
+import contextlib
+import io
+import os
+import socket
+import socketserver
+import struct
+from typing import Callable, List, Optional, Tuple, Union
+
+from . import fs, scheduler
+
+# Every response starts with a status byte followed by the length of the
+# payload that comes after it.
+HEADER = struct.Struct("!BI")
+OK = 0
+ERROR = 1
+RECEIVE_SIZE = 65536
+
+
+def parse_address(address: str) -> Tuple[int, Union[str, Tuple[str, int]]]:
+    """
+    Translate an address given on the command line into a socket family and
+    address. Anything of the form `host:port` is a TCP address, and anything
+    else is the path of a Unix domain socket.
+    :param address: The address string to parse.
+    :return: A tuple of the socket family and the address to bind/connect.
+    """
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and "/" not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+
+def encode_response(status: int, payload: str) -> bytes:
+    """
+    Frame a single response.
+    :param status: OK or ERROR.
+    :param payload: The output of the command, or the error it raised. Bytes
+        of files that aren't valid UTF-8 are sent back as they are.
+    :return: The bytes to send back to the client.
+    """
+    body = payload.encode("utf-8", "surrogateescape")
+    return HEADER.pack(status, len(body)) + body
+
+
+class CommandHandler(socketserver.BaseRequestHandler):
+    """
+    Serve a single client connection. Requests are newline terminated command
+    lines, exactly as they would be typed in interactive mode. Clients may
+    pipeline as many requests as they like without waiting for responses:
+    every complete line in a chunk read from the socket is executed in order
+    and all of their responses are sent back together.
+    """
+
+    def setup(self) -> None:
+        # Every connection gets its own working directory, starting at root,
+        # and may have a transaction open.
+        self.current_location = ""
+        self.transaction = None
+
+    def finish(self) -> None:
+        # A transaction left open by a client that went away is aborted.
+        if self.transaction is not None:
+            self.server.execute(self, "abort")
+        self.server.scheduler.forget(self)
+
+    def handle(self) -> None:
+        pending = b""
+        while True:
+            chunk = self.request.recv(RECEIVE_SIZE)
+            if not chunk:
+                return
+            *lines, pending = (pending + chunk).split(b"\n")
+            responses = []
+            for line in lines:
+                command = line.decode().strip()
+                if not command:
+                    continue
+                if command == "exit":
+                    responses.append(encode_response(OK, ""))
+                    self.request.sendall(b"".join(responses))
+                    return
+                responses.append(self.server.execute(self, command))
+            if responses:
+                self.request.sendall(b"".join(responses))
+
+
+class FileSystemServerMixin:
+    """
+    Hold the FileSystem shared by every connection to the server. Commands are
+    executed one at a time, with their output captured instead of printed,
+    in the order a FairScheduler picks, so that a connection running big
+    commands can't hold up everyone else. Transactions are only held while
+    their individual commands run, so many connections can have one open at
+    once.
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, address, filesystem: fs.FileSystem):
+        self.filesystem = filesystem
+        self.scheduler = scheduler.FairScheduler()
+        super().__init__(address, CommandHandler)
+
+    def execute(self, session: CommandHandler, command: str) -> bytes:
+        """
+        Run a command on behalf of a connection. Big writes are run a slice
+        at a time, letting other connections' commands run in between, in a
+        transaction so nobody sees them half done. If someone else changed
+        the file in the meantime, the write is run again in one go.
+        :param session: The handler of the connection issuing the command.
+        :param command: The command line to execute.
+        :return: The framed response for the command.
+        """
+        if command.startswith("weight"):
+            split_input = command.split()
+            if split_input[0] == "weight":
+                return self.__weight(session, split_input[1:])
+        if command.startswith("ls"):
+            split_input = command.split()
+            if split_input[0] == "ls" and len(split_input) <= 2:
+                return self.__list(session, command, split_input[1:])
+        pieces = scheduler.slices(command)
+        if len(pieces) == 1:
+            return encode_response(*self.__run(session, command))
+        implicit = session.transaction is None
+        if implicit:
+            self.__run(session, "begin")
+        for piece in pieces:
+            status, output = self.__run(session, piece)
+            if status == ERROR:
+                break
+        if not implicit:
+            return encode_response(status, output)
+        if status == ERROR:
+            self.__run(session, "abort")
+            return encode_response(status, output)
+        status, output = self.__run(session, "commit")
+        if status == ERROR:
+            return encode_response(*self.__run(session, command))
+        return encode_response(status, output)
+
+    def __weight(self, session: CommandHandler, inputs: List[str]) -> bytes:
+        """
+        Set the share of the filesystem a connection gets while others are
+        busy too, relative to the default of 1.
+        :param session: The handler of the connection.
+        :param inputs: A single element list of the weight.
+        :return: The framed response for the command.
+        """
+        if len(inputs) != 1:
+            return encode_response(ERROR, "Usage: weight <weight>")
+        try:
+            self.scheduler.set_weight(session, float(inputs[0]))
+        except ValueError:
+            return encode_response(ERROR, "Weights must be positive numbers.")
+        return encode_response(OK, "")
+
+    def __list(
+        self, session: CommandHandler, command: str, inputs: List[str]
+    ) -> bytes:
+        """
+        List a directory a slice of its children at a time, letting other
+        connections' commands run in between, so listing a big directory
+        can't hold up everyone else. Each slice starts from the key after the
+        last one listed, so children that stay put are listed exactly once
+        even if others come and go in the meantime. Inside a transaction the
+        listing is run in one go, so it sees the transaction's changes.
+        :param session: The handler of the connection issuing the command.
+        :param command: The command line.
+        :param inputs: The directory to list, if not the working directory.
+        :return: The framed response for the command.
+        """
+        path = inputs[0] if inputs else "."
+        listed = []
+        start: List[Optional[str]] = [None]
+
+        def run() -> None:
+            start[0] = self.filesystem.ls(
+                inputs, start=start[0], limit=scheduler.LIST_SLICE
+            )
+
+        while True:
+            # Looked up before waiting for a turn, so it's only an estimate.
+            entries = self.filesystem.count_entries(
+                path, session.current_location
+            )
+            if session.transaction is not None:
+                cost = scheduler.estimate_cost(command, entries)
+                return encode_response(*self.__run(session, command, cost))
+            cost = scheduler.estimate_cost(
+                command, min(entries, scheduler.LIST_SLICE)
+            )
+            status, output = self.__run(session, command, cost, run)
+            if status == ERROR:
+                return encode_response(status, output)
+            listed.append(output)
+            if start[0] is None:
+                return encode_response(OK, "".join(listed))
+
+    def __run(
+        self,
+        session: CommandHandler,
+        command: str,
+        cost: Optional[int] = None,
+        run: Optional[Callable[[], None]] = None,
+    ) -> Tuple[int, str]:
+        """
+        Wait for the connection's turn, then run a command for it. Unless
+        its cost is known up front, the connection is charged for the bytes
+        of output too once it has run.
+        :param session: The handler of the connection issuing the command.
+        :param command: The command line to execute.
+        :param cost: What the command is expected to cost, if it's known
+            better than from its command line.
+        :param run: What to run instead of the command line, if anything.
+        :return: The status of the command and its output, or the error it
+            raised.
+        """
+        output = io.StringIO()
+        charge = cost is None
+        if charge:
+            cost = scheduler.estimate_cost(command)
+        self.scheduler.acquire(session, cost)
+        try:
+            self.filesystem.current_location = session.current_location
+            self.filesystem.transaction = session.transaction
+            with contextlib.redirect_stdout(output):
+                if run is None:
+                    self.filesystem.exec(command)
+                else:
+                    run()
+        except Exception as e:
+            return ERROR, str(e)
+        finally:
+            session.current_location = self.filesystem.current_location
+            session.transaction = self.filesystem.transaction
+            self.filesystem.transaction = None
+            self.scheduler.release()
+            if charge:
+                self.scheduler.charge(session, output.tell())
+        return OK, output.getvalue()
+
+
+class UnixFileSystemServer(
+    FileSystemServerMixin, socketserver.ThreadingUnixStreamServer
+):
+    """
+    Serve a FileSystem over a Unix domain socket.
+    """
+
+
+class TCPFileSystemServer(
+    FileSystemServerMixin, socketserver.ThreadingTCPServer
+):
+    """
+    Serve a FileSystem over a local TCP socket.
+    """
+
+
+def make_server(
+    address: str, filesystem: fs.FileSystem
+) -> Union[UnixFileSystemServer, TCPFileSystemServer]:
+    """
+    Create a server for `filesystem` listening on `address`. A stale socket
+    file left behind by a previous server is removed first.
+    :param address: A Unix socket path or a `host:port` pair.
+    :param filesystem: The FileSystem to share between clients.
+    :return: The server, ready for `serve_forever`.
+    """
+    family, parsed = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(parsed):
+            os.unlink(parsed)
+        return UnixFileSystemServer(parsed, filesystem)
+    return TCPFileSystemServer(parsed, filesystem)
+
+
+def serve(address: str, filesystem: fs.FileSystem) -> None:
+    """
+    Serve `filesystem` on `address` until interrupted.
+    :param address: A Unix socket path or a `host:port` pair.
+    :param filesystem: The FileSystem to share between clients.
+    :return: None
+    """
+    server = make_server(address, filesystem)
+    print(f"Serving on {address}. Use Ctrl-C to stop.", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if isinstance(server, UnixFileSystemServer):
+            os.unlink(server.server_address)
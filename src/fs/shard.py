@@ -0,0 +1,567 @@
+import contextlib
+import heapq
+import io
+import multiprocessing
+import os
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from . import exceptions, fs
+
+# An operation for a worker: the name of a FileSystem method (or one of the
+# helpers below), its list of arguments and the working directory to run it
+# from. Command lines that need no planning are sent as they are instead.
+Operation = Union[Tuple[str, List[str], str], str]
+# What a worker sends back for each operation: the captured output, the
+# exception the operation raised if any, and the working directory after it.
+Result = Tuple[str, Optional[Exception], str]
+COMMANDS = {"ls", "find", "touch", "mkdir", "pwd", "cd", "rm", "cp", "mv"}
+COMMANDS |= {"symlink", "write", "read", "fallocate", "hardlink", "exit"}
+COMMANDS |= {"truncate"}
+# Commands that can be forwarded to a shard as they are when every path they
+# name is on it, and where the paths among their words end (None for all).
+FORWARDED = {"touch": None, "mkdir": None, "rm": None, "ls": None}
+FORWARDED.update({"symlink": None, "hardlink": None, "read": 2, "write": 2})
+FORWARDED.update({"fallocate": 2, "truncate": 2})
+
+
+def _check_directory(filesystem: fs.FileSystem, inputs: List[str]) -> None:
+    """
+    Make sure the target of a cross-shard copy is an existing directory.
+    :param filesystem: The filesystem of the worker.
+    :param inputs: A single element list holding an absolute path.
+    :return: None
+    """
+    node = filesystem.inode_index.get(inputs[0], None)
+    if not node:
+        raise exceptions.PathException(f"Path {inputs[0]} does not exist.")
+    if not node.is_directory:
+        raise exceptions.ImproperArguments("Cannot move items to a file.")
+
+
+def _export(filesystem: fs.FileSystem, inputs: List[str]) -> None:
+    """
+    Print the contents of a file that is about to be copied to another shard.
+    :param filesystem: The filesystem of the worker.
+    :param inputs: An absolute path, followed by "mv" if the file is moving
+        or "cp" if it's being copied.
+    :return: None
+    """
+    node = filesystem.inode_index.get(inputs[0], None)
+    if not node:
+        raise exceptions.PathException(f"Path {inputs[0]} does not exist.")
+    if isinstance(node, fs.SymLink):
+        # Symlinks can't point across shards, so neither can be recreated
+        # on another one.
+        raise exceptions.ImproperArguments(
+            f"Cannot {inputs[1]} {inputs[0]} to another shard: "
+            "it is a symlink."
+        )
+    if node.is_directory:
+        raise exceptions.ImproperArguments(
+            "Operation unsupported on directories."
+        )
+    if inputs[1:] == ["mv"] and node.hardlinks:
+        raise exceptions.ImproperArguments(
+            f"Cannot move {inputs[0]} to another shard: it has hardlinks."
+        )
+    filesystem.read([inputs[0]])
+
+
+def _import(filesystem: fs.FileSystem, inputs: List[str]) -> None:
+    """
+    Create a file copied from another shard.
+    :param filesystem: The filesystem of the worker.
+    :param inputs: The absolute path of the new file and its contents.
+    :return: None
+    """
+    filesystem.touch([inputs[0]])
+    if inputs[1]:
+        filesystem.write(inputs)
+
+
+def _hardlink(filesystem: fs.FileSystem, inputs: List[str]) -> None:
+    """
+    Create a hardlink on the worker's filesystem.
+    :param filesystem: The filesystem of the worker.
+    :param inputs: The source and the name of the link.
+    :return: None
+    """
+    filesystem.link(inputs, hard=True)
+
+
+HELPERS: Dict[str, Callable[[fs.FileSystem, List[str]], None]] = {
+    "_check_directory": _check_directory,
+    "_export": _export,
+    "_hardlink": _hardlink,
+    "_import": _import,
+}
+
+
+def _serve(connection, hard_disk_capacity: int) -> None:
+    """
+    The main loop of a worker process: receive batches of operations, run
+    them against the shard's own FileSystem and send back their results.
+    Each batch comes with the router's working directory, which the command
+    lines forwarded in it as they were given are run from.
+    :param connection: The worker's end of the pipe to the router.
+    :param hard_disk_capacity: The capacity of this shard's virtual disk.
+    :return: None
+    """
+    filesystem = fs.FileSystem(hard_disk_capacity=hard_disk_capacity)
+    while True:
+        batch = connection.recv()
+        if batch is None:
+            return
+        working_directory, operations = batch
+        results = []
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            for operation in operations:
+                start = output.tell()
+                error = None
+                try:
+                    if isinstance(operation, str):
+                        filesystem.current_location = working_directory
+                        filesystem.exec(operation)
+                    else:
+                        method, inputs, location = operation
+                        filesystem.current_location = location
+                        if method in HELPERS:
+                            HELPERS[method](filesystem, inputs)
+                        else:
+                            getattr(filesystem, method)(inputs)
+                except Exception as e:
+                    error = e
+                output.seek(start)
+                results.append(
+                    (output.read(), error, filesystem.current_location)
+                )
+        connection.send(results)
+
+
+def absolute_path(current_location: str, path: str) -> str:
+    """
+    Lexically translate a path that may be relative and may include special
+    characters (./..) into an absolute path.
+    :param current_location: The absolute path of the working directory.
+    :param path: The path to translate.
+    :return: The absolute path, where the root is the empty string.
+    """
+    if "." not in path and "//" not in path and not path.endswith("/"):
+        # Nothing to resolve, which is by far the most common case.
+        return path if path.startswith("/") else f"{current_location}/{path}"
+    parts = [] if path.startswith("/") else current_location.split("/")[1:]
+    for item in path.split("/"):
+        if item in ["", "."]:
+            continue
+        elif item == "..":
+            if parts:
+                parts.pop()
+        else:
+            parts.append(item)
+    return "".join("/" + part for part in parts)
+
+
+class ShardedFileSystem:
+    """
+    A filesystem whose namespace is partitioned across a pool of worker
+    processes, each owning its own FileSystem, inode index and hard disk.
+
+    Every top-level item belongs to the shard picked by a hash of its name,
+    along with everything beneath it. The root directory exists on every
+    shard, so listing it merges the listings of all of them. Commands are
+    routed here by the paths they name, and copies and moves between shards
+    are carried out by reading the file on one shard and recreating it on the
+    other.
+
+    `exec_many` sends the commands for different shards to their workers at
+    the same time, so that workloads spread over many top-level directories
+    use every core. Symlinks and hardlinks must stay within a single shard.
+    """
+
+    # How many operations are collected for a shard before they are sent.
+    BATCH_SIZE = 256
+
+    def __init__(self, shards: int = None, hard_disk_capacity: int = 1000):
+        """
+        Start the worker processes.
+        :param shards: How many worker processes to partition the namespace
+            across. Defaults to the number of CPUs.
+        :param hard_disk_capacity: The capacity of each shard's virtual hard
+            disk, in bytes.
+        """
+        self.shards = shards or os.cpu_count() or 1
+        self.current_location = ""
+        self.connections = []
+        self.workers = []
+        for _ in range(self.shards):
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(
+                target=_serve,
+                args=(worker_connection, hard_disk_capacity),
+                daemon=True,
+            )
+            worker.start()
+            worker_connection.close()
+            self.connections.append(connection)
+            self.workers.append(worker)
+
+    def __enter__(self) -> "ShardedFileSystem":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Stop every worker process.
+        :return: None
+        """
+        for connection in self.connections:
+            connection.send(None)
+            connection.close()
+        for worker in self.workers:
+            worker.join()
+        self.connections = []
+        self.workers = []
+
+    def shard(self, path: str) -> int:
+        """
+        Find the shard owning an absolute path.
+        :param path: An absolute path, as returned by `absolute_path`.
+        :return: The index of the shard.
+        """
+        top_level = path.split("/")[1] if path else ""
+        return zlib.crc32(top_level.encode()) % self.shards
+
+    def __route(self, split_input: List[str]) -> Optional[int]:
+        """
+        Find the shard a command can be forwarded to as it is, without
+        planning it: one that names no path that needs translating, with
+        every path it names on the same shard.
+        :param split_input: The command and its arguments.
+        :return: The index of the shard, or None if the command needs to be
+            planned.
+        """
+        command = split_input[0]
+        if command not in FORWARDED:
+            return None
+        paths = split_input[1 : FORWARDED[command]]
+        if not paths:
+            # Only a listing of the working directory names no path, and
+            # the root is spread over every shard.
+            if command != "ls" or not self.current_location:
+                return None
+            return self.shard(self.current_location)
+        shard = None
+        for path in paths:
+            if "." in path or "//" in path or path[-1] == "/":
+                return None
+            elif path[0] == "/":
+                top_level = path[1:].partition("/")[0]
+            elif self.current_location:
+                top_level = self.current_location[1:].partition("/")[0]
+            else:
+                top_level = path.partition("/")[0]
+            path_shard = zlib.crc32(top_level.encode()) % self.shards
+            if shard is not None and path_shard != shard:
+                return None
+            shard = path_shard
+        return shard
+
+    def __run(
+        self, batches: Dict[int, List[Operation]]
+    ) -> Dict[int, List[Result]]:
+        """
+        Send a batch of operations to each shard, then wait for all of them.
+        The shards work through their batches in parallel.
+        :param batches: A mapping of shard index to its operations.
+        :return: A mapping of shard index to the results of its operations.
+        """
+        for shard, batch in batches.items():
+            self.connections[shard].send((self.current_location, batch))
+        return {
+            shard: self.connections[shard].recv() for shard in batches.keys()
+        }
+
+    def __call(self, shard: int, method: str, inputs: List[str]) -> Result:
+        """
+        Run a single operation on a shard and raise whatever it raised.
+        :param shard: The index of the shard.
+        :param method: The name of the FileSystem method or helper.
+        :param inputs: The arguments of the operation.
+        :return: The result of the operation.
+        """
+        result = self.__run({shard: [(method, inputs, "")]})[shard][0]
+        if result[1]:
+            raise result[1]
+        return result
+
+    def __plan(
+        self, split_input: List[str]
+    ) -> List[List[Tuple[int, Operation]]]:
+        """
+        Translate a command into the operations the shards need to run for
+        it. The plan is a list of steps whose outputs are printed in order. A
+        step is a list of operations whose outputs are merged: a step with more
+        than one operation is a listing fanned out across every shard.
+        :param split_input: The command and its arguments.
+        :return: The plan for the command.
+        """
+        command, inputs = split_input[0], split_input[1:]
+        every_shard = range(self.shards)
+        plan = []
+        if command == "ls":
+            for path in [
+                absolute_path(self.current_location, path)
+                for path in inputs or ["."]
+            ]:
+                if path:
+                    plan.append([(self.shard(path), ("ls", [path], ""))])
+                else:
+                    plan.append(
+                        [(shard, ("ls", [""], "")) for shard in every_shard]
+                    )
+        elif command == "find":
+            if not inputs or self.current_location:
+                shard = self.shard(self.current_location)
+                plan.append([(shard, ("find", inputs, self.current_location))])
+            for name in inputs if not self.current_location else []:
+                if name.endswith("*"):
+                    plan.append(
+                        [
+                            (shard, ("find", [name], ""))
+                            for shard in every_shard
+                        ]
+                    )
+                else:
+                    plan.append(
+                        [(self.shard("/" + name), ("find", [name], ""))]
+                    )
+        elif command in ["touch", "mkdir", "rm"]:
+            if not inputs:
+                plan.append([(0, (command, [], ""))])
+            for path in inputs:
+                path = absolute_path(self.current_location, path)
+                plan.append([(self.shard(path), (command, [path], ""))])
+        elif command in ["read", "write", "fallocate", "truncate"]:
+            if inputs:
+                inputs = [
+                    absolute_path(self.current_location, inputs[0])
+                ] + inputs[1:]
+            shard = self.shard(inputs[0]) if inputs else 0
+            plan.append([(shard, (command, inputs, ""))])
+        elif command in ["symlink", "hardlink"]:
+            paths = [
+                absolute_path(self.current_location, path) for path in inputs
+            ]
+            shards = {self.shard(path) for path in paths}
+            if len(shards) > 1:
+                raise exceptions.ImproperArguments(
+                    f"Cannot {command} across shards."
+                )
+            method = "link" if command == "symlink" else "_hardlink"
+            plan.append([(shards.pop() if shards else 0, (method, paths, ""))])
+        return plan
+
+    def __transfer(self, inputs: List[str], move: bool) -> str:
+        """
+        Copy or move files, including between shards. Files that stay on one
+        shard are handed to that shard's `cp`, the rest are read from their
+        shard and recreated on the shard of the target.
+        :param inputs: The sources followed by the target directory.
+        :param move: True if the sources should be removed afterwards.
+        :return: The output of the command.
+        """
+        action = "mv" if move else "cp"
+        if len(inputs) < 2:
+            raise exceptions.ImproperArguments(
+                f"Usage: {action} source ... target"
+            )
+        paths = [absolute_path(self.current_location, path) for path in inputs]
+        target = paths[-1]
+        target_shard = self.shard(target)
+        self.__call(target_shard, "_check_directory", [target])
+        output = ""
+        for source in paths[:-1]:
+            source_shard = self.shard(source)
+            if source_shard == target_shard:
+                output += self.__call(source_shard, action, [source, target])[
+                    0
+                ]
+                continue
+            try:
+                contents = self.__call(
+                    source_shard, "_export", [source, action]
+                )[0]
+            except exceptions.PathException as e:
+                output += f"{e}\n"
+                continue
+            # `read` ends the contents with a newline of its own.
+            self.__call(
+                target_shard,
+                "_import",
+                [f"{target}/{source.split('/')[-1]}", contents[:-1]],
+            )
+            if move:
+                self.__call(source_shard, "rm", [source])
+        return output
+
+    def __cd(self, inputs: List[str]) -> None:
+        """
+        Change the working directory of the router, after checking with the
+        shard that owns it that it is a directory.
+        :param inputs: A single element list holding the new directory.
+        :return: None
+        """
+        if not inputs or len(inputs) != 1:
+            raise exceptions.ImproperArguments("Usage: cd target")
+        path = absolute_path(self.current_location, inputs[0])
+        self.current_location = self.__call(self.shard(path), "cd", [path])[2]
+
+    def __execute(self, split_input: List[str]) -> str:
+        """
+        Run the commands that can't be planned ahead of time because they
+        depend on the results of other operations, or need none at all.
+        :param split_input: The command and its arguments.
+        :return: The output of the command.
+        """
+        command, inputs = split_input[0], split_input[1:]
+        if command == "pwd":
+            if inputs:
+                raise exceptions.ImproperArguments("pwd: too many arguments")
+            return self.current_location + "/\n"
+        elif command == "cd":
+            self.__cd(inputs)
+            return ""
+        return self.__transfer(inputs, move=command == "mv")
+
+    def exec_many(
+        self, commands: List[str]
+    ) -> List[Tuple[str, Optional[Exception]]]:
+        """
+        Execute a list of commands, sending consecutive commands for different
+        shards to their workers together so that the shards run in parallel.
+        Commands that need several round trips, like `cd` and copies between
+        shards, wait for everything before them to finish.
+        :param commands: Command strings, as accepted by `exec`.
+        :return: A list with the output of each command and the exception it
+            raised, if any.
+        """
+        results: List[Tuple[str, Optional[Exception]]] = []
+        pending: List[List[Operation]] = [[] for _ in range(self.shards)]
+        received: Dict[int, List[Result]] = {}
+        in_flight = set()
+        # The index of every command along with its plan, or just the shard
+        # it was forwarded to.
+        plans: List[Tuple[int, Union[int, list]]] = []
+
+        def send(shard):
+            # Keep at most one batch in flight per shard, so that the router
+            # keeps planning while the workers execute without either side
+            # filling up the pipe between them.
+            if shard in in_flight:
+                received[shard].extend(self.connections[shard].recv())
+            else:
+                received.setdefault(shard, [])
+            self.connections[shard].send(
+                (self.current_location, pending[shard])
+            )
+            pending[shard] = []
+            in_flight.add(shard)
+
+        def flush():
+            for shard in range(self.shards):
+                if pending[shard]:
+                    send(shard)
+            for shard in in_flight:
+                received[shard].extend(self.connections[shard].recv())
+            in_flight.clear()
+            outputs = {
+                shard: iter(shard_results)
+                for shard, shard_results in received.items()
+            }
+            for index, plan in plans:
+                if isinstance(plan, int):
+                    result = next(outputs[plan])
+                    results[index] = (result[0], result[1])
+                    continue
+                text, error = "", None
+                for step in plan:
+                    step_results = [next(outputs[shard]) for shard, _ in step]
+                    errors = [
+                        result[1] for result in step_results if result[1]
+                    ]
+                    if errors and not error:
+                        error = errors[0]
+                    if len(step_results) == 1:
+                        text += step_results[0][0]
+                    else:
+                        text += "".join(
+                            heapq.merge(
+                                *(
+                                    result[0].splitlines(keepends=True)
+                                    for result in step_results
+                                ),
+                                key=lambda line: line.lstrip("/"),
+                            )
+                        )
+                results[index] = (text, error)
+            received.clear()
+            plans.clear()
+
+        for command in commands:
+            results.append(("", None))
+            split_input = command.split()
+            if not split_input:
+                continue
+            elif split_input[0] not in COMMANDS:
+                results[-1] = (
+                    f"Unrecognized command: {split_input[0]}\n",
+                    None,
+                )
+                continue
+            elif split_input[0] == "exit":
+                break
+            shard = self.__route(split_input)
+            if shard is not None:
+                # Forwarded as it is, for the worker to resolve its paths.
+                pending[shard].append(command)
+                if len(pending[shard]) >= self.BATCH_SIZE:
+                    send(shard)
+                plans.append((len(results) - 1, shard))
+                continue
+            try:
+                if split_input[0] in ["pwd", "cd", "cp", "mv"]:
+                    if split_input[0] != "pwd":
+                        flush()
+                    results[-1] = (self.__execute(split_input), None)
+                    continue
+                plan = self.__plan(split_input)
+            except Exception as e:
+                results[-1] = ("", e)
+                continue
+            for step in plan:
+                for shard, operation in step:
+                    pending[shard].append(operation)
+                    if len(pending[shard]) >= self.BATCH_SIZE:
+                        send(shard)
+            plans.append((len(results) - 1, plan))
+        flush()
+        return results
+
+    def exec(self, command: str) -> int:
+        """
+        Execute a single command, printing its output. This behaves like
+        `FileSystem.exec`, raising the same exceptions.
+        :param command: A string indicating a command and its arguments.
+        :return: 1 when the `exit` command is issued.
+        """
+        if command.split()[0] == "exit":
+            return 1
+        output, error = self.exec_many([command])[0]
+        print(output, end="")
+        if error:
+            raise error
+        return 0
@@ -0,0 +1,129 @@
+from collections.abc import MutableMapping
+from typing import Any, Dict, Iterator, List, Set, Tuple
+
+# Marks a path removed by a transaction.
+DELETED = object()
+
+
+class TransactionIndex(MutableMapping):
+    """
+    A private view of an inode index for a transaction. The first time a
+    path is looked up, the node there is copied into the view, and every
+    change the transaction makes from then on is made to the copy, leaving
+    the shared index untouched until the transaction commits.
+
+    Every path looked up or set is added to the read set along with its
+    version at the time, whether or not anything was there, so that a commit
+    can tell whether any of them changed since.
+    """
+
+    def __init__(self, base: Dict[str, Any], versions: Dict[str, int]):
+        """
+        Create an empty view.
+        :param base: The shared inode index.
+        :param versions: The version of every path changed while any
+            transaction is open.
+        """
+        self.base = base
+        self.versions = versions
+        # The nodes of the view, or DELETED, by path, and the node in the
+        # shared index each path was first copied from along with the copy.
+        self.local: Dict[str, Any] = dict()
+        self.copies: Dict[str, Tuple[Any, Any]] = dict()
+        self.reads: Dict[str, int] = dict()
+
+    def __record(self, key: str) -> None:
+        if key not in self.reads:
+            self.reads[key] = self.versions.get(key, 0)
+
+    def __getitem__(self, key: str) -> Any:
+        node = self.local.get(key, None)
+        if node is None:
+            self.__record(key)
+            original = self.base[key]
+            node = self.local[key] = original.copy()
+            self.copies[key] = (original, node)
+        if node is DELETED:
+            raise KeyError(key)
+        return node
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.__record(key)
+        self.local[key] = value
+
+    def __delitem__(self, key: str) -> None:
+        self[key]
+        self.local[key] = DELETED
+
+    def __iter__(self) -> Iterator[str]:
+        for key in self.base:
+            if self.local.get(key, None) is not DELETED:
+                yield key
+        for key, node in self.local.items():
+            if node is not DELETED and key not in self.base:
+                yield key
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def is_copy(self, key: str, node: Any, original: Any) -> bool:
+        """
+        Check whether a node in the view is the copy of a node in the shared
+        index, rather than something that replaced it.
+        :param key: The path of the nodes.
+        :param node: The node in the view.
+        :param original: The node in the shared index.
+        :return: True if `node` was copied from `original`.
+        """
+        return self.copies.get(key, (None, None)) == (original, node)
+
+    def conflicts(self) -> List[str]:
+        """
+        Find the paths in the read set that have changed since they were
+        read.
+        :return: The changed paths.
+        """
+        return [
+            key
+            for key, version in self.reads.items()
+            if self.versions.get(key, 0) != version
+        ]
+
+
+class Transaction:
+    """
+    The state of an open transaction, started by the `begin` command. While
+    it's open, the commands of the session that began it run against its
+    private view, and everything they would change in the filesystem is
+    recorded here so the changes can be applied by `commit` or thrown away
+    by `abort`.
+    """
+
+    def __init__(self, base: Dict[str, Any], versions: Dict[str, int]):
+        """
+        Start a transaction.
+        :param base: The shared inode index.
+        :param versions: The version of every path changed while any
+            transaction is open.
+        """
+        self.index = TransactionIndex(base, versions)
+        # Symlink resolutions made inside the transaction, kept apart from
+        # the shared ones since they may go through its uncommitted changes.
+        self.symlink_cache: Dict[str, Tuple[str, List[str]]] = dict()
+        self.symlink_dependents: Dict[str, Set[str]] = dict()
+        # Every path changed, and the events to deliver to watches, once
+        # the transaction commits.
+        self.changed: Set[str] = set()
+        self.events: List[tuple] = []
+        # Spans of the hard disk taken for the transaction's data, and spans
+        # of committed data it threw away, which are only freed once it
+        # commits.
+        self.allocated: List[Tuple[int, int]] = []
+        self.freed: List[Tuple[int, int]] = []
+        # True while one of the transaction's commands is running, and once
+        # one of them has failed.
+        self.active = False
+        self.failed = False
+        # The working directory when the transaction began, which is gone
+        # back to if it's aborted.
+        self.location = ""
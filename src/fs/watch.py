@@ -0,0 +1,89 @@
+import threading
+from collections import deque
+from typing import Deque, List, NamedTuple, Set
+
+CREATE = "create"
+MODIFY = "modify"
+DELETE = "delete"
+MOVE = "move"
+# Queued in place of the events a watch had no room for. Whoever reads it
+# has missed changes and should look at the filesystem again.
+OVERFLOW = "overflow"
+
+
+class Event(NamedTuple):
+    """
+    A change to the filesystem. Moves name both where the item was and where
+    it went; every other event only has a `path`.
+    """
+
+    kind: str
+    path: str
+    destination: str = ""
+
+
+class Watch:
+    """
+    A subscription to the changes made to a path, returned by
+    `FileSystem.watch`. A watch on a directory sees events for the directory
+    itself and its children, or for everything beneath it if it's recursive.
+
+    Events queue up until they are read in a batch with `read`. The queue is
+    bounded: repeated modifications of the same path are coalesced into one
+    event while unread, unless something else happened to the path between
+    them, and once the queue is full any further events are dropped and a
+    single OVERFLOW event is queued instead.
+    """
+
+    def __init__(self, path: str, recursive: bool, max_events: int):
+        """
+        Create a watch. This is meant to be called by `FileSystem.watch`
+        only.
+        :param path: The absolute path being watched.
+        :param recursive: If True, watch the whole subtree below the path.
+        :param max_events: The most events to queue before overflowing.
+        """
+        self.path = path
+        self.recursive = recursive
+        self.max_events = max_events
+        self.overflowed = False
+        self.__events: Deque[Event] = deque()
+        self.__modified: Set[str] = set()
+        self.__lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.__events)
+
+    def push(self, event: Event) -> None:
+        """
+        Queue an event.
+        :param event: The event.
+        :return: None
+        """
+        with self.__lock:
+            if event.kind == MODIFY:
+                if event.path in self.__modified:
+                    return
+                self.__modified.add(event.path)
+            else:
+                # Only modifications with nothing else of the path between
+                # them are coalesced.
+                self.__modified.discard(event.path)
+                self.__modified.discard(event.destination)
+            if len(self.__events) < self.max_events:
+                self.__events.append(event)
+            elif not self.overflowed:
+                self.overflowed = True
+                self.__events.append(Event(OVERFLOW, self.path))
+
+    def read(self) -> List[Event]:
+        """
+        Take every queued event.
+        :return: The events, oldest first.
+        """
+        with self.__lock:
+            events = list(self.__events)
+            self.__events.clear()
+            self.__modified.clear()
+            self.overflowed = False
+        return events
@@ -0,0 +1,76 @@
+import pickle
+
+from fs import fs
+from fs.cache import ContentCache
+
+
+class TestContentCache:
+    def test_links_share_an_entry(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch config",
+                "write config one",
+                "hardlink config hard",
+                "symlink config soft",
+                "read config",
+                "read hard",
+                "read soft",
+            ],
+            content_cache_size=1000,
+        )
+        filesystem.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "one\none\none\n"
+        assert filesystem.content_cache.stats() == {
+            "hits": 2,
+            "misses": 1,
+            "evictions": 0,
+            "entries": 1,
+            "bytes": len(pickle.dumps("one")),
+        }
+
+    def test_invalidated_on_change(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch a",
+                "symlink a link",
+                "write a one",
+                "read link",
+                "write link two",
+                "read a",
+                "rm a",
+                "touch a",
+                "write a three",
+                "read link",
+            ],
+            content_cache_size=1000,
+        )
+        filesystem.initialize()
+        with filesystem.open("a", "a") as handle:
+            handle.write(b"four")
+        filesystem.exec("read a")
+
+        captured = capsys.readouterr()
+        assert captured.out == "one\nonetwo\nthree\nthreefour\n"
+        assert filesystem.content_cache.hits == 0
+        assert filesystem.content_cache.misses == 4
+
+    def test_lru_eviction(self):
+        cache = ContentCache(10)
+        cache.put("a", "a", 4)
+        cache.put("b", "b", 4)
+        assert cache.get("a") == "a"
+        cache.put("c", "c", 4)
+        assert cache.get("b") is None
+        assert cache.get("a") == "a"
+        assert cache.get("c") == "c"
+        cache.put("huge", "huge", 11)
+        assert cache.get("huge") is None
+        assert cache.stats() == {
+            "hits": 3,
+            "misses": 2,
+            "evictions": 1,
+            "entries": 2,
+            "bytes": 8,
+        }
@@ -53,3 +53,10 @@ class TestCd:
         ).initialize()
         captured = capsys.readouterr()
         assert captured.out == "/\n"
+
+    def test_parent_of_nested_directory(self, capsys):
+        fs.FileSystem(
+            commands=["mkdir a a/b a/c", "cd a/b", "touch ../c/d", "ls ../c"]
+        ).initialize()
+        captured = capsys.readouterr()
+        assert captured.out == "d\n"
@@ -41,3 +41,19 @@ class TestCp:
 
         captured = capsys.readouterr()
         assert captured.out == f"Path {bad_file} does not exist.\n"
+
+    def test_copies_contents(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch test1",
+                "mkdir test_dir",
+                "write test1 'testing'",
+                "cp test1 test_dir",
+                "rm test1",
+                "read test_dir/test1",
+            ]
+        ).initialize()
+        assert filesystem["/test_dir/test1"].data
+
+        captured = capsys.readouterr()
+        assert captured.out == "'testing'\n"
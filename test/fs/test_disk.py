@@ -0,0 +1,61 @@
+import pytest
+
+from fs import fs
+from fs.disk import VirtualDisk
+
+
+class TestVirtualDisk:
+    def test_thin_provisioned(self):
+        disk = VirtualDisk(1 << 40)
+        assert len(disk) == 1 << 40
+        assert disk.materialized == 0
+        assert disk[1000:1004] == bytes(4)
+        assert disk[-1] == 0
+
+        disk[(1 << 30) - 2 : (1 << 30) + 2] = b"abcd"
+        assert disk.materialized == 2 * VirtualDisk.CHUNK_SIZE
+        assert disk[(1 << 30) - 3 : (1 << 30) + 3] == b"\0abcd\0"
+        assert disk[1 << 30] == ord("c")
+
+    def test_list_semantics(self):
+        disk = VirtualDisk(10)
+        disk[9] = 7
+        disk[0:3] = b"xyz"
+        assert disk[-1] == 7
+        assert disk[8:100] == b"\0\x07"
+        assert disk[:3] == b"xyz"
+        with pytest.raises(IndexError):
+            disk[10]
+        with pytest.raises(ValueError):
+            disk[0:3] = b"toolong"
+
+    def test_discard(self):
+        size = VirtualDisk.CHUNK_SIZE
+        disk = VirtualDisk(4 * size)
+        disk[0 : 3 * size] = bytes([1]) * 3 * size
+        disk.discard(10, 2 * size)
+        assert disk.materialized == 2 * size
+        assert disk[8:12] == b"\x01\x01\0\0"
+        assert disk[2 * size - 1 : 2 * size + 1] == b"\0\x01"
+
+    def test_files_freed(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a", f"write a {'x' * 100000}", "rm a"],
+            hard_disk_capacity=1 << 30,
+        )
+        filesystem.initialize()
+        assert filesystem.hard_disk.materialized == VirtualDisk.CHUNK_SIZE
+
+    def test_layered(self):
+        size = VirtualDisk.CHUNK_SIZE
+        lower = VirtualDisk(2 * size)
+        lower[0 : size + 10] = bytes([1]) * (size + 10)
+        disk = VirtualDisk(4 * size, lower=lower, lower_size=size + 10)
+        disk[size + 10 : size + 12] = b"\x02\x02"
+        assert disk[size + 8 : size + 14] == b"\x01\x01\x02\x02\0\0"
+        assert disk[0] == 1
+        with pytest.raises(ValueError):
+            disk[size : size + 20] = bytes(20)
+        disk.discard(0, 2 * size)
+        assert disk[size + 8 : size + 12] == b"\x01\x01\0\0"
+        assert lower.materialized == 2 * size
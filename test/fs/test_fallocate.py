@@ -0,0 +1,88 @@
+import pickle
+
+from fs import fs
+
+
+def contiguous(extents):
+    return all(
+        extent[0] == previous[1]
+        for previous, extent in zip(extents, extents[1:])
+    )
+
+
+class TestFallocate:
+    def test_bad_args(self, capsys):
+        fs.FileSystem(
+            commands=["fallocate", "touch a", "fallocate a lots", "mkdir d"]
+            + ["fallocate d 10", "fallocate a 5000"]
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "Usage: fallocate <file> <bytes>\n"
+            "Usage: fallocate <file> <bytes>\n"
+            "Cannot allocate space for a directory.\n"
+            "Out of virtual disk space.\n"
+        )
+
+    def test_interleaved_appends_are_contiguous(self, capsys):
+        commands = ["touch a b", "fallocate a 300", "fallocate b 300"]
+        for number in range(10):
+            commands += [f"write a a{number}", f"write b b{number}"]
+        filesystem = fs.FileSystem(
+            commands=commands + ["read a"], hard_disk_capacity=2000
+        ).initialize()
+
+        assert filesystem["/a"].data[0][0] == 0
+        assert contiguous(filesystem["/a"].data)
+        assert filesystem["/b"].data[0][0] == 300
+        assert contiguous(filesystem["/b"].data)
+        captured = capsys.readouterr()
+        assert captured.out == "".join(f"a{n}" for n in range(10)) + "\n"
+
+    def test_reservations_grow(self):
+        commands = ["touch a b"]
+        for number in range(300):
+            commands += [f"write a a{number}", f"write b b{number}"]
+        filesystem = fs.FileSystem(
+            commands=commands, hard_disk_capacity=100000
+        ).initialize()
+
+        # After the first append, each file's data is stored in one run per
+        # reservation, which double in size: 1KiB, 2KiB then 4KiB.
+        for path in ["/a", "/b"]:
+            data = filesystem[path].data
+            breaks = [
+                position
+                for position in range(1, len(data))
+                if data[position][0] != data[position - 1][1]
+            ]
+            assert len(breaks) == 3
+            assert filesystem[path].reservation_size == 1 << 12
+
+    def test_reservations_reclaimed(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=["touch a b", "fallocate a 600", "write b b"],
+            hard_disk_capacity=1000,
+        )
+        inode_index = filesystem.initialize()
+        filesystem.exec(f"write b {'x' * 500}")
+        assert inode_index["/a"].reserved is None
+
+        size = len(pickle.dumps("b"))
+        assert inode_index["/b"].data == [
+            (600, 600 + size),
+            (0, len(pickle.dumps("x" * 500))),
+        ]
+        filesystem.exec("read b")
+        captured = capsys.readouterr()
+        assert captured.out == "b" + "x" * 500 + "\n"
+
+    def test_rm_releases_reservation(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a", "fallocate a 600", "rm a"],
+            hard_disk_capacity=1000,
+        )
+        filesystem.initialize()
+        assert filesystem.hard_disk_index == 0
+        assert not filesystem.reserved_inodes
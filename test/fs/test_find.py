@@ -21,3 +21,11 @@ class TestFind:
 
         captured = capsys.readouterr()
         assert captured.out == ""
+
+    def test_prefix(self, capsys):
+        fs.FileSystem(
+            commands=["touch log2 data log1 logs", "mkdir log3", "find log*"]
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "log1\nlog2\n/log3\nlogs\n"
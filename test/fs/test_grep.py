@@ -0,0 +1,108 @@
+from fs import fs
+
+
+def seeded(commands=()):
+    filesystem = fs.FileSystem(
+        commands=[
+            "mkdir d",
+            "mkdir d/e",
+            "touch a d/b d/e/c",
+            "write a needle-in-a-haystack",
+            "write d/b hay",
+            "write d/b stack-needle",
+            "write d/e/c needleneedle",
+            "hardlink d/e/c link",
+            "symlink a sym",
+            *commands,
+        ],
+        hard_disk_capacity=10000,
+    )
+    filesystem.initialize()
+    return filesystem
+
+
+class TestGrep:
+    def test_grep(self, capsys):
+        seeded(["grep needle", "grep needle d/e", "grep needle sym"])
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "/a:0\n/d/b:9\n/d/e/c:0\n/d/e/c:6\n/link:0\n/link:6\n"
+            "/d/e/c:0\n/d/e/c:6\n"
+            "/a:0\n"
+        )
+
+    def test_across_appends(self):
+        filesystem = seeded()
+        assert filesystem.search("haystack", "d") == [("/d/b", 0)]
+        assert filesystem.search("ystack-ne") == [("/d/b", 2)]
+
+    def test_regex(self, capsys):
+        filesystem = seeded(["grep -E ^needle", "grep -E ("])
+
+        captured = capsys.readouterr()
+        assert captured.out.startswith(
+            "/a:0\n/d/e/c:0\n/link:0\nInvalid pattern:"
+        )
+        assert filesystem.search(r"e\b", regex=True) == [
+            ("/a", 5),
+            ("/d/b", 14),
+            ("/d/e/c", 11),
+            ("/link", 11),
+        ]
+
+    def test_escaped(self, tmp_path):
+        (tmp_path / "raw").write_bytes(b"\xff\xfeneedle")
+        filesystem = seeded([f"import {tmp_path} /d"])
+        assert filesystem.search("needle", "/d/raw") == [("/d/raw", 2)]
+        assert filesystem.search("\udcfe", "/d/raw") == [("/d/raw", 1)]
+
+    def test_usage(self, capsys):
+        seeded(["grep", "grep -E", "grep a b c", "grep needle missing"])
+
+        captured = capsys.readouterr()
+        usage = "Usage: grep [-E] <pattern> [path]\n"
+        assert captured.out == usage * 3 + "Path missing does not exist.\n"
+
+    def test_parallel(self, monkeypatch):
+        filesystem = fs.FileSystem(hard_disk_capacity=1 << 20)
+        filesystem.mkdir(["d"])
+        paths = [f"d/f{number}" for number in range(200)]
+        filesystem.touch(paths)
+        filesystem.write_many(
+            {
+                path: f"{path} needle {number}"
+                for number, path in enumerate(paths)
+            }
+        )
+        serial = filesystem.search("needle", workers=1)
+        monkeypatch.setattr(fs.FileSystem, "PARALLEL_SEARCH_BYTES", 0)
+        assert filesystem.search("needle", workers=3) == serial
+        assert len(serial) == 200
+        assert filesystem.search("needle 19", "d", workers=2) == [
+            ("/d/f19", 6),
+            ("/d/f190", 7),
+            ("/d/f191", 7),
+            ("/d/f192", 7),
+            ("/d/f193", 7),
+            ("/d/f194", 7),
+            ("/d/f195", 7),
+            ("/d/f196", 7),
+            ("/d/f197", 7),
+            ("/d/f198", 7),
+            ("/d/f199", 7),
+        ]
+
+    def test_overlay(self):
+        base = seeded()
+        overlay = fs.FileSystem(lower=base)
+        overlay.exec("write a needle")
+        overlay.exec("rm d/b")
+        assert overlay.search("needle") == [
+            ("/a", 0),
+            ("/a", 20),
+            ("/d/e/c", 0),
+            ("/d/e/c", 6),
+            ("/link", 0),
+            ("/link", 6),
+        ]
@@ -0,0 +1,158 @@
+import os
+import tarfile
+
+import pytest
+
+from fs import fs
+
+
+@pytest.fixture
+def host_tree(tmp_path):
+    source = tmp_path / "source"
+    (source / "a_dir" / "nested").mkdir(parents=True)
+    (source / "a_file").write_bytes(b"first file")
+    (source / "a_dir" / "b_file").write_bytes(b"second file\n")
+    (source / "a_dir" / "nested" / "binary").write_bytes(b"\x00\xff\xfe")
+    (source / "a_dir" / "empty").write_bytes(b"")
+    return source
+
+
+class TestImportExport:
+    def test_bad_args(self, capsys):
+        fs.FileSystem(commands=["import", "export a_dir"]).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "Usage: import <host_directory_or_tar> [directory]\n"
+            "Usage: export <directory> <host_directory_or_tar>\n"
+        )
+
+    def test_import_directory(self, host_tree, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir imported",
+                f"import {host_tree} imported",
+                "ls imported imported/a_dir",
+                "read imported/a_file",
+            ],
+            hard_disk_capacity=10000,
+        ).initialize()
+        assert "/imported/a_dir/nested/binary" in filesystem
+        assert not filesystem["/imported/a_dir/empty"].data
+
+        # Every file's data was stored in one contiguous run.
+        extents = [
+            filesystem[path].data[0]
+            for path in [
+                "/imported/a_file",
+                "/imported/a_dir/b_file",
+                "/imported/a_dir/nested/binary",
+            ]
+        ]
+        assert extents[0][0] == 0
+        assert extents[1][0] == extents[0][1]
+        assert extents[2][0] == extents[1][1]
+
+        captured = capsys.readouterr()
+        assert (
+            captured.out
+            == "/a_dir\na_file\nb_file\nempty\n/nested\nfirst file\n"
+        )
+
+    def test_round_trip(self, host_tree, tmp_path):
+        archive = str(tmp_path / "exported.tar.gz")
+        exported = tmp_path / "exported"
+        fs.FileSystem(
+            commands=[
+                f"import {host_tree}",
+                f"export / {archive}",
+            ],
+            hard_disk_capacity=10000,
+        ).initialize()
+        fs.FileSystem(
+            commands=[f"import {archive}", f"export . {exported}"],
+            hard_disk_capacity=10000,
+        ).initialize()
+
+        assert tarfile.is_tarfile(archive)
+        for root, _, files in os.walk(host_tree):
+            for name in files:
+                original = os.path.join(root, name)
+                copy = exported / os.path.relpath(original, host_tree)
+                with open(original, "rb") as handle:
+                    assert copy.read_bytes() == handle.read()
+
+    def test_out_of_disk(self, host_tree, capsys):
+        filesystem = fs.FileSystem(
+            commands=[f"import {host_tree}"], hard_disk_capacity=10
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "Out of virtual disk space.\n"
+
+        # No file is left behind without its contents.
+        assert "/a_dir/nested" in filesystem
+        for path in ["/a_file", "/a_dir/b_file", "/a_dir/nested/binary"]:
+            assert path not in filesystem
+        assert "/a_dir/empty" not in filesystem
+
+    def test_name_collision(self, host_tree, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir a_dir",
+                "touch a_dir/empty",
+                f"import {host_tree}",
+            ],
+            hard_disk_capacity=10000,
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "Filesystem item with name /a_dir/empty already exists.\n"
+        )
+        assert "/a_dir/empty" in filesystem
+        for path in ["/a_file", "/a_dir/b_file", "/a_dir/nested/binary"]:
+            assert path not in filesystem
+
+    def test_host_errors(self, host_tree, tmp_path, capsys):
+        existing = tmp_path / "existing"
+        existing.write_bytes(b"")
+        broken = tmp_path / "broken.tar"
+        (host_tree / "large").write_bytes(b"x" * 5000)
+        with tarfile.open(broken, "w") as archive:
+            archive.add(host_tree / "large", arcname="large")
+        # The archive ends partway through the file's contents.
+        broken.write_bytes(broken.read_bytes()[:2000])
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir a",
+                f"export a {existing}",
+                f"export a {tmp_path}/missing/out.tar",
+                f"import {broken}",
+                "ls",
+            ],
+            hard_disk_capacity=10000,
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            f"Could not export to {existing}: File exists.\n"
+            f"Could not export to {tmp_path}/missing/out.tar: "
+            "No such file or directory.\n"
+            f"Could not import {broken}: unexpected end of data.\n"
+            "/a\n"
+        )
+        assert "/large" not in filesystem
+
+    def test_read_binary(self, host_tree, capsysbinary):
+        fs.FileSystem(
+            commands=[
+                f"import {host_tree}",
+                "read a_dir/nested/binary",
+                "read a_file",
+            ],
+            hard_disk_capacity=10000,
+        ).initialize()
+
+        captured = capsysbinary.readouterr()
+        assert captured.out == b"\x00\xff\xfe\nfirst file\n"
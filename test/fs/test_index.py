@@ -0,0 +1,61 @@
+import random
+
+from fs.index import SortedIndex
+
+
+class TestSortedIndex:
+    def test_ordered_iteration(self):
+        keys = [f"/item{number}" for number in range(5000)]
+        shuffled = list(keys)
+        random.Random(0).shuffle(shuffled)
+        index = SortedIndex()
+        for key in shuffled:
+            index[key] = key
+        assert list(index) == sorted(keys)
+        assert len(index) == len(keys)
+
+    def test_delete(self):
+        index = SortedIndex(
+            {f"/{number:05}": number for number in range(3000)}
+        )
+        for number in range(0, 3000, 2):
+            del index[f"/{number:05}"]
+        assert list(index) == [f"/{number:05}" for number in range(1, 3000, 2)]
+        assert "/00000" not in index
+        assert index["/00001"] == 1
+
+    def test_ranges(self):
+        index = SortedIndex({key: None for key in ["/a", "/ab", "/abc", "/b"]})
+        assert list(index.prefix("/ab")) == ["/ab", "/abc"]
+        assert list(index.irange("/ab", "/b")) == ["/ab", "/abc"]
+        assert list(index.irange(stop="/ab")) == ["/a"]
+        assert list(index.prefix("/c")) == []
+
+    def test_copy(self):
+        index = SortedIndex(
+            {f"/{number:05}": number for number in range(3000)}
+        )
+        copy = index.copy()
+        assert copy._lists is index._lists
+        copy["/new"] = -1
+        del index["/00000"]
+        assert "/new" not in index
+        assert "/00000" in copy
+        assert list(copy)[-1] == "/new"
+        assert len(index) == 2999 and len(copy) == 3001
+
+    def test_copy_shares_unchanged_sublists(self):
+        index = SortedIndex(
+            {f"/{number:05}": number for number in range(10000)}
+        )
+        copy = index.copy()
+        copy["/05000x"] = -1
+        del copy["/00001"]
+        shared = [
+            sublist
+            for sublist in copy._lists
+            if any(sublist is other for other in index._lists)
+        ]
+        assert len(shared) == len(index._lists) - 2
+        assert "/05000x" not in index and index["/00001"] == 1
+        assert copy["/05000x"] == -1 and "/00001" not in copy
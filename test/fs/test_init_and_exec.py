@@ -14,3 +14,9 @@ class TestCd:
         fs.FileSystem(commands=["? ? ?"]).initialize()
         captured = capsys.readouterr()
         assert captured.out == "Unrecognized command: ?\n"
+
+    def test_streamed_commands(self, capsys):
+        commands = (command for command in ["touch a", "", "ls"])
+        fs.FileSystem(commands=commands).initialize()
+        captured = capsys.readouterr()
+        assert captured.out == "a\n"
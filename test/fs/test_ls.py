@@ -26,3 +26,42 @@ class TestLs:
 
         captured = capsys.readouterr()
         assert captured.out == f"Path {bad_directory} does not exist.\n"
+
+    def test_sorted_output(self, capsys):
+        fs.FileSystem(commands=["touch c a b", "mkdir d0", "ls"]).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "a\nb\nc\n/d0\n"
+
+    def test_slices(self, capsys):
+        filesystem = fs.FileSystem()
+        filesystem.mkdir(["d"])
+        filesystem.touch(["d/a", "d/b", "d/c", "d/e"])
+        start = filesystem.ls(["d"], limit=2)
+        assert start == "/d/c"
+        filesystem.rm(["d/c"])
+        filesystem.touch(["d/a0", "d/d"])
+        assert filesystem.ls(["d"], start=start, limit=2) is None
+
+        captured = capsys.readouterr()
+        # Children added before the resume key aren't listed again.
+        assert captured.out == "a\nb\nd\ne\n"
+        assert filesystem.count_entries("d", "") == 5
+        assert filesystem.count_entries("/d/./", "/elsewhere") == 5
+        assert filesystem.count_entries("..", "/d") == 0
+        assert filesystem.count_entries("d/a", "") == 0
+
+    def test_count_entries_in_transaction(self):
+        filesystem = fs.FileSystem()
+        filesystem.mkdir(["d"])
+        filesystem.touch(["d/a", "d/b"])
+        filesystem.exec("begin")
+        filesystem.exec("touch d/c")
+        # As if counted while the transaction's command runs.
+        committed = filesystem.inode_index
+        view = filesystem.transaction.index
+        reads, local = dict(view.reads), dict(view.local)
+        filesystem.inode_index = view
+        assert filesystem.count_entries("d", "") == 2
+        assert view.reads == reads and view.local == local
+        filesystem.inode_index = committed
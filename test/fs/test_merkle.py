@@ -0,0 +1,157 @@
+from fs import fs
+
+COMMANDS = [
+    "mkdir d",
+    "mkdir d/e",
+    "mkdir f",
+    "touch a d/b d/e/c f/g",
+    "write a one",
+    "write d/b two",
+    "write d/e/c three",
+    "hardlink d/b link",
+    "symlink d/e sym",
+]
+
+
+def seeded(commands=()):
+    filesystem = fs.FileSystem(
+        commands=[*COMMANDS, *commands], hard_disk_capacity=10000
+    )
+    filesystem.initialize()
+    return filesystem
+
+
+class TestMerkle:
+    def test_digest(self):
+        first = seeded()
+        second = fs.FileSystem(
+            commands=[
+                "mkdir f",
+                "mkdir d",
+                "mkdir d/e",
+                "touch d/e/c f/g d/b a",
+                "write d/e/c th",
+                "write d/e/c ree",
+                "write d/b two",
+                "write a one",
+                "symlink d/e sym",
+                "hardlink d/b link",
+            ],
+            hard_disk_capacity=10000,
+        )
+        second.initialize()
+        assert first.digest() == second.digest()
+        assert first.digest("d") == second.digest("/d")
+        assert first.digest("a") != first.digest("d/b")
+        assert first.digest("sym") != first.digest("d/e")
+
+    def test_incremental(self):
+        filesystem = seeded()
+        before = filesystem.digest()
+        sibling = filesystem.digest("f")
+        link = filesystem.digest("link")
+        filesystem.exec("write d/b more")
+        index = filesystem.inode_index
+        assert index["/d/b"].digest is None
+        assert index["/link"].digest is None
+        assert index["/d"].digest is None
+        assert index[""].digest is None
+        assert index["/d/e"].digest is not None
+        assert index["/f"].digest is not None
+        assert filesystem.digest() != before
+        assert filesystem.digest("f") == sibling
+        assert filesystem.digest("link") != link
+        for command in ["mv d/e/c f", "mv f/c d/e"]:
+            filesystem.exec(command)
+            assert index["/d/e"].digest is None
+        assert filesystem.digest("sym") == filesystem.digest("sym")
+
+    def test_diff(self):
+        primary = seeded()
+        replica = seeded()
+        assert primary.diff(replica) == []
+        primary.exec("write d/e/c !")
+        primary.exec("rm f/g")
+        primary.exec("touch f/h")
+        replica.exec("rm sym")
+        replica.exec("mkdir sym")
+        assert primary.diff(replica) == ["/d/e/c", "/f/g", "/f/h", "/sym"]
+        assert primary.diff(replica, "d") == ["/d/e/c"]
+        assert replica.diff(primary, "/f") == ["/f/g", "/f/h"]
+        assert replica.inode_index["/a"].digest is not None
+
+    def test_sync(self):
+        primary = seeded(
+            [
+                "write d/e/c !",
+                "rm link",
+                "rm d/b",
+                "mkdir d/b",
+                "touch d/b/x",
+                "write d/b/x x",
+                "hardlink d/b/x link",
+                "rm sym",
+                "symlink a sym",
+            ]
+        )
+        replica = seeded(["mkdir f/extra", "touch f/extra/y"])
+        assert primary.sync(replica) == [
+            "/d/b",
+            "/d/e/c",
+            "/f/extra",
+            "/link",
+            "/sym",
+        ]
+        assert primary.diff(replica) == []
+        assert primary.digest() == replica.digest()
+        assert replica.read_many(["d/e/c", "link"]) == ["three!", "x"]
+        replica.exec("write d/b/x y")
+        assert replica.read_many(["link"]) == ["xy"]
+
+    def test_transaction(self):
+        filesystem = seeded()
+        before = filesystem.digest()
+        for command in ["begin", "write a two", "touch d/new", "commit"]:
+            filesystem.exec(command)
+        assert filesystem.inode_index["/d"].digest is None
+        assert filesystem.digest() != before
+        assert filesystem.diff(seeded(["write a two", "touch d/new"])) == []
+
+    def test_overlay(self):
+        base = seeded()
+        base_digest = base.digest()
+        overlay = fs.FileSystem(lower=base)
+        assert overlay.digest() == base_digest
+        overlay.exec("write d/e/c more")
+        assert overlay.diff(base) == ["/d/e/c"]
+        assert base.digest() == base_digest
+        assert base.inode_index["/d"].digest is not None
+        assert overlay.sync(base, "f") == []
+
+    def test_overlay_digests_first(self):
+        base = fs.FileSystem(
+            commands=["mkdir d", "touch d/a", "write d/a one"],
+            hard_disk_capacity=10000,
+        )
+        base.initialize()
+        reference = fs.FileSystem(
+            commands=["mkdir d", "touch d/a", "write d/a one"],
+            hard_disk_capacity=10000,
+        )
+        reference.initialize()
+        first, second = fs.FileSystem(lower=base), fs.FileSystem(lower=base)
+        first.exec("write d/a two")
+        first.exec("hardlink d/a link")
+        first_digest = first.digest("/")
+        assert base.digest("/") == reference.digest("/") != first_digest
+        assert base.diff(reference) == []
+        assert second.digest("/") == reference.digest("/")
+        assert first.diff(second) == ["/d/a", "/link"]
+        first.exec("write d/a !")
+        assert first.digest("/") != first_digest
+        assert base.digest("/") == reference.digest("/")
+        linked = seeded()
+        overlay = fs.FileSystem(lower=linked)
+        overlay.exec("write d/b more")
+        assert overlay.digest("link") != linked.digest("link")
+        assert overlay.diff(linked) == ["/d/b", "/link"]
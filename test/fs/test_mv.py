@@ -40,3 +40,18 @@ class TestMv:
 
         captured = capsys.readouterr()
         assert captured.out == f"Path {bad_file} does not exist.\n"
+
+    def test_moves_contents(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch test1",
+                "mkdir test_dir",
+                "write test1 'testing'",
+                "mv test1 test_dir",
+                "read test_dir/test1",
+            ]
+        ).initialize()
+        assert filesystem["/test_dir/test1"].data == [(0, 24)]
+
+        captured = capsys.readouterr()
+        assert captured.out == "'testing'\n"
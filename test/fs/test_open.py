@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+
+import pytest
+
+from fs import exceptions, fs
+from fs.disk import VirtualDisk
+
+
+class TestOpen:
+    def test_read_written_data(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a_file", "write a_file 'one'", "write a_file two"]
+        )
+        filesystem.initialize()
+        with filesystem.open("a_file") as handle:
+            assert handle.read() == b"'one'two"
+            handle.seek(3)
+            buffer = bytearray(4)
+            assert handle.readinto(buffer) == 4
+            assert buffer == b"e'tw"
+            assert handle.tell() == 7
+            assert handle.seek(-2, io.SEEK_END) == 6
+            assert handle.read() == b"wo"
+
+    def test_readinto_across_chunks(self):
+        size = VirtualDisk.CHUNK_SIZE
+        data = bytes(range(256)) * (size // 128)
+        filesystem = fs.FileSystem(hard_disk_capacity=16 * size)
+        with filesystem.open("a_file", "w") as handle:
+            handle.write(data[:10])
+            handle.write(data[10:])
+        with filesystem.open("a_file") as handle:
+            handle.seek(size - 5)
+            buffer = bytearray(size)
+            assert handle.readinto(buffer) == size
+            assert buffer == data[size - 5 : 2 * size - 5]
+
+    def test_rewritten_by_another_handle(self):
+        filesystem = fs.FileSystem(hard_disk_capacity=10000)
+        with filesystem.open("/b", "w") as handle:
+            handle.write(b"abc")
+            handle.write(b"def")
+        reader = filesystem.open("/b")
+        assert reader.read() == b"abcdef"
+        with filesystem.open("/b", "w") as handle:
+            for data in [b"XY", b"ZW", b"Q"]:
+                handle.write(data)
+        reader.seek(0)
+        assert reader.read() == b"XYZWQ"
+
+    def test_write_and_stream(self):
+        filesystem = fs.FileSystem(hard_disk_capacity=10000)
+        with filesystem.open("data.json", "w") as handle:
+            handle.write(json.dumps({"key": ["välue", 1]}).encode())
+        with filesystem.open("rows.csv", "w") as handle:
+            text = io.TextIOWrapper(handle, newline="")
+            csv.writer(text).writerows([["a", "b"], ["1", "2"]])
+            text.flush()
+
+        raw = filesystem.open("data.json")
+        assert json.load(io.BufferedReader(raw)) == {"key": ["välue", 1]}
+        text = io.TextIOWrapper(
+            io.BufferedReader(filesystem.open("rows.csv")), newline=""
+        )
+        assert list(csv.reader(text)) == [["a", "b"], ["1", "2"]]
+
+    def test_modes(self):
+        filesystem = fs.FileSystem(hard_disk_capacity=10000)
+        with filesystem.open("a_file", "w") as handle:
+            handle.write(b"first")
+            handle.seek(0)
+            with pytest.raises(io.UnsupportedOperation):
+                handle.write(b"second")
+        with filesystem.open("a_file", "a") as handle:
+            handle.write(b" second")
+        with filesystem.open("a_file", "rb") as handle:
+            assert handle.read() == b"first second"
+            with pytest.raises(io.UnsupportedOperation):
+                handle.write(b"third")
+        with filesystem.open("a_file", "w") as handle:
+            handle.write(b"\xff\xfe third")
+        assert filesystem.inode_index["/a_file"].escaped
+        with filesystem.open("a_file") as handle:
+            assert handle.read() == b"\xff\xfe third"
+
+    def test_bad_paths(self):
+        filesystem = fs.FileSystem(commands=["mkdir a_dir"])
+        filesystem.initialize()
+        with pytest.raises(exceptions.PathException):
+            filesystem.open("missing")
+        with pytest.raises(exceptions.ImproperArguments):
+            filesystem.open("a_dir")
+        with pytest.raises(exceptions.ImproperArguments):
+            filesystem.open("a_dir", "x")
@@ -0,0 +1,156 @@
+import pytest
+
+from fs import fs
+
+
+@pytest.fixture
+def base():
+    filesystem = fs.FileSystem(
+        commands=[
+            "mkdir d",
+            "touch d/a d/b top",
+            "write d/a one",
+            "write d/b two",
+            "hardlink d/a top_link",
+            "symlink d/b d_link",
+        ],
+        hard_disk_capacity=10000,
+    )
+    filesystem.initialize()
+    return filesystem
+
+
+def snapshot(filesystem):
+    return {
+        path: (sorted(node.children), node.data, node.reference_count)
+        for path, node in filesystem.inode_index.items()
+        if isinstance(node, fs.INode)
+    }
+
+
+class TestOverlay:
+    def test_reads_fall_through(self, base, capsys):
+        overlay = fs.FileSystem(
+            commands=["ls d", "read d/a", "read d_link", "read top_link"],
+            lower=base,
+        )
+        overlay.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "a\nb\none\ntwo\none\n"
+        assert not overlay.inode_index.upper
+        assert overlay.hard_disk.materialized == 0
+
+    def test_copy_up(self, base, capsys):
+        before = snapshot(base)
+        used = base.hard_disk_index
+        overlay = fs.FileSystem(
+            commands=[
+                "write d/a three",
+                "touch d/c",
+                "write d/c four",
+                "mkdir e",
+                "mv d/b e",
+                "rm top",
+                "hardlink d/a d/a_link",
+                "read d/a",
+                "read d/c",
+                "read e/b",
+                "ls",
+                "ls d",
+            ],
+            lower=base,
+            hard_disk_capacity=1000,
+        )
+        overlay.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "onethree\nfour\ntwo\n/d\nd_link\n/e\ntop_link\na\na_link\nc\n"
+        )
+        assert snapshot(base) == before
+        assert base.hard_disk_index == used
+        assert overlay.hard_disk_index > used
+        assert overlay.inode_index.whiteouts == {"/d/b", "/top"}
+        base.exec("read d/a")
+        base.exec("ls")
+        captured = capsys.readouterr()
+        assert captured.out == "one\n/d\nd_link\ntop\ntop_link\n"
+
+    def test_big_directory_shared(self):
+        lower = fs.FileSystem()
+        lower.mkdir(["big"])
+        lower.touch([f"big/f{number:05}" for number in range(5000)])
+        overlay = fs.FileSystem(lower=lower)
+        overlay.touch(["big/new"])
+        children = overlay.inode_index["/big"].children
+        lower_children = lower.inode_index["/big"].children
+        assert "/big/new" in children and "/big/new" not in lower_children
+        # Only the sublist the new child went into was copied up.
+        copied = [
+            sublist
+            for sublist in children._lists
+            if not any(sublist is other for other in lower_children._lists)
+        ]
+        assert len(copied) == 1
+
+    def test_whiteout(self, base, capsys):
+        overlay = fs.FileSystem(
+            commands=["rm d/b", "read d/b", "touch d/b", "read d/b"],
+            lower=base,
+        )
+        inode_index = overlay.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "Path d/b does not exist.\n\n"
+        assert "/d/b" in inode_index
+        assert "/d/b" not in inode_index.whiteouts
+        assert len(inode_index) == len(base.inode_index)
+
+    def test_isolated(self, base, capsys):
+        first = fs.FileSystem(lower=base)
+        second = fs.FileSystem(lower=base)
+        first.exec("write d/a first")
+        second.exec("write d/a second")
+        for filesystem in [first, second, base]:
+            filesystem.exec("read d/a")
+
+        captured = capsys.readouterr()
+        assert captured.out == "onefirst\nonesecond\none\n"
+
+    def test_open(self, base):
+        overlay = fs.FileSystem(lower=base)
+        with overlay.open("d/b", "r") as handle:
+            assert handle.read() == b"two"
+        assert not overlay.inode_index.upper
+        with overlay.open("d/b", "a") as handle:
+            handle.write(b"!")
+        with overlay.open("d/b", "r") as handle:
+            assert handle.read() == b"two!"
+        with base.open("d/b", "r") as handle:
+            assert handle.read() == b"two"
+
+    def test_transaction(self, base, capsys):
+        overlay = fs.FileSystem(
+            commands=["begin", "write d/a three", "rm d/b", "commit"],
+            lower=base,
+        )
+        overlay.initialize()
+        overlay.exec("read d/a")
+        overlay.exec("ls d")
+        base.exec("read d/a")
+
+        captured = capsys.readouterr()
+        assert captured.out == "onethree\na\none\n"
+        assert overlay.inode_index.whiteouts == {"/d/b"}
+
+    def test_out_of_disk(self, base, capsys):
+        overlay = fs.FileSystem(
+            commands=["write d/a " + "x" * 100],
+            lower=base,
+            hard_disk_capacity=10,
+        )
+        overlay.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "Out of virtual disk space.\n"
@@ -1,6 +1,8 @@
 import pickle
 
-from fs import fs
+import pytest
+
+from fs import exceptions, fs
 
 
 class TestReadWrite:
@@ -72,3 +74,40 @@ class TestReadWrite:
                 "rm test_file",
             ]
         ).initialize()
+
+
+class TestReadWriteMany:
+    def test_write_many_single_run(self):
+        filesystem = fs.FileSystem(
+            commands=["mkdir d", "touch a d/b d/c", "symlink d/c c_link"]
+        )
+        filesystem.initialize()
+        filesystem.write_many({"a": "one", "d/b": "two", "c_link": "three"})
+        filesystem.write_many({"/d/../a": "four"})
+
+        sizes = [len(pickle.dumps(data)) for data in ["one", "two", "three"]]
+        assert filesystem.inode_index["/a"].data[0] == (0, sizes[0])
+        assert filesystem.inode_index["/d/b"].data == [
+            (sizes[0], sizes[0] + sizes[1])
+        ]
+        assert filesystem.inode_index["/d/c"].data == [
+            (sizes[0] + sizes[1], sum(sizes))
+        ]
+        assert filesystem.read_many(["a", "d/b", "/d/c", "c_link"]) == [
+            "onefour",
+            "two",
+            "three",
+            "three",
+        ]
+
+    def test_write_many_all_or_nothing(self):
+        filesystem = fs.FileSystem(commands=["touch a", "mkdir d"])
+        filesystem.initialize()
+        with pytest.raises(exceptions.PathException):
+            filesystem.write_many({"a": "one", "missing": "two"})
+        with pytest.raises(exceptions.ImproperArguments):
+            filesystem.write_many({"a": "one", "d": "two"})
+        with pytest.raises(exceptions.OutOfDisk):
+            filesystem.write_many({"a": "x" * 1000})
+        assert filesystem.inode_index["/a"].data == []
+        assert filesystem.hard_disk_index == 0
@@ -0,0 +1,35 @@
+import io
+
+from fs import runner
+
+
+class TestRunner:
+    def test_commands(self, capsys):
+        assert runner.main(["--commands", "touch a_file!", "ls"]) == 0
+
+        captured = capsys.readouterr()
+        assert captured.out == "a_file!\n"
+
+    def test_script(self, tmp_path, capfd):
+        script = tmp_path / "script.txt"
+        script.write_text(
+            "# Create a directory\nmkdir a_dir\n\n  touch a_dir/a_file\nls a_dir\n"
+        )
+        assert runner.main(["--script", str(script)]) == 0
+
+        captured = capfd.readouterr()
+        assert captured.out == "a_file\n"
+
+    def test_stdin(self, monkeypatch, capsys):
+        monkeypatch.setattr("sys.stdin", io.StringIO("mkdir a_dir\nls\nbad\n"))
+        assert runner.main([]) == 0
+
+        captured = capsys.readouterr()
+        assert captured.out == "/a_dir\nUnrecognized command: bad\n"
+
+    def test_read_script_is_lazy(self):
+        def lines():
+            yield "touch a"
+            raise AssertionError("Read past the first command.")
+
+        assert next(runner.read_script(lines())) == "touch a"
@@ -0,0 +1,116 @@
+import threading
+import time
+
+import pytest
+
+from fs import fs, scheduler
+from fs.client import Client
+from fs.server import make_server
+
+
+def run_in_turn(fair, clients):
+    """
+    Queue up a command for each (client, cost) pair, in order, while another
+    one runs, and return the clients in the order their commands ran.
+    """
+    order = []
+
+    def run(client, cost):
+        fair.acquire(client, cost)
+        order.append(client)
+        fair.release()
+
+    fair.acquire("running", 1)
+    threads = []
+    for client, cost in clients:
+        threads.append(threading.Thread(target=run, args=(client, cost)))
+        threads[-1].start()
+        while len(fair.waiting) < len(threads):
+            time.sleep(0.001)
+    fair.release()
+    for thread in threads:
+        thread.join()
+    return order
+
+
+@pytest.fixture
+def address(tmp_path):
+    socket_path = str(tmp_path / "fs.sock")
+    server = make_server(socket_path, fs.FileSystem(hard_disk_capacity=10**6))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+class TestScheduler:
+    def test_cheap_commands_first(self):
+        fair = scheduler.FairScheduler()
+        order = run_in_turn(fair, [("big", 1000), ("small", 10), ("mid", 100)])
+        assert order == ["small", "mid", "big"]
+
+    def test_charge(self):
+        fair = scheduler.FairScheduler()
+        run_in_turn(fair, [("a", 10), ("b", 10)])
+        fair.charge("a", 1000)
+        assert run_in_turn(fair, [("a", 10), ("b", 10)]) == ["b", "a"]
+        fair.forget("a")
+        assert run_in_turn(fair, [("a", 10), ("b", 10)]) == ["a", "b"]
+
+    def test_weights(self):
+        fair = scheduler.FairScheduler()
+        fair.set_weight("heavy", 4)
+        assert run_in_turn(fair, [("light", 100), ("heavy", 200)]) == [
+            "heavy",
+            "light",
+        ]
+        with pytest.raises(ValueError):
+            fair.set_weight("light", 0)
+
+    def test_slices(self):
+        data = "x" * (scheduler.SLICE_SIZE * 2 + 1)
+        pieces = scheduler.slices(f"write a {data}")
+        assert len(pieces) == 3
+        assert "".join(piece.split()[2] for piece in pieces) == data
+        assert scheduler.slices("write a b") == ["write a b"]
+        assert scheduler.slices(f"read {data}") == [f"read {data}"]
+
+    def test_sliced_write(self, address):
+        data = "y" * (scheduler.SLICE_SIZE * 3)
+        with Client(address) as first, Client(address) as second:
+            first.execute("touch a")
+            assert first.pipeline(
+                [f"write a {data}", "weight 2", "weight 0", "weight"]
+            ) == [
+                (True, ""),
+                (True, ""),
+                (False, "Weights must be positive numbers."),
+                (False, "Usage: weight <weight>"),
+            ]
+            assert second.execute("read a") == data + "\n"
+            assert first.pipeline([f"write missing {data}", "ls"]) == [
+                (False, "Path missing does not exist."),
+                (True, "a\n"),
+            ]
+            for command in ["begin", f"write a {data}"]:
+                first.execute(command)
+            assert second.execute("read a") == data + "\n"
+            first.execute("commit")
+            assert second.execute("read a") == data * 2 + "\n"
+
+    def test_sliced_ls(self, address):
+        names = sorted(f"f{number}" for number in range(2500))
+        with Client(address) as first, Client(address) as second:
+            first.execute("mkdir many")
+            first.execute("touch " + " ".join(f"many/{n}" for n in names))
+            first.execute("cd many")
+            assert first.execute("ls") == "".join(f"{n}\n" for n in names)
+            assert second.execute("ls many") == first.execute("ls .")
+            assert first.pipeline(["begin", "rm f0", "ls", "abort"])[2] == (
+                True,
+                "".join(f"{n}\n" for n in names[1:]),
+            )
+            assert second.pipeline(["ls missing"]) == [
+                (False, "Path missing does not exist.")
+            ]
@@ -0,0 +1,56 @@
+import threading
+
+import pytest
+
+from fs import fs
+from fs.client import Client
+from fs.server import make_server
+
+
+@pytest.fixture
+def address(tmp_path):
+    socket_path = str(tmp_path / "fs.sock")
+    server = make_server(socket_path, fs.FileSystem())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+class TestServer:
+    def test_execute(self, address):
+        with Client(address) as client:
+            client.execute("touch test1 test2")
+            assert client.execute("ls") == "test1\ntest2\n"
+
+    def test_pipeline(self, address):
+        with Client(address) as client:
+            responses = client.pipeline(
+                ["mkdir test_dir", "touch test_dir/a", "ls test_dir", "ls bad"]
+            )
+        assert responses == [
+            (True, ""),
+            (True, ""),
+            (True, "a\n"),
+            (False, "Path bad does not exist."),
+        ]
+
+    def test_shared_filesystem(self, address):
+        with Client(address) as first, Client(address) as second:
+            first.execute("mkdir shared")
+            first.execute("cd shared")
+            second.execute("touch shared/a_file")
+            # Each connection keeps its own working directory.
+            assert first.execute("pwd") == "/shared/\n"
+            assert second.execute("pwd") == "/\n"
+            assert first.execute("ls") == "a_file\n"
+
+    def test_binary_output(self, address, tmp_path):
+        (tmp_path / "host").mkdir()
+        (tmp_path / "host" / "b.bin").write_bytes(b"\xff\x00ok")
+        with Client(address) as client:
+            client.execute(f"import {tmp_path / 'host'}")
+            output = client.execute("read b.bin")
+            assert output.encode("utf-8", "surrogateescape") == b"\xff\x00ok\n"
+            assert client.execute("ls") == "b.bin\n"
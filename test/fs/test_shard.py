@@ -0,0 +1,103 @@
+import pytest
+
+from fs import exceptions
+from fs.shard import ShardedFileSystem, absolute_path
+
+
+@pytest.fixture
+def sharded():
+    with ShardedFileSystem(shards=2, hard_disk_capacity=10000) as sharded:
+        yield sharded
+
+
+def names_on_different_shards(sharded):
+    """
+    Find two top-level names that the router places on different shards.
+    """
+    names = [f"dir{number}" for number in range(10)]
+    first = names[0]
+    second = next(
+        name
+        for name in names
+        if sharded.shard("/" + name) != sharded.shard("/" + first)
+    )
+    return first, second
+
+
+class TestShard:
+    def test_absolute_path(self):
+        assert absolute_path("", "a/./b/../c") == "/a/c"
+        assert absolute_path("/a/b", "../c") == "/a/c"
+        assert absolute_path("/a", "/..") == ""
+
+    def test_merged_listing(self, sharded, capsys):
+        outputs = sharded.exec_many(
+            ["mkdir d0 d1 d2 d3", "touch a_file d2/inner", "ls", "ls d2"]
+        )
+        assert outputs[2] == ("a_file\n/d0\n/d1\n/d2\n/d3\n", None)
+        assert outputs[3] == ("inner\n", None)
+
+    def test_cross_shard_move(self, sharded, capsys):
+        first, second = names_on_different_shards(sharded)
+        sharded.exec(f"mkdir {first} {second}")
+        sharded.exec(f"touch {first}/a_file")
+        sharded.exec(f"write {first}/a_file 'testing'")
+        sharded.exec(f"cd {first}")
+        sharded.exec(f"mv a_file ../{second}")
+        sharded.exec("ls")
+        sharded.exec(f"read /{second}/a_file")
+
+        captured = capsys.readouterr()
+        assert captured.out == "'testing'\n"
+
+    def test_cross_shard_symlink(self, sharded):
+        first, second = names_on_different_shards(sharded)
+        outputs = sharded.exec_many(
+            [
+                f"mkdir /{first} /{second}",
+                f"touch /{first}/f",
+                f"symlink /{first}/f /{first}/l",
+                f"mv /{first}/l /{second}",
+                f"cp /{first}/l /{second}",
+                f"ls /{first} /{second}",
+            ]
+        )
+        for action, (output, error) in zip(["mv", "cp"], outputs[3:5]):
+            assert isinstance(error, exceptions.ImproperArguments)
+            assert str(error) == (
+                f"Cannot {action} /{first}/l to another shard: "
+                "it is a symlink."
+            )
+        assert outputs[5] == ("f\nl\n", None)
+
+    def test_forwarded_commands(self, sharded):
+        first, second = names_on_different_shards(sharded)
+        outputs = sharded.exec_many(
+            [
+                f"mkdir {first} {second}",
+                f"cd {first}",
+                "touch a_file",
+                f"touch /{second}/b_file",
+                f"touch c_file /{second}/d_file",
+                "write a_file 'testing'",
+                "read a_file",
+                f"ls . /{second}",
+                "rm nowhere",
+                "cd /",
+                "ls",
+            ]
+        )
+        assert outputs[6] == ("'testing'\n", None)
+        assert outputs[7] == ("a_file\nc_file\nb_file\nd_file\n", None)
+        assert isinstance(outputs[8][1], exceptions.PathException)
+        assert outputs[10] == (f"/{first}\n/{second}\n", None)
+
+    def test_errors(self, sharded, capsys):
+        with pytest.raises(exceptions.PathException):
+            sharded.exec("cd nowhere")
+        sharded.exec("bad")
+        output, error = sharded.exec_many(["rm"])[0]
+        assert str(error) == "Must provide arguments."
+
+        captured = capsys.readouterr()
+        assert captured.out == "Unrecognized command: bad\n"
@@ -0,0 +1,127 @@
+import errno
+
+import pytest
+
+from fs import fs
+from fs.handle import SEEK_DATA, SEEK_HOLE
+
+
+def seeded(commands=()):
+    filesystem = fs.FileSystem(
+        commands=["mkdir d", "touch d/a", "write d/a head", *commands],
+        hard_disk_capacity=10000,
+    )
+    filesystem.initialize()
+    return filesystem
+
+
+def sparse(filesystem, path="d/a"):
+    with filesystem.open(path, "r+b") as handle:
+        handle.seek(1 << 20)
+        handle.write(b"tail")
+
+
+class TestSparse:
+    def test_write_past_end(self):
+        filesystem = seeded()
+        used = filesystem.hard_disk_index
+        sparse(filesystem)
+        assert filesystem.hard_disk_index - used < 4096
+        contents = filesystem.read_many(["d/a"])[0]
+        assert len(contents) == (1 << 20) + 4
+        assert contents == "head" + "\0" * ((1 << 20) - 4) + "tail"
+        with filesystem.open("d/a", "rb") as handle:
+            handle.seek((1 << 20) - 2)
+            assert handle.read(4) == b"\0\0ta"
+
+    def test_seek_data_and_hole(self):
+        filesystem = seeded()
+        sparse(filesystem)
+        with filesystem.open("d/a", "rb") as handle:
+            assert handle.seek(0, SEEK_DATA) == 0
+            assert handle.seek(0, SEEK_HOLE) == 4
+            assert handle.seek(4, SEEK_DATA) == 1 << 20
+            assert handle.seek(1 << 20, SEEK_HOLE) == (1 << 20) + 4
+            for offset, whence in [
+                (-1, SEEK_DATA),
+                ((1 << 20) + 4, SEEK_HOLE),
+            ]:
+                with pytest.raises(OSError) as error:
+                    handle.seek(offset, whence)
+                assert error.value.errno == errno.ENXIO
+        filesystem.exec("truncate d/a 2000000")
+        with filesystem.open("d/a", "rb") as handle:
+            with pytest.raises(OSError):
+                handle.seek((1 << 20) + 4, SEEK_DATA)
+
+    def test_truncate(self, capsys):
+        filesystem = seeded(
+            ["truncate d/a 8", "write d/a !", "read d/a", "truncate d/a 3"]
+        )
+        filesystem.exec("truncate d/a 0")
+        assert filesystem.read_many(["d/a"]) == [""]
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "head\0\0\0\0!\nFiles can only be emptied or extended.\n"
+        )
+
+    def test_holes_through_one_handle(self):
+        filesystem = fs.FileSystem(hard_disk_capacity=10000)
+        with filesystem.open("/a", "w+") as handle:
+            handle.truncate(10)
+            handle.truncate(20)
+            assert handle.size == 20
+            handle.seek(30)
+            handle.write(b"x")
+            handle.seek(0)
+            assert handle.read() == b"\0" * 30 + b"x"
+
+    def test_du(self, capsys):
+        filesystem = seeded(["hardlink d/a link", "touch d/b"])
+        sparse(filesystem)
+        filesystem.exec("fallocate d/b 100")
+        size, allocated = filesystem.disk_usage("d")
+        assert size == (1 << 20) + 4
+        assert 100 < allocated < 4096
+        assert filesystem.disk_usage() == (size, allocated)
+        assert filesystem.disk_usage("link")[0] == size
+        filesystem.exec("du d/b /")
+        filesystem.exec("du")
+        filesystem.exec("cd d")
+        filesystem.exec("du")
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            f"d/b: 0 bytes, 100 allocated\n/: {size} bytes, "
+            f"{allocated} allocated\n/: {size} bytes, {allocated} allocated\n"
+            f"/d/: {size} bytes, {allocated} allocated\n"
+        )
+
+    def test_grep(self):
+        filesystem = seeded()
+        sparse(filesystem)
+        assert filesystem.search("tail") == [("/d/a", 1 << 20)]
+        assert filesystem.search("d\0\0") == [("/d/a", 3)]
+        assert filesystem.search(r"\0t", regex=True) == [
+            ("/d/a", (1 << 20) - 1)
+        ]
+
+    def test_digest(self):
+        filesystem = seeded()
+        sparse(filesystem)
+        dense = fs.FileSystem(hard_disk_capacity=1 << 22)
+        dense.mkdir(["d"])
+        dense.touch(["d/a"])
+        dense.write_many({"d/a": filesystem.read_many(["d/a"])[0]})
+        assert filesystem.digest() == dense.digest()
+        assert filesystem.diff(dense) == []
+
+    def test_rm_and_transaction(self):
+        filesystem = seeded(["begin"])
+        sparse(filesystem)
+        filesystem.exec("commit")
+        assert filesystem.read_many(["d/a"])[0].endswith("\0tail")
+        filesystem.exec("rm d/a")
+        filesystem.exec("touch d/a")
+        assert filesystem.disk_usage("d") == (0, 0)
@@ -37,3 +37,79 @@ class TestSymlink:
 
         captured = capsys.readouterr()
         assert captured.out == "Path /a_dir/a_file does not exist.\n"
+
+    def test_traverse_directory_link(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir a_dir",
+                "symlink a_dir a_link",
+                "touch a_link/a_file",
+                "write a_link/a_file 'testing'",
+                "ls a_link",
+                "read a_dir/a_file",
+                "ls",
+            ]
+        ).initialize()
+        assert "/a_dir/a_file" in filesystem
+        assert isinstance(filesystem["/a_link"], fs.SymLink)
+
+        captured = capsys.readouterr()
+        assert captured.out == "a_file\n'testing'\n/a_dir\na_link\n"
+
+    def test_loop(self, capsys):
+        fs.FileSystem(
+            commands=[
+                "touch a",
+                "symlink a b",
+                "rm a",
+                "symlink b a",
+                "read a",
+            ]
+        ).initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "Too many levels of symbolic links in /a.\n"
+
+    def test_cache_invalidation(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir a_dir b_dir",
+                "touch a_dir/a_file",
+                "write a_dir/a_file 'first'",
+                "symlink a_dir/a_file a_symlink",
+                "symlink a_symlink another_symlink",
+                "read another_symlink",
+                "mv a_dir/a_file b_dir",
+                "read another_symlink",
+                "touch a_dir/a_file",
+                "write a_dir/a_file 'second'",
+                "read another_symlink",
+                "rm another_symlink",
+            ]
+        ).initialize()
+        assert "/another_symlink" not in filesystem
+        assert "/another_symlink" not in filesystem[""].children
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "'first'\nPath /a_dir/a_file does not exist.\n'second'\n"
+        )
+
+    def test_trailing_components(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "mkdir a_dir",
+                "mkdir a_dir/sub",
+                "symlink a_dir a_link",
+                "ls a_link/sub/..",
+                "ls /a_link/./sub/",
+            ]
+        )
+        filesystem.initialize()
+        digest = filesystem.digest("a_dir")
+        assert filesystem.digest("a_link/.") == digest
+        assert filesystem.digest("/a_link/") == digest
+        assert filesystem.digest("a_link") != digest
+
+        captured = capsys.readouterr()
+        assert captured.out == "/sub\n"
@@ -36,3 +36,19 @@ class TestTouch:
         ).initialize()
         test1_node = filesystem["/test1"]
         assert "/test1/test2" in test1_node.children
+
+    def test_inside_file(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch a",
+                "touch a/b",
+                "mkdir a/b",
+                "symlink a a/b",
+                "hardlink a a/b",
+                "touch c",
+            ]
+        ).initialize()
+        assert sorted(filesystem) == ["", "/a", "/c"]
+
+        captured = capsys.readouterr()
+        assert captured.out == "/a is not a directory.\n" * 4
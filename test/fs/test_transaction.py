@@ -0,0 +1,168 @@
+import threading
+
+import pytest
+
+from fs import fs
+from fs.client import Client
+from fs.server import make_server
+
+
+@pytest.fixture
+def address(tmp_path):
+    socket_path = str(tmp_path / "fs.sock")
+    server = make_server(socket_path, fs.FileSystem(hard_disk_capacity=10000))
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield socket_path
+    server.shutdown()
+    server.server_close()
+
+
+class TestTransaction:
+    def test_commit(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=[
+                "touch old",
+                "write old one",
+                "begin",
+                "mkdir d",
+                "touch d/new",
+                "write d/new two",
+                "write old three",
+                "ls",
+                "commit",
+                "ls d",
+                "read d/new",
+                "read old",
+            ],
+            hard_disk_capacity=10000,
+        )
+        inode_index = filesystem.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == "/d\nold\nnew\ntwo\nonethree\n"
+        assert filesystem.transaction is None
+        assert filesystem.versions is None
+        assert len(inode_index) == 4
+
+    def test_abort(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=["touch a b", "write a one", "hardlink a c"],
+            hard_disk_capacity=10000,
+        )
+        inode_index = filesystem.initialize()
+        handle = filesystem.open("a")
+        used = filesystem.hard_disk_index
+        for command in [
+            "begin",
+            "write a two",
+            "rm b",
+            "rm c",
+            "touch d",
+            "write d three",
+            "read a",
+            "abort",
+            "ls",
+            "read c",
+        ]:
+            filesystem.exec(command)
+
+        captured = capsys.readouterr()
+        assert captured.out == "onetwo\na\nb\nc\none\n"
+        assert filesystem.hard_disk_index == used
+        assert inode_index["/a"].reference_count == 2
+        assert handle.read() == b"one"
+
+    def test_committed_inodes_are_updated_in_place(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a", "write a one"], hard_disk_capacity=10000
+        )
+        filesystem.initialize()
+        handle = filesystem.open("a")
+        for command in ["begin", "write a two", "commit"]:
+            filesystem.exec(command)
+        assert handle.read() == b"onetwo"
+
+    def test_big_directory_shared(self):
+        filesystem = fs.FileSystem()
+        filesystem.mkdir(["big"])
+        filesystem.touch([f"big/f{number:05}" for number in range(5000)])
+        committed = filesystem.inode_index["/big"].children
+        filesystem.exec("begin")
+        filesystem.exec("touch big/new")
+        children = filesystem.transaction.index.local["/big"].children
+        # Only the sublist the new child went into was copied.
+        copied = [
+            sublist
+            for sublist in children._lists
+            if not any(sublist is other for other in committed._lists)
+        ]
+        assert len(copied) == 1
+        assert "/big/new" not in committed
+        filesystem.exec("commit")
+        assert "/big/new" in filesystem.inode_index["/big"].children
+
+    def test_failed_command(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=["begin", "touch a", "rm missing", "touch b", "commit"]
+            + ["ls", "begin", "begin"]
+        )
+        filesystem.initialize()
+        filesystem.exec("exit")
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "Path missing does not exist.\n"
+            "Transaction aborted: one of its commands failed.\n"
+            "Already in a transaction.\n"
+        )
+        assert filesystem.transaction is None
+
+    def test_working_directory(self, capsys):
+        filesystem = fs.FileSystem(
+            commands=["mkdir e", "cd e", "begin", "mkdir d", "cd d", "abort"]
+            + ["pwd", "begin", "cd /", "mkdir d", "cd d", "rm /x", "commit"]
+            + ["pwd", "begin", "cd /e", "commit", "pwd"]
+        )
+        filesystem.initialize()
+
+        captured = capsys.readouterr()
+        assert captured.out == (
+            "/e/\nPath /x does not exist.\n"
+            "Transaction aborted: one of its commands failed.\n/e/\n/e/\n"
+        )
+
+    def test_concurrent_transactions(self, address):
+        with Client(address) as first, Client(address) as second:
+            first.execute("mkdir one two")
+            first.execute("begin")
+            second.execute("begin")
+            first.execute("touch one/a")
+            second.execute("touch two/b")
+            with Client(address) as third:
+                # Nobody else sees uncommitted changes.
+                assert third.execute("ls one two") == ""
+            first.execute("commit")
+            second.execute("commit")
+            assert first.execute("ls one two") == "a\nb\n"
+
+    def test_conflict(self, address):
+        with Client(address) as first, Client(address) as second:
+            first.execute("touch f")
+            first.execute("begin")
+            first.execute("write f mine")
+            second.execute("write f theirs")
+            with pytest.raises(RuntimeError) as error:
+                first.execute("commit")
+            assert str(error.value) == "Transaction aborted: /f was changed."
+            assert first.execute("read f") == "theirs\n"
+
+    def test_abandoned_transaction(self, address):
+        with Client(address) as first:
+            first.execute("begin")
+            first.execute("touch a")
+        with Client(address) as second:
+            second.execute("begin")
+            second.execute("touch b")
+            second.execute("commit")
+            assert second.execute("ls") == "b\n"
@@ -0,0 +1,106 @@
+import pytest
+
+from fs import exceptions, fs
+from fs.watch import Event
+
+
+class TestWatch:
+    def test_directory_events(self):
+        filesystem = fs.FileSystem(
+            commands=["mkdir d d/sub other"], hard_disk_capacity=10000
+        )
+        filesystem.initialize()
+        children = filesystem.watch("d")
+        subtree = filesystem.watch("/d", recursive=True)
+        for command in [
+            "touch d/a d/sub/b other/c",
+            "write d/a one",
+            "write d/sub/b two",
+            "hardlink d/a other/hard",
+            "write other/hard three",
+            "symlink d/a d/link",
+            "cp d/a other",
+            "mv other/c d/sub",
+            "rm d/link",
+        ]:
+            filesystem.exec(command)
+
+        assert children.read() == [
+            Event("create", "/d/a"),
+            Event("modify", "/d/a"),
+            Event("create", "/d/link"),
+            Event("delete", "/d/link"),
+        ]
+        assert subtree.read() == [
+            Event("create", "/d/a"),
+            Event("create", "/d/sub/b"),
+            Event("modify", "/d/a"),
+            Event("modify", "/d/sub/b"),
+            Event("create", "/d/link"),
+            Event("move", "/other/c", "/d/sub/c"),
+            Event("delete", "/d/link"),
+        ]
+        assert children.read() == []
+
+    def test_file_events(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a b", "mkdir d"], hard_disk_capacity=10000
+        )
+        filesystem.initialize()
+        watch = filesystem.watch("a")
+        filesystem.write_many({"a": "one", "b": "two"})
+        with filesystem.open("a", "w") as handle:
+            handle.write(b"three")
+        filesystem.exec("mv a d")
+        filesystem.unwatch(watch)
+        filesystem.exec("rm d/a")
+
+        assert watch.read() == [
+            Event("modify", "/a"),
+            Event("move", "/a", "/d/a"),
+        ]
+        assert filesystem.watches == {}
+
+    def test_coalescing_and_overflow(self):
+        filesystem = fs.FileSystem(
+            commands=["touch a"], hard_disk_capacity=10000
+        )
+        filesystem.initialize()
+        watch = filesystem.watch("/", max_events=3)
+        for _ in range(5):
+            filesystem.exec("write a x")
+        filesystem.exec("touch b c d e")
+
+        assert watch.read() == [
+            Event("modify", "/a"),
+            Event("create", "/b"),
+            Event("create", "/c"),
+            Event("overflow", ""),
+        ]
+        filesystem.exec("write a x")
+        assert watch.read() == [Event("modify", "/a")]
+
+    def test_coalescing_only_adjacent(self):
+        filesystem = fs.FileSystem(
+            commands=["touch f", "mkdir d"], hard_disk_capacity=10000
+        )
+        filesystem.initialize()
+        watch = filesystem.watch("/", recursive=True)
+        for command in ["write f x", "rm f", "touch f", "write f y"]:
+            filesystem.exec(command)
+        for command in ["write f z", "mv f d", "mv d/f /", "write f z"]:
+            filesystem.exec(command)
+
+        assert watch.read() == [
+            Event("modify", "/f"),
+            Event("delete", "/f"),
+            Event("create", "/f"),
+            Event("modify", "/f"),
+            Event("move", "/f", "/d/f"),
+            Event("move", "/d/f", "/f"),
+            Event("modify", "/f"),
+        ]
+
+    def test_missing_path(self):
+        with pytest.raises(exceptions.PathException):
+            fs.FileSystem().watch("missing")